@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+#
+# Copyright (C) 2017 FreeIPA Contributors see COPYING for license
+#
+"""Micro-benchmark of API bootstrap and finalization
+
+The benchmark creates, bootstraps and finalizes a fresh API object with the
+server or client plugin packages, with and without on-demand plugin import.
+On-demand import only defers modules described in the plugin manifests, so
+generate them first:
+
+    $ ./makeapi --manifest
+    $ python contrib/bench-api-startup.py
+
+Every round runs in a new interpreter, as plugin modules stay imported once
+they have been loaded.
+"""
+from __future__ import print_function
+
+import argparse
+import subprocess
+import sys
+
+SNIPPET = """
+import time
+start = time.time()
+from ipalib import create_api
+api = create_api(mode=None)
+api.bootstrap(context={context!r}, in_server={in_server!r}, in_tree=True,
+              plugins_on_demand={on_demand!r})
+api.finalize()
+{touch}
+print(time.time() - start)
+"""
+
+TOUCH = "api.Command.user_show, api.Object.user"
+
+
+def run(context, in_server, on_demand, touch):
+    code = SNIPPET.format(
+        context=context,
+        in_server=in_server,
+        on_demand=on_demand,
+        touch=TOUCH if touch else '',
+    )
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return float(output.decode('ascii').split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of rounds (default: 5)')
+    parser.add_argument('--client', action='store_true',
+                        help='use the client plugins instead of the server '
+                             'plugins')
+    options = parser.parse_args()
+
+    if options.client:
+        context, in_server = 'cli', False
+    else:
+        context, in_server = 'server', True
+
+    for on_demand, touch in ((False, False), (True, False), (True, True)):
+        best = min(run(context, in_server, on_demand, touch)
+                   for _i in range(options.repeat))
+        label = 'plugins_on_demand=%s' % on_demand
+        if touch:
+            label += ', first command used'
+        print('%s: %.1f msec (best of %d rounds)' % (
+            label, best * 10**3, options.repeat))
+
+
+if __name__ == '__main__':
+    main()
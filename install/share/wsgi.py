@@ -39,7 +39,7 @@ import sys
 sys.modules['OpenSSL.SSL'] = None
 
 from ipaplatform.paths import paths
-from ipalib import api
+from ipalib import api, krb_utils
 
 logger = logging.getLogger(os.path.basename(__file__))
 
@@ -49,12 +49,21 @@ try:
 except Exception as e:
     logger.error('Failed to start IPA: %s', e)
 else:
+    # Do the work otherwise deferred to the first request now. Servers
+    # which fork their workers after loading this script share the result.
+    # With plugins_on_demand enabled in default.conf plugins are only
+    # loaded when they are first used instead.
+    if not api.env.plugins_on_demand:
+        api.warm_up()
+
     logger.info('*** PROCESS START ***')
 
     # This is the WSGI callable:
     def application(environ, start_response):
-        if not environ['wsgi.multithread']:
-            return api.Backend.wsgi_dispatch(environ, start_response)
+        if (environ['wsgi.multithread'] and
+                not krb_utils.has_thread_default_ccache()):
+            logger.error("IPA needs python-gssapi with the krb5_ccache_name "
+                         "extension to work with multiple threads per "
+                         "process, use threads=1")
         else:
-            logger.error("IPA does not work with the threaded MPM, "
-                         "use the pre-fork MPM")
+            return api.Backend.wsgi_dispatch(environ, start_response)
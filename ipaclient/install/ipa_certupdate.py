@@ -28,7 +28,7 @@ from six.moves.urllib.parse import urlsplit
 
 from ipalib.install import certmonger, certstore, sysrestore
 from ipalib.install.kinit import kinit_keytab
-from ipapython import admintool, certdb, ipaldap, ipautil
+from ipapython import admintool, certdb, ipaldap
 from ipaplatform import services
 from ipaplatform.paths import paths
 from ipaplatform.tasks import tasks
@@ -115,19 +115,9 @@ class CertUpdate(admintool.AdminTool):
         self.update_file(paths.KDC_CA_BUNDLE_PEM, certs)
         self.update_file(paths.CA_BUNDLE_PEM, certs)
 
-        ipa_db = certdb.NSSDatabase(api.env.nss_dir)
-
         # Remove old IPA certs from /etc/ipa/nssdb
-        for nickname in ('IPA CA', 'External CA cert'):
-            while ipa_db.has_nickname(nickname):
-                try:
-                    ipa_db.delete_cert(nickname)
-                except ipautil.CalledProcessError as e:
-                    logger.error("Failed to remove %s from %s: %s",
-                                 nickname, ipa_db.secdir, e)
-                    break
-
-        self.update_db(ipa_db.secdir, certs)
+        self.update_db(api.env.nss_dir, certs,
+                       remove=('IPA CA', 'External CA cert'))
 
         tasks.remove_ca_certs_from_systemwide_ca_store()
         tasks.insert_ca_certs_into_systemwide_ca_store(certs)
@@ -180,13 +170,13 @@ class CertUpdate(admintool.AdminTool):
         except Exception as e:
             logger.error("failed to update %s: %s", filename, e)
 
-    def update_db(self, path, certs):
+    def update_db(self, path, certs, remove=()):
         db = certdb.NSSDatabase(path)
-        for cert, nickname, trusted, eku in certs:
-            trust_flags = certstore.key_policy_to_trust_flags(
-                trusted, True, eku)
-            try:
-                db.add_cert(cert, nickname, trust_flags)
-            except ipautil.CalledProcessError as e:
-                logger.error(
-                    "failed to update %s in %s: %s", nickname, path, e)
+        certs = (
+            (cert, nickname,
+             certstore.key_policy_to_trust_flags(trusted, True, eku))
+            for cert, nickname, trusted, eku in certs
+        )
+        for nickname, e in db.update_certs(certs, remove=remove):
+            logger.error(
+                "failed to update %s in %s: %s", nickname, path, e)
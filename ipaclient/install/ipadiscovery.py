@@ -20,6 +20,8 @@
 import logging
 import operator
 import socket
+import threading
+import time
 
 import six
 
@@ -56,6 +58,68 @@ error_names = {
     UNKNOWN_ERROR: 'UNKNOWN_ERROR',
 }
 
+# maximum number of LDAP servers probed and DNS queries issued at once
+MAX_PARALLEL_PROBES = 8
+# seconds to wait for the LDAP probes of all candidate servers
+PROBE_DEADLINE = 60
+
+
+def run_in_parallel(func, items, max_workers=MAX_PARALLEL_PROBES,
+                    deadline=None):
+    """
+    Call func for every item from at most max_workers threads.
+
+    This is a generator yielding (item, finished, result) tuples in the order
+    of items, as soon as the result of the item is known. finished is False
+    when the call did not complete before deadline (a time.time() value).
+    Calls which were not started when the generator is closed are skipped.
+    The threads are daemonic so that an unresponsive server cannot block
+    the exit of the process.
+    """
+    items = list(items)
+    results = {}
+    pending = list(range(len(items)))
+    cond = threading.Condition()
+
+    def worker():
+        while True:
+            with cond:
+                if not pending:
+                    return
+                i = pending.pop(0)
+            try:
+                result = func(items[i])
+            except Exception as e:
+                logger.debug("%s(%s) failed: %s", func.__name__, items[i], e)
+                result = None
+            with cond:
+                results[i] = result
+                cond.notify_all()
+
+    for _i in range(min(max_workers, len(items))):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+
+    try:
+        for i, item in enumerate(items):
+            with cond:
+                while i not in results:
+                    if deadline is None:
+                        cond.wait()
+                        continue
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    cond.wait(remaining)
+                finished = i in results
+                result = results.get(i)
+            yield item, finished, result
+    finally:
+        with cond:
+            del pending[:]
+
+
 def get_ipa_basedn(conn):
     """
     Get base DN of IPA suffix in given LDAP server.
@@ -99,6 +163,9 @@ def get_ipa_basedn(conn):
 
 class IPADiscovery(object):
 
+    # seconds to wait for the LDAP probes of all candidate servers
+    probe_deadline = PROBE_DEADLINE
+
     def __init__(self):
         self.realm = None
         self.domain = None
@@ -165,25 +232,52 @@ class IPADiscovery(object):
         :param tried: A set of domains that were tried already
         :param reason: Reason this domain is searched (included in the log)
         """
-        servers = None
-        logger.debug('Start searching for LDAP SRV record in "%s" (%s) '
-                     'and its sub-domains', domain, reason)
-        while not servers:
-            if domain in tried:
-                logger.debug("Already searched %s; skipping", domain)
-                break
-            tried.add(domain)
+        servers, domain, _reason = self.check_domains([(domain, reason)],
+                                                      tried)
+        return (servers, domain)
 
-            servers = self.ipadns_search_srv(domain, '_ldap._tcp', 389,
-                break_on_first=False)
-            if servers:
-                return (servers, domain)
-            else:
+    def check_domains(self, domains, tried):
+        """
+        Search the given domains and all their parent domains for LDAP SRV
+        records. The DNS queries are issued in parallel, the first domain
+        (in the order of domains, each followed by its parent domains) with
+        a SRV record wins.
+
+        Returns a tuple (servers, domain, reason) or (None, None, None) if a
+        SRV record isn't found.
+
+        :param domains: list of (domain, reason) pairs; reason is the reason
+                        the domain is searched (included in the log)
+        :param tried: A set of domains that were tried already
+        """
+        candidates = []
+        for domain, reason in domains:
+            logger.debug('Start searching for LDAP SRV record in "%s" (%s) '
+                         'and its sub-domains', domain, reason)
+            while domain:
+                if domain in tried:
+                    logger.debug("Already searched %s; skipping", domain)
+                    break
+                tried.add(domain)
+                candidates.append((domain, reason))
                 p = domain.find(".")
-                if p == -1: #no ldap server found and last component of the domain already tested
-                    return (None, None)
+                if p == -1:
+                    # last component of the domain already added
+                    break
                 domain = domain[p+1:]
-        return (None, None)
+
+        def search_srv(candidate):
+            return self.ipadns_search_srv(candidate[0], '_ldap._tcp', 389,
+                                          break_on_first=False)
+
+        results = run_in_parallel(search_srv, candidates)
+        try:
+            for (domain, reason), _finished, servers in results:
+                if servers:
+                    return (servers, domain, reason)
+        finally:
+            results.close()
+        return (None, None, None)
 
     def search(self, domain="", servers="", realm=None, hostname=None, ca_cert_path=None):
         """
@@ -229,16 +323,13 @@ class IPADiscovery(object):
                 # not first. We could end up with the wrong SRV record.
                 domains = self.__get_resolver_domains()
                 domains = [(domain, 'domain of the hostname')] + domains
-                tried = set()
-                for domain, reason in domains:
-                    servers, domain = self.check_domain(domain, tried, reason)
-                    if servers:
-                        autodiscovered = True
-                        self.domain = domain
-                        self.server_source = self.domain_source = (
-                            'Discovered LDAP SRV records from %s (%s)' %
-                                (domain, reason))
-                        break
+                servers, domain, reason = self.check_domains(domains, set())
+                if servers:
+                    autodiscovered = True
+                    self.domain = domain
+                    self.server_source = self.domain_source = (
+                        'Discovered LDAP SRV records from %s (%s)' %
+                            (domain, reason))
                 if not self.domain: #no ldap server found
                     logger.debug('No LDAP server found')
                     return NO_LDAP_SERVER
@@ -262,6 +353,18 @@ class IPADiscovery(object):
             self.domain = domain
             self.domain_source = self.server_source = 'Forced'
 
+        # the realm TXT and KDC SRV lookups are independent, issue them
+        # together
+        lookups = []
+        if not realm:
+            lookups.append(self.ipadnssearchkrbrealm)
+        if autodiscovered:
+            lookups.append(self.ipadnssearchkrbkdc)
+        found = {
+            func: result for func, _finished, result in
+            run_in_parallel(lambda func: func(), lookups)
+        }
+
         #search for kerberos
         logger.debug("[Kerberos realm search]")
         if realm:
@@ -269,7 +372,7 @@ class IPADiscovery(object):
             self.realm = realm
             self.realm_source = 'Forced'
         else:
-            realm = self.ipadnssearchkrbrealm()
+            realm = found[self.ipadnssearchkrbrealm]
             self.realm = realm
             self.realm_source = (
                 'Discovered Kerberos DNS records from %s' % self.domain)
@@ -278,7 +381,7 @@ class IPADiscovery(object):
             return REALM_NOT_FOUND
 
         if autodiscovered:
-            self.kdc = self.ipadnssearchkrbkdc()
+            self.kdc = found[self.ipadnssearchkrbkdc]
             self.kdc_source = (
                 'Discovered Kerberos DNS records from %s' % self.domain)
         else:
@@ -286,16 +389,31 @@ class IPADiscovery(object):
             self.kdc_source = "Kerberos DNS record discovery bypassed"
 
         # We may have received multiple servers corresponding to the domain
-        # Iterate through all of those to check if it is IPA LDAP server
+        # Probe all of those in parallel to check if it is IPA LDAP server,
+        # the results are evaluated in the order of the servers (SRV
+        # priority when autodiscovered).
         ldapret = [NOT_IPA_SERVER]
         ldapaccess = True
         logger.debug("[LDAP server check]")
         valid_servers = []
-        for server in servers:
+        trealm = self.realm
+
+        def probe(server):
             logger.debug('Verifying that %s (realm %s) is an IPA server',
-                         server, self.realm)
-            # check ldap now
-            ldapret = self.ipacheckldap(server, self.realm, ca_cert_path=ca_cert_path)
+                         server, trealm)
+            return self.__probe_ldap(server, trealm, ca_cert_path)
+
+        results = run_in_parallel(
+            probe, servers, deadline=time.time() + self.probe_deadline)
+        for server, finished, result in results:
+            if not finished:
+                logger.debug("LDAP Error: %s did not answer in time", server)
+                result = [NO_LDAP_SERVER], None
+            elif result is None:
+                result = [UNKNOWN_ERROR], None
+            ldapret, basedn = result
+            if basedn is not None:
+                self.basedn, self.basedn_source = basedn
 
             if ldapret[0] == 0:
                 self.server = ldapret[1]
@@ -327,6 +445,7 @@ class IPADiscovery(object):
             else:
                 logger.warning(
                    'Skip %s: cannot verify if this is an IPA server', server)
+        results.close()
 
         # If one of LDAP servers checked rejects access (maybe anonymous
         # bind is disabled), assume realm and basedn generated off domain.
@@ -375,8 +494,22 @@ class IPADiscovery(object):
                 anonymous binds are disabled)
             2 means the server is certainly not an IPA server
         """
+        ldapret, basedn = self.__probe_ldap(thost, trealm, ca_cert_path)
+        if basedn is not None:
+            self.basedn, self.basedn_source = basedn
+        return ldapret
+
+    def __probe_ldap(self, thost, trealm, ca_cert_path):
+        """
+        Implementation of ipacheckldap() which does not modify self, so that
+        several servers can be probed at once.
 
+        Returns a tuple (ldapret, basedn) where ldapret is the return value
+        of ipacheckldap() and basedn is None or a (basedn, basedn_source)
+        pair if the IPA base DN was found.
+        """
         lrealms = []
+        found_basedn = None
 
         #now verify the server is really an IPA server
         try:
@@ -396,7 +529,7 @@ class IPADiscovery(object):
                 basedn = get_ipa_basedn(lh)
             except errors.ACIError:
                 logger.debug("LDAP Error: Anonymous access not allowed")
-                return [NO_ACCESS_TO_LDAP]
+                return [NO_ACCESS_TO_LDAP], found_basedn
             except errors.DatabaseError as err:
                 logger.error("Error checking LDAP: %s", err.strerror)
                 # We should only get UNWILLING_TO_PERFORM if the remote LDAP
@@ -405,28 +538,27 @@ class IPADiscovery(object):
                     logger.debug(
                         "Cannot connect to LDAP server. Check that minssf is "
                         "not enabled")
-                    return [NO_TLS_LDAP]
+                    return [NO_TLS_LDAP], found_basedn
                 else:
-                    return [UNKNOWN_ERROR]
+                    return [UNKNOWN_ERROR], found_basedn
 
             if basedn is None:
                 logger.debug("The server is not an IPA server")
-                return [NOT_IPA_SERVER]
+                return [NOT_IPA_SERVER], found_basedn
 
-            self.basedn = basedn
-            self.basedn_source = 'From IPA server %s' % lh.ldap_uri
+            found_basedn = (basedn, 'From IPA server %s' % lh.ldap_uri)
 
             #search and return known realms
             logger.debug(
                 "Search for (objectClass=krbRealmContainer) in %s (sub)",
-                self.basedn)
+                basedn)
             try:
                 lret = lh.get_entries(
-                    DN(('cn', 'kerberos'), self.basedn),
+                    DN(('cn', 'kerberos'), basedn),
                     lh.SCOPE_SUBTREE, "(objectClass=krbRealmContainer)")
             except errors.NotFound:
                 #something very wrong
-                return [REALM_NOT_FOUND]
+                return [REALM_NOT_FOUND], found_basedn
 
             for lres in lret:
                 logger.debug("Found: %s", lres.dn)
@@ -438,40 +570,40 @@ class IPADiscovery(object):
             if trealm:
                 for r in lrealms:
                     if trealm == r:
-                        return [0, thost, trealm]
+                        return [0, thost, trealm], found_basedn
                 # must match or something is very wrong
                 logger.debug("Realm %s does not match any realm in LDAP "
                              "database", trealm)
-                return [REALM_NOT_FOUND]
+                return [REALM_NOT_FOUND], found_basedn
             else:
                 if len(lrealms) != 1:
                     #which one? we can't attach to a multi-realm server without DNS working
                     logger.debug("Multiple realms found, cannot decide "
                                  "which realm is the right without "
                                  "working DNS")
-                    return [REALM_NOT_FOUND]
+                    return [REALM_NOT_FOUND], found_basedn
                 else:
-                    return [0, thost, lrealms[0]]
+                    return [0, thost, lrealms[0]], found_basedn
 
             #we shouldn't get here
             assert False, "Unknown error in ipadiscovery"
 
         except errors.DatabaseTimeout:
             logger.debug("LDAP Error: timeout")
-            return [NO_LDAP_SERVER]
+            return [NO_LDAP_SERVER], found_basedn
         except errors.NetworkError as err:
             logger.debug("LDAP Error: %s", err.strerror)
-            return [NO_LDAP_SERVER]
+            return [NO_LDAP_SERVER], found_basedn
         except errors.ACIError:
             logger.debug("LDAP Error: Anonymous access not allowed")
-            return [NO_ACCESS_TO_LDAP]
+            return [NO_ACCESS_TO_LDAP], found_basedn
         except errors.DatabaseError as err:
             logger.debug("Error checking LDAP: %s", err.strerror)
-            return [UNKNOWN_ERROR]
+            return [UNKNOWN_ERROR], found_basedn
         except Exception as err:
             logger.debug("Error checking LDAP: %s", err)
 
-            return [UNKNOWN_ERROR]
+            return [UNKNOWN_ERROR], found_basedn
 
 
     def ipadns_search_srv(self, domain, srv_record_name, default_port,
@@ -131,6 +131,9 @@ class automountlocation_import(Command):
         ),
     )
 
+    # maximum number of keys sent in one request
+    import_chunk_size = 1000
+
     def get_args(self):
         for arg in self.api.Command.automountlocation_show.args():
             yield arg
@@ -151,22 +154,19 @@ class automountlocation_import(Command):
                 raise
         return map
 
-    def forward(self, *args, **options):
+    def __parse_master(self, filename, result):
         """
-        The basic idea is to read the master file and create all the maps
-        we need, then read each map file and add all the keys for the map.
+        Parse the master file into a list of (key, information) pairs and
+        a dict mapping names of the maps to their files.
         """
-        self.api.Command['automountlocation_show'](args[0])
-
-        result = {'maps':[], 'keys':[], 'skipped':[], 'duplicatekeys':[], 'duplicatemaps':[]}
+        keys = []
         maps = {}
-        master = self.__read_mapfile(args[1])
-        for m in master:
+        for m in self.__read_mapfile(filename):
             if m.startswith('#'):
                 continue
             m = m.rstrip()
             if m.startswith('+'):
-                result['skipped'].append([m,args[1]])
+                result['skipped'].append([m, filename])
                 continue
             if len(m) == 0:
                 continue
@@ -179,79 +179,134 @@ class automountlocation_import(Command):
                 am[1] = os.path.basename(am[1])
                 maps[am[1]] = mapfile
 
-            # Add a new key to the auto.master map for the new map file
-            try:
-                api.Command['automountkey_add'](
-                            args[0],
-                            u'auto.master',
-                            automountkey=unicode(am[0]),
-                            automountinformation=unicode(' '.join(am[1:])))
-                result['keys'].append([am[0], u'auto.master'])
-            except errors.DuplicateEntry:
-                if unicode(am[0]) in DEFAULT_KEYS:
-                    # ignore conflict when the key was pre-created by the framework
-                    pass
-                elif options.get('continue', False):
-                    result['duplicatekeys'].append(am[0])
-                else:
-                    raise errors.DuplicateEntry(
-                        message=_('key %(key)s already exists') % dict(
-                            key=am[0]))
-            # Add the new map
-            if not am[1].startswith('-'):
+            keys.append((unicode(am[0]), unicode(' '.join(am[1:]))))
+        return keys, maps
+
+    def __parse_map(self, name, filename, result):
+        """
+        Parse a map file into a list of (key, information) pairs.
+        """
+        # To handle continuation lines make a pass through the file to skip
+        # comments etc and also to combine lines.
+        lines = []
+        cont = ''
+        for x in self.__read_mapfile(filename):
+            if x.startswith('#'):
+                continue
+            x = x.rstrip()
+            if x.startswith('+'):
+                result['skipped'].append([name, filename])
+                continue
+            if len(x) == 0:
+                continue
+            if x.endswith("\\"):
+                cont = cont + x[:-1] + ' '
+            else:
+                lines.append(cont + x)
+                cont=''
+        keys = []
+        for x in lines:
+            am = x.split(None)
+            keys.append((unicode(am[0].replace('"','')),
+                         unicode(' '.join(am[1:]))))
+        return keys
+
+    def forward(self, *args, **options):
+        """
+        The basic idea is to read the master file and create all the maps
+        we need, then read each map file and add all the keys for the map.
+        """
+        self.api.Command['automountlocation_show'](args[0])
+
+        result = {'maps':[], 'keys':[], 'skipped':[], 'duplicatekeys':[], 'duplicatemaps':[]}
+        master_keys, mapfiles = self.__parse_master(args[1], result)
+        # Add a new key to the auto.master map for each map file and
+        # the new maps
+        maps = [(u'auto.master', False, master_keys)]
+        for _key, info in master_keys:
+            if not info.startswith('-'):
+                maps.append((info.split(None)[0], True, ()))
+        # Now add the keys from the map files
+        for m in sorted(mapfiles):
+            maps.append(
+                (unicode(m), False, self.__parse_map(m, mapfiles[m], result)))
+
+        if 'automountlocation_import_maps' in self.api.Command:
+            self.__import_maps(args[0], maps, result, options)
+        else:
+            self.__import_keys(args[0], maps, result, options)
+
+        return dict(result=result)
+
+    def __import_maps(self, location, maps, result, options):
+        """
+        Import the maps with as few requests to the server as possible, each
+        with at most ``import_chunk_size`` keys.
+        """
+        def send(batch):
+            res = self.api.Command['automountlocation_import_maps'](
+                location, maps=batch,
+                **{'continue': options.get('continue', False)})['result']
+            for name in ('maps', 'keys', 'duplicatemaps', 'duplicatekeys'):
+                result[name].extend(res[name])
+
+        batch = []
+        size = 0
+        for name, add, keys in maps:
+            m = dict(automountmapname=name, add=add, keys=[])
+            batch.append(m)
+            for key in keys:
+                if size >= self.import_chunk_size:
+                    send(batch)
+                    m = dict(automountmapname=name, keys=[])
+                    batch = [m]
+                    size = 0
+                m['keys'].append(list(key))
+                size += 1
+        if batch:
+            send(batch)
+
+    def __import_keys(self, location, maps, result, options):
+        """
+        Import the maps key by key, for servers without
+        automountlocation_import_maps.
+        """
+        for name, add, keys in maps:
+            if add:
                 try:
-                    api.Command['automountmap_add'](args[0], unicode(am[1]))
-                    result['maps'].append(am[1])
+                    api.Command['automountmap_add'](location, name)
+                    result['maps'].append(name)
                 except errors.DuplicateEntry:
-                    if unicode(am[1]) in DEFAULT_MAPS:
+                    if name in DEFAULT_MAPS:
                         # ignore conflict when the map was pre-created by the framework
                         pass
                     elif options.get('continue', False):
-                        result['duplicatemaps'].append(am[0])
+                        result['duplicatemaps'].append(name)
                     else:
                         raise errors.DuplicateEntry(
                             message=_('map %(map)s already exists') % dict(
-                                map=am[1]))
-
-        # Now iterate over the map files and add the keys. To handle
-        # continuation lines I'll make a pass through it to skip comments
-        # etc and also to combine lines.
-        for m in maps:
-            map = self.__read_mapfile(maps[m])
-            lines = []
-            cont = ''
-            for x in map:
-                if x.startswith('#'):
-                    continue
-                x = x.rstrip()
-                if x.startswith('+'):
-                    result['skipped'].append([m, maps[m]])
-                    continue
-                if len(x) == 0:
-                    continue
-                if x.endswith("\\"):
-                    cont = cont + x[:-1] + ' '
-                else:
-                    lines.append(cont + x)
-                    cont=''
-            for x in lines:
-                am = x.split(None)
-                key = unicode(am[0].replace('"',''))
+                                map=name))
+            for key, info in keys:
                 try:
                     api.Command['automountkey_add'](
-                            args[0],
-                            unicode(m),
+                            location,
+                            name,
                             automountkey=key,
-                            automountinformation=unicode(' '.join(am[1:])))
-                    result['keys'].append([key,m])
+                            automountinformation=info)
+                    result['keys'].append([key, name])
                 except errors.DuplicateEntry as e:
-                    if options.get('continue', False):
-                        result['duplicatekeys'].append(am[0])
+                    if name == u'auto.master' and key in DEFAULT_KEYS:
+                        # ignore conflict when the key was pre-created by the framework
+                        pass
+                    elif options.get('continue', False):
+                        result['duplicatekeys'].append(key)
+                    elif name == u'auto.master':
+                        raise errors.DuplicateEntry(
+                            message=_('key %(key)s already exists') % dict(
+                                key=key))
                     else:
                         raise e
 
-        return dict(result=result)
-
     def output_for_cli(self, textui, result, *keys, **options):
         maps = result['result']['maps']
         keys = result['result']['keys']
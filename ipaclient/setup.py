@@ -48,6 +48,7 @@ if __name__ == '__main__':
                 'csrgen/rules/*.json',
                 'csrgen/templates/*.tmpl',
             ],
+            'ipaclient.plugins': ['plugins.manifest'],
         },
         install_requires=[
             "cryptography",
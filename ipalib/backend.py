@@ -23,11 +23,10 @@ Base classes for all backed-end plugins.
 
 import logging
 import threading
-import os
 
-from ipalib import plugable
+from ipalib import krb_utils, plugable
 from ipalib.errors import PublicError, InternalError, CommandError
-from ipalib.request import context, Connection, destroy_context
+from ipalib.request import context, Connection, destroy_context, timed
 
 logger = logging.getLogger(__name__)
 
@@ -66,7 +65,8 @@ class Connectible(Backend):
                     threading.currentThread().getName()
                 )
             )
-        conn = self.create_connection(*args, **kw)
+        with timed('%s_connect' % self.name):
+            conn = self.create_connection(*args, **kw)
         setattr(context, self.id, Connection(conn, self.disconnect))
         assert self.conn is conn
         logger.debug('Created connection context.%s', self.id)
@@ -120,7 +120,7 @@ class Executioner(Backend):
         """
 
         if ccache is not None:
-            os.environ["KRB5CCNAME"] = ccache
+            krb_utils.set_default_ccache(ccache)
 
         if self.env.in_server:
             self.Backend.ldap2.connect(ccache=ccache,
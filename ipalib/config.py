@@ -513,10 +513,6 @@ class Env(object):
                 "tls_ca_cert has to be an absolute path to a CA certificate, "
                 "got '{}'".format(self.tls_ca_cert))
 
-        # Set plugins_on_demand:
-        if 'plugins_on_demand' not in self:
-            self.plugins_on_demand = (self.context == 'cli')
-
     def _finalize_core(self, **defaults):
         """
         Complete initialization of standard IPA environment.
@@ -563,6 +559,11 @@ class Env(object):
         if 'in_server' not in self:
             self.in_server = (self.context == 'server')
 
+        # Set plugins_on_demand after the config files were merged, so that
+        # servers can enable it in default.conf:
+        if 'plugins_on_demand' not in self:
+            self.plugins_on_demand = (self.context == 'cli')
+
         # Set logdir:
         if 'logdir' not in self:
             if self.in_tree or not self.in_server:
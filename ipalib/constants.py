@@ -168,6 +168,8 @@ DEFAULT_CONFIG = (
     ('verbose', 0),
     ('debug', False),
     ('startup_traceback', False),
+    # Log where the server spends the time of each request
+    ('request_timing', False),
     ('mode', 'production'),
     ('wait_for_dns', 0),
 
@@ -44,6 +44,9 @@ if six.PY3:
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of default value plans cached per command
+DEFAULT_PLAN_CACHE_SIZE = 64
+
 RULE_FLAG = 'validation_rule'
 
 def rule(obj):
@@ -449,6 +452,37 @@ class Command(HasParam):
             self.context.principal = getattr(context, 'principal', None)
             return self.__do_call(*args, **options)
 
+    def __process_params(self, params, debug=False):
+        """
+        Fill in defaults, normalize, convert and validate merged params.
+        """
+        if self.api.env.in_server:
+            params.update(self.get_default(**params))
+        params = self.__normalize_convert(params)
+        if debug:
+            logger.debug(
+                '%s(%s)', self.name, ', '.join(self._repr_iter(**params))
+            )
+        if self.api.env.in_server:
+            self.validate(**params)
+        return params
+
+    def process_args(self, *args, **options):
+        """
+        Process arguments like a call of the command, without running it.
+
+        The arguments get their defaults and are normalized, converted and
+        validated exactly as `Command.__call__` does it, for code which
+        performs the work of the command itself, e.g. in bulk.
+
+        :returns: tuple (args, options) as passed to `Command.execute`
+        """
+        self.ensure_finalized()
+        options.setdefault('version', self.api_version)
+        params = self.args_options_2_params(*args, **options)
+        params = self.__process_params(params)
+        return self.params_2_args_options(**params)
+
     def __do_call(self, *args, **options):
         self.context.__messages = []
         if 'version' in options:
@@ -462,18 +496,18 @@ class Command(HasParam):
                 self.add_message(
                     messages.VersionMissing(server_version=self.api_version))
         params = self.args_options_2_params(*args, **options)
-        logger.debug(
-            'raw: %s(%s)', self.name, ', '.join(self._repr_iter(**params))
-        )
-        if self.api.env.in_server:
-            params.update(self.get_default(**params))
-        params = self.normalize(**params)
-        params = self.convert(**params)
-        logger.debug(
-            '%s(%s)', self.name, ', '.join(self._repr_iter(**params))
-        )
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(
+                'raw: %s(%s)', self.name, ', '.join(self._repr_iter(**params))
+            )
         if self.api.env.in_server:
-            self.validate(**params)
+            command_params = getattr(context, 'command_params', None)
+            if command_params is not None and not command_params:
+                # Hand the raw params of the top-level command to the RPC
+                # server, which logs the call, so it need not merge them again
+                command_params[self] = dict(params)
+        params = self.__process_params(params, debug)
         (args, options) = self.params_2_args_options(**params)
         ret = self.run(*args, **options)
         if isinstance(ret, dict):
@@ -511,10 +545,10 @@ class Command(HasParam):
         >>> list(c._repr_iter(login=u'Okay.', passwd=u'Private!'))
         ["u'Okay.'", "passwd=u'********'"]
         """
-        for arg in self.args():
+        for arg in self._arg_params:
             value = params.get(arg.name, None)
             yield repr(arg.safe_value(value))
-        for option in self.options():
+        for option in self._option_params:
             if option.name not in params:
                 continue
             value = params[option.name]
@@ -539,7 +573,7 @@ class Command(HasParam):
 
     def __args_2_params(self, values):
         multivalue = False
-        for (i, arg) in enumerate(self.args()):
+        for (i, arg) in enumerate(self._arg_params):
             assert not multivalue
             if len(values) > i:
                 if arg.multivalue:
@@ -554,14 +588,16 @@ class Command(HasParam):
                 break
 
     def __options_2_params(self, options):
-        for name in self.params:
-            if name in options:
-                yield (name, options.pop(name))
-        # If any options remain, they are either internal or unknown
-        unused_keys = set(options).difference(self.internal_options)
-        if unused_keys:
-            raise OptionError(_('Unknown option: %(option)s'),
-                option=unused_keys.pop())
+        param_names = self._param_names
+        for name in options:
+            # Options which are not params are either internal or unknown
+            if name not in param_names and name not in self.internal_options:
+                raise OptionError(_('Unknown option: %(option)s'),
+                    option=name)
+        return (
+            (name, value) for (name, value) in options.items()
+            if name in param_names
+        )
 
     def args_options_2_entry(self, *args, **options):
         """
@@ -571,8 +607,8 @@ class Command(HasParam):
         return dict(self.__attributes_2_entry(kw))
 
     def __attributes_2_entry(self, kw):
-        for name in self.params:
-            if self.params[name].attribute and name in kw:
+        for name in self._attribute_names:
+            if name in kw:
                 value = kw[name]
                 if isinstance(value, tuple):
                     yield (name, [v for v in value])
@@ -587,7 +623,7 @@ class Command(HasParam):
         options = dict(self.__params_2_options(params))
 
         is_arg = True
-        for name in self.args:
+        for name in self._arg_names:
             try:
                 value = params[name]
             except KeyError:
@@ -601,7 +637,7 @@ class Command(HasParam):
         return (args, options)
 
     def __params_2_options(self, params):
-        for name in self.options:
+        for name in self._option_names:
             if name in params:
                 yield(name, params[name])
 
@@ -672,6 +708,19 @@ class Command(HasParam):
             (k, self.params[k].convert(v)) for (k, v) in kw.items()
         )
 
+    def __normalize_convert(self, kw):
+        """
+        Normalize and convert all values in a single pass.
+
+        This is equivalent to ``self.convert(**self.normalize(**kw))``.
+        """
+        params = self._params_by_name
+        result = {}
+        for (name, value) in kw.items():
+            param = params[name]
+            result[name] = param.convert(param.normalize(value))
+        return result
+
     def __convert_iter(self, kw):
         for param in self.params():
             if kw.get(param.name, None) is None:
@@ -695,8 +744,8 @@ class Command(HasParam):
         {}
         """
         if _params is None:
-            _params = [p.name for p in self.params()
-                       if p.name not in kw and (p.required or p.autofill)]
+            _params = [name for name in self._default_candidates
+                       if name not in kw]
         return dict(self.__get_default_iter(_params, kw))
 
     def get_default_of(self, _name, **kw):
@@ -710,20 +759,10 @@ class Command(HasParam):
         """
         Generator method used by `Command.get_default` and `Command.get_default_of`.
         """
-        # Find out what additional parameters are needed to dynamically create
-        # the default values with default_from.
-        dep = set()
-        for param in reversed(self.params_by_default):
-            if param.name in params or param.name in dep:
-                if param.default_from is None:
-                    continue
-                for name in param.default_from.keys:
-                    dep.add(name)
-
-        for param in self.params_by_default():
+        for (param, in_dep, in_params) in self.__get_default_plan(params):
             default = None
             hasdefault = False
-            if param.name in dep:
+            if in_dep:
                 if param.name in kw:
                     # Parameter is specified, convert and validate the value.
                     value = param(kw[param.name], **kw)
@@ -741,7 +780,7 @@ class Command(HasParam):
                     if default is not None:
                         kw[param.name] = default
                     hasdefault = True
-            if param.name in params:
+            if in_params:
                 if not hasdefault:
                     # Default value is not available from the previous step,
                     # get it now. At this point it is certain that the value
@@ -751,6 +790,42 @@ class Command(HasParam):
                 if default is not None:
                     yield (param.name, default)
 
+    def __get_default_plan(self, params):
+        """
+        Return the steps `Command.__get_default_iter` takes for ``params``.
+
+        The plan is a tuple of ``(param, in_dep, in_params)`` triples in
+        default_from dependency order, where ``in_dep`` tells whether other
+        requested defaults depend on ``param`` and ``in_params`` whether the
+        default of ``param`` was requested. Plans are cached per set of
+        requested names.
+        """
+        key = frozenset(params)
+        try:
+            return self._default_plans[key]
+        except KeyError:
+            pass
+
+        # Find out what additional parameters are needed to dynamically create
+        # the default values with default_from.
+        dep = set()
+        for param in reversed(self.params_by_default):
+            if param.name in key or param.name in dep:
+                if param.default_from is None:
+                    continue
+                for name in param.default_from.keys:
+                    dep.add(name)
+
+        plan = tuple(
+            (param, param.name in dep, param.name in key)
+            for param in self.params_by_default()
+            if param.name in dep or param.name in key
+        )
+        if len(self._default_plans) >= DEFAULT_PLAN_CACHE_SIZE:
+            self._default_plans.clear()
+        self._default_plans[key] = plan
+        return plan
+
     def validate(self, **kw):
         """
         Validate all values.
@@ -758,7 +833,7 @@ class Command(HasParam):
         If any value fails the validation, `ipalib.errors.ValidationError`
         (or a subclass thereof) will be raised.
         """
-        for param in self.params():
+        for param in self._param_list:
             value = kw.get(param.name, None)
             param.validate(value, supplied=param.name in kw)
 
@@ -876,10 +951,31 @@ class Command(HasParam):
                     pass
             params.insert(pos, i)
         self.params_by_default = NameSpace(params, sort=False)
+        self.__compile_pipeline()
         self.output = NameSpace(self._iter_output(), sort=False)
         self._create_param_namespace('output_params')
         super(Command, self)._on_finalize()
 
+    def __compile_pipeline(self):
+        """
+        Precompute the lookups `Command.__do_call` needs on every call.
+
+        The ``args``, ``options`` and ``params`` namespaces are walked once
+        here instead of several times per call.
+        """
+        self._arg_params = tuple(self.args())
+        self._arg_names = tuple(p.name for p in self._arg_params)
+        self._option_params = tuple(self.options())
+        self._option_names = tuple(p.name for p in self._option_params)
+        self._param_list = tuple(self.params())
+        self._params_by_name = dict((p.name, p) for p in self._param_list)
+        self._param_names = frozenset(self._params_by_name)
+        self._attribute_names = tuple(
+            p.name for p in self._param_list if p.attribute)
+        self._default_candidates = tuple(
+            p.name for p in self._param_list if p.required or p.autofill)
+        self._default_plans = {}
+
     def _iter_output(self):
         if type(self.has_output) is not tuple:
             raise TypeError('%s.has_output: need a %r; got a %r: %r' % (
@@ -1272,7 +1368,10 @@ class Object(HasParam):
             return
         namespace = self.api[name]
         assert type(namespace) is APINameSpace
-        for plugin in namespace(): # Equivalent to dict.itervalues()
+        # Import only the plugin modules which define attributes of this
+        # object, not all plugin modules of the namespace
+        namespace.load(obj_name=self.name)
+        for plugin in namespace.loaded():
             if plugin is not namespace[plugin.name]:
                 continue
             if plugin.obj_name == self.name:
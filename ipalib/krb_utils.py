@@ -16,12 +16,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import time
 import re
 
 import six
 import gssapi
 
+try:
+    # pylint: disable=no-name-in-module
+    from gssapi.raw import krb5_ccache_name
+except ImportError:
+    # the extension is missing from older versions of python-gssapi
+    krb5_ccache_name = None
+
 from ipalib import errors
 
 if six.PY3:
@@ -196,3 +204,32 @@ def get_credentials_if_valid(name=None, ccache_name=None):
         return None
     except gssapi.exceptions.GSSError:
         return None
+
+def set_default_ccache(ccache_name):
+    '''
+    Make the given credentials cache the default one of the current thread.
+
+    python-gssapi versions which provide the krb5_ccache_name extension set
+    a thread-specific default which is honoured by GSSAPI and by SASL GSSAPI
+    binds. Otherwise the KRB5CCNAME environment variable, which is shared by
+    all threads of the process, is set instead.
+
+    :parameters:
+      ccache_name
+        string specifying Kerberos credentials cache name or None to reset
+        to the default of the process
+    '''
+    if krb5_ccache_name is not None:
+        if ccache_name is not None:
+            ccache_name = ccache_name.encode('utf-8')
+        krb5_ccache_name(ccache_name)
+    elif ccache_name is None:
+        os.environ.pop('KRB5CCNAME', None)
+    else:
+        os.environ['KRB5CCNAME'] = ccache_name
+
+def has_thread_default_ccache():
+    '''
+    Return True if `set_default_ccache` only affects the current thread.
+    '''
+    return krb5_ccache_name is not None
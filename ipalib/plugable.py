@@ -34,11 +34,13 @@ from os import path
 import optparse  # pylint: disable=deprecated-module
 import textwrap
 import collections
+import gc
 import importlib
+import json
 
 import six
 
-from ipalib import errors
+from ipalib import errors, text
 from ipalib.config import Env
 from ipalib.text import _
 from ipalib.util import classproperty
@@ -60,6 +62,55 @@ logger = logging.getLogger(__name__)
 TYPE_ERROR = '%s: need a %r; got a %r: %r'
 
 
+# Name of the file listing the plugins registered by each module of a plugin
+# package. See `API.get_plugin_manifest`.
+PLUGIN_MANIFEST = 'plugins.manifest'
+
+
+def read_plugin_manifest(package_dir, modules):
+    """
+    Return the plugin manifest of the package in ``package_dir``.
+
+    Returns None if the package has no manifest, or if the manifest is
+    unreadable, was generated for another version of IPA, for another list
+    of ``modules`` than the package has now, or before one of the modules
+    was last modified.
+    """
+    filename = path.join(package_dir, PLUGIN_MANIFEST)
+    try:
+        with open(filename) as f:
+            manifest = json.load(f)
+        manifest_mtime = os.stat(filename).st_mtime
+    except (IOError, OSError):
+        return None
+    except ValueError as e:
+        logger.warning("ignoring invalid plugin manifest %s: %s",
+                       filename, e)
+        return None
+
+    if manifest.get('version') != VERSION:
+        logger.debug("ignoring plugin manifest %s generated for version %s",
+                     filename, manifest.get('version'))
+        return None
+
+    if sorted(manifest.get('sources', ())) != sorted(modules):
+        logger.debug("ignoring plugin manifest %s generated for other "
+                     "plugin modules", filename)
+        return None
+
+    for name in modules:
+        try:
+            mtime = os.stat(path.join(package_dir, name + '.py')).st_mtime
+        except OSError:
+            mtime = None
+        if mtime is None or mtime > manifest_mtime:
+            logger.debug("ignoring plugin manifest %s older than plugin "
+                         "module %s", filename, name)
+            return None
+
+    return manifest['modules']
+
+
 # FIXME: This function has no unit test
 def find_modules_in_dir(src_dir):
     """
@@ -233,6 +284,15 @@ class Plugin(ReadOnly):
             if not self.__finalized:
                 self.finalize()
 
+    def warm_up(self):
+        """
+        Do work which would otherwise be deferred to the first request.
+
+        This method is called from `API.warm_up()`, after the plugin was
+        finalized. Subclasses can override it to fill process-wide caches.
+        """
+        pass
+
     class finalize_attr(object):
         """
         Create a stub object for plugin attribute that isn't set until the
@@ -309,19 +369,51 @@ class APINameSpace(collections.Mapping):
 
         self.__plugins = sorted(plugins, key=operator.attrgetter('full_name'))
 
+    def load(self, key=None, obj_name=None):
+        """
+        Import plugin modules of this namespace which were not imported yet.
+
+        Only modules which register a plugin matching ``key`` or an
+        attribute of the object ``obj_name`` are imported. If neither is
+        given, all remaining modules of the namespace are imported.
+
+        Returns True if any plugin module was imported.
+        """
+        # Unit tests use API stand-ins without lazily loaded modules
+        load_modules = getattr(self.__api, '_load_plugin_modules', None)
+        if load_modules is None:
+            return False
+        if not load_modules(self.__base, key=key, obj_name=obj_name):
+            return False
+        self.__plugins = None
+        self.__plugins_by_key = None
+        return True
+
+    def loaded(self):
+        """
+        Iterate through instances of plugins whose modules are imported.
+        """
+        self.__enumerate()
+        for plugin in self.__plugins:
+            yield self.__api._get(plugin)
+
     def __len__(self):
+        self.load()
         self.__enumerate()
         return len(self.__plugins)
 
     def __contains__(self, key):
+        self.load(key=key)
         self.__enumerate()
         return key in self.__plugins_by_key
 
     def __iter__(self):
+        self.load()
         self.__enumerate()
         return iter(self.__plugins)
 
     def get_plugin(self, key):
+        self.load(key=key)
         self.__enumerate()
         return self.__plugins_by_key[key]
 
@@ -352,6 +444,10 @@ class API(ReadOnly):
         self.__instances = {}
         self.__next = {}
         self.__done = set()
+        self.__lazy_modules = collections.OrderedDict()
+        self.__lazy_index = {}
+        self.__lazy_order = {}
+        self.__lazy_lock = threading.RLock()
         self.env = Env()
 
     @property
@@ -637,25 +733,138 @@ class API(ReadOnly):
             )
 
         logger.debug("importing all plugin modules in %s...", package_name)
-        modules = getattr(package, 'modules', find_modules_in_dir(package_dir))
-        modules = ['.'.join((package_name, name)) for name in modules]
+        modules = list(
+            getattr(package, 'modules', find_modules_in_dir(package_dir)))
+
+        # With plugins on demand, modules listed in the package's plugin
+        # manifest are only imported once one of their plugins is needed.
+        manifest = None
+        if self.env.plugins_on_demand:
+            manifest = read_plugin_manifest(package_dir, modules)
 
         for name in modules:
-            logger.debug("importing plugin module %s", name)
-            try:
-                module = importlib.import_module(name)
-            except errors.SkipPluginModule as e:
-                logger.debug("skipping plugin module %s: %s", name, e.reason)
+            module_name = '.'.join((package_name, name))
+            if manifest is not None and manifest.get(name):
+                logger.debug("deferring import of plugin module %s",
+                             module_name)
+                self.__defer_plugin_module(module_name, manifest[name])
                 continue
-            except Exception as e:
-                if self.env.startup_traceback:
-                    logger.exception("could not load plugin module %s", name)
-                raise
+            self.__import_plugin_module(module_name)
+
+    def __defer_plugin_module(self, name, entries):
+        self.__lazy_modules[name] = entries
+        self.__lazy_order[name] = len(self.__lazy_order)
+        for entry in entries:
+            full_name = '{}/{}'.format(entry['name'], entry['version'])
+            keys = [entry['name'], full_name,
+                    (entry['name'], entry['version'])]
+            if 'obj_name' in entry:
+                keys.append(('obj_name', entry['obj_name']))
+            for key in keys:
+                self.__lazy_index.setdefault(key, set()).add(name)
+
+    def __import_plugin_module(self, name):
+        logger.debug("importing plugin module %s", name)
+        try:
+            module = importlib.import_module(name)
+        except errors.SkipPluginModule as e:
+            logger.debug("skipping plugin module %s: %s", name, e.reason)
+            return
+        except Exception as e:
+            if self.env.startup_traceback:
+                logger.exception("could not load plugin module %s", name)
+            raise
+
+        try:
+            self.add_module(module)
+        except errors.PluginModuleError as e:
+            logger.debug("%s", e)
+
+    def _load_plugin_modules(self, base=None, key=None, obj_name=None):
+        """
+        Import deferred plugin modules which register matching plugins.
+
+        A plugin matches if it belongs to the ``base`` namespace (any if
+        None) and either its name, full name or (name, version) is ``key``
+        or it is an attribute of the object ``obj_name``. If neither ``key``
+        nor ``obj_name`` is given, all plugins of ``base`` match.
+
+        Returns True if any module was imported.
+        """
+        if not self.__lazy_modules:
+            return False
+
+        with self.__lazy_lock:
+            if key is not None:
+                if not isinstance(key, (six.string_types, tuple)):
+                    return False
+                candidates = self.__lazy_index.get(key, ())
+            elif obj_name is not None:
+                candidates = self.__lazy_index.get(('obj_name', obj_name), ())
+            else:
+                candidates = list(self.__lazy_modules)
+
+            # Keep the order of the modules in the package, so that plugins
+            # are overridden in the same order as if imported eagerly
+            modules = sorted(
+                (name for name in candidates
+                 if name in self.__lazy_modules and (
+                     base is None or
+                     any(base.__name__ in entry['bases']
+                         for entry in self.__lazy_modules[name]))),
+                key=self.__lazy_order.get
+            )
+            for name in modules:
+                # The module might have been imported by an override already
+                if self.__lazy_modules.pop(name, None) is not None:
+                    self.__import_plugin_module(name)
+
+        return bool(modules)
+
+    def get_plugin_manifest(self, package):
+        """
+        Describe the plugins registered by each module of ``package``.
 
+        The returned dictionary is meant to be stored as JSON in the
+        `PLUGIN_MANIFEST` file of the package directory. Modules which do
+        not register plugins through a `Registry` are left out, they are
+        always imported. The names of all modules are kept in ``sources``,
+        so that the manifest is ignored once a module is added or removed.
+        """
+        package_dir = path.dirname(path.abspath(package.__file__))
+        modules = list(
+            getattr(package, 'modules', find_modules_in_dir(package_dir)))
+
+        manifest = {}
+        for name in modules:
             try:
-                self.add_module(module)
-            except errors.PluginModuleError as e:
-                logger.debug("%s", e)
+                module = importlib.import_module(
+                    '.'.join((package.__name__, name)))
+            except errors.SkipPluginModule:
+                continue
+
+            register = getattr(module, 'register', None)
+            if not isinstance(register, Registry):
+                continue
+
+            entries = []
+            for kwargs in register:
+                plugin = kwargs['plugin']
+                entry = dict(
+                    name=plugin.name,
+                    version=plugin.version,
+                    bases=[base.__name__ for base in self.bases
+                           if any(issubclass(b, base) for b in plugin.bases)],
+                )
+                obj_name = getattr(plugin, 'obj_name', None)
+                if isinstance(obj_name, property):
+                    obj_name = plugin(self).obj_name
+                if isinstance(obj_name, six.string_types):
+                    entry['obj_name'] = obj_name
+                entries.append(entry)
+            manifest[name] = entries
+
+        return dict(version=VERSION, sources=modules, modules=manifest)
 
     def add_module(self, module):
         """
@@ -697,6 +906,10 @@ class API(ReadOnly):
 
         # Check override:
         prev = self.__plugins_by_key.get(plugin.full_name)
+        if not prev and override and self.__lazy_modules:
+            # The overridden plugin might not be imported yet
+            self._load_plugin_modules(key=plugin.full_name)
+            prev = self.__plugins_by_key.get(plugin.full_name)
         if prev:
             if not override:
                 if no_fail:
@@ -742,24 +955,30 @@ class API(ReadOnly):
                 logger.info(
                     "IPA_CONFDIR env sets confdir to '%s'.", self.env.confdir)
 
-        for plugin in self.__plugins:
+        # Plugins of deferred modules are known from the plugin manifest
+        plugin_versions = [(p.name, p.version) for p in self.__plugins]
+        for entries in self.__lazy_modules.values():
+            plugin_versions.extend((e['name'], e['version']) for e in entries)
+
+        for (name, plugin_version) in plugin_versions:
             if not self.env.validate_api:
-                if plugin.full_name not in DEFAULT_PLUGINS:
+                full_name = '{}/{}'.format(name, plugin_version)
+                if full_name not in DEFAULT_PLUGINS:
                     continue
             else:
                 try:
-                    default_version = self.__default_map[plugin.name]
+                    default_version = self.__default_map[name]
                 except KeyError:
                     pass
                 else:
                     # Technicall plugin.version is not an API version. The
                     # APIVersion class can handle plugin versions. It's more
                     # lean than pkg_resource.parse_version().
-                    version = ipautil.APIVersion(plugin.version)
+                    version = ipautil.APIVersion(plugin_version)
                     default_version = ipautil.APIVersion(default_version)
                     if version < default_version:
                         continue
-            self.__default_map[plugin.name] = plugin.version
+            self.__default_map[name] = plugin_version
 
         production_mode = self.is_production_mode()
 
@@ -788,6 +1007,44 @@ class API(ReadOnly):
         if not production_mode:
             lock(self)
 
+    def warm_up(self):
+        """
+        Do the work the API otherwise defers to the first request.
+
+        Imports all plugin modules, instantiates and finalizes all plugins,
+        lets each plugin fill its caches through `Plugin.warm_up()` and
+        loads the message catalogs. Finally the resulting objects are
+        frozen out of the garbage collector's reach, so that processes
+        forked afterwards share their memory pages instead of copying them
+        on the first collection.
+
+        `API.finalize` will automatically be called if it hasn't been
+        already.
+        """
+        self.__doing('warm_up')
+        self.__do_if_not_done('finalize')
+
+        # A plugin may be in several namespaces, e.g. Method is a Command
+        instances = collections.OrderedDict()
+        for name in self:
+            for instance in self[name]():
+                instance.ensure_finalized()
+                instances[id(instance)] = instance
+
+        for instance in instances.values():
+            try:
+                instance.warm_up()
+            except Exception as e:
+                logger.warning("%s.warm_up() failed: %s",
+                               instance.full_name, e)
+
+        text.load_catalogs()
+
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            # Python 3.7+
+            gc.freeze()
+
     def _get(self, plugin):
         if not callable(plugin):
             raise TypeError('plugin must be callable; got %r' % plugin)
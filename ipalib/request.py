@@ -22,8 +22,10 @@
 Per-request thread-local data.
 """
 
+import collections
 import contextlib
 import threading
+import time
 
 from ipalib.base import ReadOnly, lock
 from ipalib.constants import CALLABLE_ERROR
@@ -77,3 +79,118 @@ def destroy_context():
         if isinstance(value, Connection):
             value.disconnect()
     context.__dict__.clear()
+
+
+class RequestTiming(object):
+    """
+    Time spent in the phases of a request and counters of its operations.
+
+    A phase is e.g. ``'ldap_search'`` or ``'marshal'``. For each phase the
+    number of calls and the total time is kept, along with any counters
+    reported for it, such as the number of entries returned. Phases may
+    nest, e.g. ``'execute'`` includes the LDAP operations of the command.
+    """
+
+    def __init__(self):
+        self.start = time.time()
+        self.phases = collections.OrderedDict()
+        self.counters = collections.OrderedDict()
+        # what the request was, e.g. its command, for the log
+        self.info = {}
+
+    def add(self, phase, seconds, **counters):
+        calls, total = self.phases.get(phase, (0, 0.0))
+        self.phases[phase] = (calls + 1, total + seconds)
+        for name, value in counters.items():
+            key = '%s_%s' % (phase, name)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def extend(self, phase, seconds):
+        """
+        Add ``seconds`` to ``phase`` without counting another call, e.g. for
+        work the phase left to be done while the response is sent.
+        """
+        calls, total = self.phases.get(phase, (0, 0.0))
+        self.phases[phase] = (calls, total + seconds)
+
+    def elapsed(self):
+        return time.time() - self.start
+
+    def as_dict(self):
+        """
+        Return the timing as a JSON serializable ``dict``, times in msec.
+        """
+        result = dict(total_ms=round(self.elapsed() * 1000, 3))
+        for phase, (calls, seconds) in self.phases.items():
+            result['%s_calls' % phase] = calls
+            result['%s_ms' % phase] = round(seconds * 1000, 3)
+        result.update(self.counters)
+        return result
+
+    def server_timing(self):
+        """
+        Return the timing as the value of a ``Server-Timing`` HTTP header.
+        """
+        return ', '.join(
+            '%s;dur=%.3f' % (phase, seconds * 1000)
+            for phase, (_calls, seconds) in self.phases.items()
+        )
+
+
+class RequestTimingTotals(object):
+    """
+    Process-wide totals of the `RequestTiming` of finished requests.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.requests = 0
+            self.totals = collections.OrderedDict()
+
+    def add(self, timing):
+        with self.__lock:
+            self.requests += 1
+            for key, value in timing.as_dict().items():
+                self.totals[key] = self.totals.get(key, 0) + value
+
+    def as_dict(self):
+        with self.__lock:
+            result = dict(self.totals)
+            result['requests'] = self.requests
+            return result
+
+
+timing_totals = RequestTimingTotals()
+
+
+def start_timing():
+    """
+    Start recording the `RequestTiming` of the current request.
+    """
+    timing = context.request_timing = RequestTiming()
+    return timing
+
+
+@contextlib.contextmanager
+def timed(phase, **counters):
+    """
+    Account the time spent in the block to ``phase`` of the current request.
+
+    Unless `start_timing` was called for the current request nothing is
+    recorded and ``None`` is yielded. Otherwise the ``dict`` of counters is
+    yielded, so that the block can update them, e.g. with the number of
+    entries an operation returned.
+    """
+    timing = getattr(context, 'request_timing', None)
+    if timing is None:
+        yield None
+        return
+    start = time.time()
+    try:
+        yield counters
+    finally:
+        timing.add(phase, time.time() - start, **counters)
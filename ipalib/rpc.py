@@ -42,6 +42,7 @@ import json
 import re
 import socket
 import gzip
+import zlib
 from cryptography import x509 as crypto_x509
 
 import gssapi
@@ -417,6 +418,72 @@ def json_encode_binary(val, version, pretty_print=False):
         return json.dumps(result)
 
 
+def _json_iterencode(primer, val, depth, _dumps=json.dumps,
+                     _iteritems=six.iteritems,
+                     _string_types=six.string_types):
+    func = primer[val.__class__]
+    if depth > 0 and func == primer._enc_dict:
+        yield u'{'
+        sep = u''
+        for k, v in _iteritems(val):
+            # JSON object keys are strings, convert the rest like json does
+            if not isinstance(k, _string_types):
+                k = _dumps(k)
+            yield sep + _dumps(k) + u': '
+            for piece in _json_iterencode(primer, v, depth - 1):
+                yield piece
+            sep = u', '
+        yield u'}'
+    elif depth > 0 and func == primer._enc_list:
+        yield u'['
+        sep = u''
+        for v in val:
+            yield sep
+            for piece in _json_iterencode(primer, v, depth - 1):
+                yield piece
+            sep = u', '
+        yield u']'
+    else:
+        yield _dumps(primer.convert(val))
+
+
+def json_iterencode_binary(val, version, pretty_print=False,
+                           chunk_size=65536, depth=3):
+    """Serialize a Python object structure to JSON incrementally
+
+    Dicts, lists and tuples in the top *depth* levels of the structure are
+    serialized item by item, deeper values are primed and serialized at once.
+    For a command result, entries of a ``*_find`` result are serialized one
+    at a time, so the memory needed is proportional to the largest entry
+    rather than to the whole response.
+
+    :param object val: Python object structure
+    :param str version: client version
+    :param bool pretty_print: indent and sort JSON (warning: slow!)
+    :param int chunk_size: minimum size of a chunk, except for the last one
+    :param int depth: number of levels serialized item by item
+    :return: iterator of UTF-8 encoded chunks
+    :see: json_encode_binary
+    """
+    if pretty_print:
+        # sort_keys needs the whole structure
+        yield json_encode_binary(val, version, True).encode('utf-8')
+        return
+
+    primer = _JSONPrimer(version)
+    buf = []
+    size = 0
+    for piece in _json_iterencode(primer, val, depth):
+        buf.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield u''.join(buf).encode('utf-8')
+            buf = []
+            size = 0
+    if buf:
+        yield u''.join(buf).encode('utf-8')
+
+
 def _ipa_obj_hook(dct, _iteritems=six.iteritems, _list=list):
     """JSON object hook
 
@@ -524,6 +591,35 @@ class MultiProtocolTransport(Transport):
         connection.putheader("Content-Length", str(len(request_body)))
         connection.endheaders(request_body)
 
+    def parse_response(self, response):
+        # Based on xmlrpc.client.Transport.parse_response. A gzip encoded
+        # response (Accept-Encoding is sent by send_request) is decompressed
+        # while it is read instead of being read into memory first.
+        if response.getheader("Content-Encoding", "") == "gzip":
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            decompressor = None
+
+        p, u = self.getparser()
+
+        while True:
+            data = response.read(65536)
+            if not data:
+                break
+            if decompressor is not None:
+                data = decompressor.decompress(data)
+            if self.verbose:
+                print("body: %r" % (data,))
+            p.feed(data)
+
+        if decompressor is not None:
+            data = decompressor.flush()
+            if data:
+                p.feed(data)
+        p.close()
+
+        return u.close()
+
 
 class LanguageAwareTransport(MultiProtocolTransport):
     """Transport sending Accept-Language header"""
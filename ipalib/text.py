@@ -113,6 +113,9 @@ forms, see `NGettextFactory` and `NGettext`.
 """
 
 import gettext
+import glob
+import os
+import sys
 
 import six
 
@@ -134,6 +137,24 @@ def create_translation(key):
     return translation
 
 
+def load_catalogs(domain='ipa', localedir=None):
+    """
+    Load the message catalogs of all installed languages of *domain*.
+
+    gettext keeps the catalogs it has parsed for the life of the process,
+    so a server process can load them all up front instead of on the first
+    request asking for each language.
+    """
+    if localedir is None:
+        localedir = os.path.join(sys.prefix, 'share', 'locale')
+    pattern = os.path.join(localedir, '*', 'LC_MESSAGES', domain + '.mo')
+    for mofile in sorted(glob.glob(pattern)):
+        # <localedir>/<language>/LC_MESSAGES/<domain>.mo
+        language = mofile.split(os.sep)[-3]
+        gettext.translation(domain, localedir=localedir,
+                            languages=[language], fallback=True)
+
+
 class LazyText(object):
     """
     Base class for deferred translation.
@@ -32,15 +32,19 @@
 from __future__ import print_function
 
 import binascii
+import collections
 import datetime
+import hashlib
 import ipaddress
 import ssl
 import base64
 import re
+import threading
 
 from cryptography import x509 as crypto_x509
 from cryptography import utils as crypto_utils
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.serialization import (
     Encoding, PublicFormat
 )
@@ -51,6 +55,7 @@ from pyasn1_modules import rfc2315, rfc2459
 import six
 
 from ipalib import errors
+from ipapython.dn import DN
 from ipapython.dnsutil import DNSName
 
 if six.PY3:
@@ -75,6 +80,9 @@ EKU_PLACEHOLDER = '1.3.6.1.4.1.3319.6.10.16'
 SAN_UPN = '1.3.6.1.4.1.311.20.2.3'
 SAN_KRB5PRINCIPALNAME = '1.3.6.1.5.2.2'
 
+# Maximum number of certificates kept by get_certificate_data
+CERT_DATA_CACHE_SIZE = 1024
+
 
 @crypto_utils.register_interface(crypto_x509.Certificate)
 class IPACertificate(object):
@@ -678,3 +686,135 @@ def format_datetime(t):
     if t.tzinfo is None:
         t = t.replace(tzinfo=UTC())
     return unicode(t.strftime("%a %b %d %H:%M:%S %Y %Z"))
+
+
+class _lazy(object):
+    """
+    A read-only property computed on first access and then stored in the
+    instance dictionary.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        value = obj.__dict__[self.func.__name__] = self.func(obj)
+        return value
+
+
+class CertificateData(object):
+    """
+    The data of a certificate as shown by the certificate related commands.
+
+    Each field is computed when accessed for the first time. Instances are
+    shared between requests by ``get_certificate_data`` and must be treated
+    as read-only.
+    """
+    def __init__(self, cert):
+        """
+        :param cert: an ``IPACertificate`` object
+        """
+        self.cert = cert
+
+    @_lazy
+    def subject(self):
+        return DN(self.cert.subject)
+
+    @_lazy
+    def issuer(self):
+        return DN(self.cert.issuer)
+
+    @_lazy
+    def serial_number(self):
+        return self.cert.serial_number
+
+    @_lazy
+    def serial_number_hex(self):
+        return u'0x%X' % self.serial_number
+
+    @_lazy
+    def valid_not_before(self):
+        return format_datetime(self.cert.not_valid_before)
+
+    @_lazy
+    def valid_not_after(self):
+        return format_datetime(self.cert.not_valid_after)
+
+    @_lazy
+    def sha1_fingerprint(self):
+        return to_hex_with_colons(self.cert.fingerprint(hashes.SHA1()))
+
+    @_lazy
+    def sha256_fingerprint(self):
+        return to_hex_with_colons(self.cert.fingerprint(hashes.SHA256()))
+
+    @_lazy
+    def san_general_names(self):
+        """SAN general names, with otherNames of known types specialised"""
+        return tuple(process_othernames(self.cert.san_general_names))
+
+
+class _CertificateDataCache(object):
+    """
+    Bounded LRU cache of ``CertificateData`` keyed by the SHA-256 digest of
+    the DER encoded certificate.
+    """
+    def __init__(self, size=CERT_DATA_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._data = collections.OrderedDict()
+
+    def get(self, cert):
+        if isinstance(cert, bytes):
+            der = cert
+            cert = None
+        else:
+            der = cert.public_bytes(Encoding.DER)
+        key = hashlib.sha256(der).digest()
+
+        with self._lock:
+            data = self._data.pop(key, None)
+            if data is not None:
+                self._data[key] = data
+                return data
+
+        if cert is None:
+            cert = load_der_x509_certificate(der)
+        data = CertificateData(cert)
+
+        with self._lock:
+            self._data[key] = data
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_certificate_data_cache = _CertificateDataCache()
+
+
+def get_certificate_data(cert):
+    """
+    Get the data of a certificate from the process-wide cache.
+
+    :param cert: a DER encoded certificate or an ``IPACertificate`` object
+    :returns: a ``CertificateData`` object
+    :raises: ``ValueError`` if unable to load the certificate.
+    """
+    return _certificate_data_cache.get(cert)
+
+
+def load_der_x509_certificate_cached(data):
+    """
+    Load an X.509 certificate in DER format, reusing the object loaded
+    for the same certificate before if it is still cached.
+
+    :returns: a ``IPACertificate`` object.
+    :raises: ``ValueError`` if unable to load the certificate.
+    """
+    return get_certificate_data(data).cert
@@ -105,7 +105,7 @@ def parse_trust_flags(trust_flags):
     if 'p' in trust_flags:
         if 'C' in trust_flags or 'P' in trust_flags or 'T' in trust_flags:
             raise ValueError("cannot be both trusted and not trusted")
-        return False, None, None
+        return TrustFlags(has_key, False, None, None)
     elif 'C' in trust_flags or 'T' in trust_flags:
         if 'P' in trust_flags:
             raise ValueError("cannot be both CA and not CA")
@@ -172,6 +172,20 @@ def unparse_trust_flags(trust_flags):
     return trust_flags
 
 
+def same_trust_flags(trust_flags, other):
+    """
+    Check whether two TrustFlags objects set the same certutil trust flags.
+
+    Whether the certificate has a key is ignored, certutil derives it from
+    the database rather than from the trust flags.
+    """
+    def normalize(flags):
+        flags = TrustFlags(False, *flags[1:])
+        return parse_trust_flags(unparse_trust_flags(flags))
+
+    return normalize(trust_flags) == normalize(other)
+
+
 def verify_kdc_cert_validity(kdc_cert, ca_certs, realm):
     with NamedTemporaryFile() as kdc_file, NamedTemporaryFile() as ca_file:
         kdc_file.write(kdc_cert.public_bytes(x509.Encoding.PEM))
@@ -745,6 +759,18 @@ class NSSDatabase(object):
         cert, _start = find_cert_from_txt(result.output, start=0)
         return cert
 
+    def get_certs(self, nickname):
+        """
+        :param nickname: nickname of the certificates in the NSS database
+        :returns: list of all certificates stored under the nickname
+        """
+        args = ['-L', '-n', nickname, '-a']
+        try:
+            result = self.run_certutil(args, capture_output=True)
+        except ipautil.CalledProcessError:
+            raise RuntimeError("Failed to get %s" % nickname)
+        return x509.load_certificate_list(result.raw_output)
+
     def has_nickname(self, nickname):
         try:
             self.get_cert(nickname)
@@ -793,6 +819,60 @@ class NSSDatabase(object):
     def delete_cert(self, nick):
         self.run_certutil(["-D", "-n", nick])
 
+    def update_certs(self, certs, remove=()):
+        """Bring the database in line with a list of certificates
+
+        Only the differences are applied: certificates which are missing or
+        have different trust flags are added, certificates which are already
+        present with the same trust flags are left untouched. The database is
+        listed once and each nickname in ``certs`` which is already present
+        is read once.
+
+        :param certs: iterable of (cert, nickname, trust_flags) tuples
+        :param remove: nicknames to delete from the database, unless they
+            are also used in ``certs``
+        :returns: list of (nickname, CalledProcessError) tuples for the
+            certutil calls which failed
+        """
+        wanted = collections.OrderedDict()
+        for cert, nickname, trust_flags in certs:
+            wanted.setdefault(nickname, []).append((cert, trust_flags))
+
+        present = collections.defaultdict(list)
+        for nickname, trust_flags in self.list_certs():
+            present[nickname].append(trust_flags)
+
+        failed = []
+        for nickname in remove:
+            if nickname in wanted:
+                continue
+            for _trust_flags in present.get(nickname, ()):
+                try:
+                    self.delete_cert(nickname)
+                except ipautil.CalledProcessError as e:
+                    failed.append((nickname, e))
+                    break
+
+        for nickname, nick_certs in wanted.items():
+            stored = set()
+            if nickname in present:
+                try:
+                    stored = {c.public_bytes(x509.Encoding.DER)
+                              for c in self.get_certs(nickname)}
+                except RuntimeError:
+                    pass
+            for cert, trust_flags in nick_certs:
+                if (cert.public_bytes(x509.Encoding.DER) in stored and
+                        all(same_trust_flags(flags, trust_flags)
+                            for flags in present[nickname])):
+                    continue
+                try:
+                    self.add_cert(cert, nickname, trust_flags)
+                except ipautil.CalledProcessError as e:
+                    failed.append((nickname, e))
+
+        return failed
+
     def verify_server_cert_validity(self, nickname, hostname):
         """Verify a certificate is valid for a SSL server with given hostname
 
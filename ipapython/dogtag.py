@@ -30,6 +30,7 @@ from six.moves.urllib.parse import urlencode
 from ipalib import api, errors
 from ipalib.util import create_https_connection
 from ipalib.errors import NetworkError
+from ipalib.request import timed
 from ipalib.text import _
 # pylint: enable=ipa-forbidden-import
 from ipapython import ipautil
@@ -215,18 +216,21 @@ def _httplib_request(
     ):
         headers['content-type'] = 'application/x-www-form-urlencoded'
 
-    try:
-        conn = connection_factory(host, port, **connection_options)
-        conn.request(method, uri, body=request_body, headers=headers)
-        res = conn.getresponse()
-
-        http_status = res.status
-        http_headers = res.msg
-        http_body = res.read()
-        conn.close()
-    except Exception as e:
-        logger.debug("httplib request failed:", exc_info=True)
-        raise NetworkError(uri=uri, error=str(e))
+    with timed('dogtag', bytes=0) as counters:
+        try:
+            conn = connection_factory(host, port, **connection_options)
+            conn.request(method, uri, body=request_body, headers=headers)
+            res = conn.getresponse()
+
+            http_status = res.status
+            http_headers = res.msg
+            http_body = res.read()
+            conn.close()
+        except Exception as e:
+            logger.debug("httplib request failed:", exc_info=True)
+            raise NetworkError(uri=uri, error=str(e))
+        if counters is not None:
+            counters['bytes'] += len(http_body)
 
     logger.debug('response status %d',    http_status)
     logger.debug('response headers %s',   http_headers)
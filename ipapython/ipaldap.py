@@ -41,11 +41,13 @@ import ldap
 import ldap.sasl
 import ldap.filter
 from ldap.controls import SimplePagedResultsControl
+from ldap.controls.psearch import PersistentSearchControl
 import six
 
 # pylint: disable=ipa-forbidden-import
 from ipalib import errors, x509, _
 from ipalib.constants import LDAP_GENERALIZED_TIME_FORMAT
+from ipalib.request import timed
 # pylint: enable=ipa-forbidden-import
 from ipapython.ipautil import format_netloc, CIDict
 from ipapython.dn import DN
@@ -91,6 +93,19 @@ if six.PY2:
     )
 
 
+def _result_size(res_list):
+    """
+    Return the size of the attribute values of a raw search result.
+    """
+    size = 0
+    for _dn, attrs in res_list:
+        # search references carry a list of URLs instead
+        if isinstance(attrs, dict):
+            for values in attrs.values():
+                size += sum(len(v) for v in values)
+    return size
+
+
 class _ServerSchema(object):
     '''
     Properties of a schema retrieved from an LDAP server.
@@ -709,6 +724,9 @@ class LDAPClient(object):
     time_limit = -1.0   # unlimited
     size_limit = 0      # unlimited
 
+    # maximum number of operations in flight in pipeline()
+    pipeline_window = 64
+
     def __init__(self, ldap_uri, start_tls=False, force_schema_updates=False,
                  no_schema=False, decode_attrs=True, cacert=None,
                  sasl_nocanon=False):
@@ -918,7 +936,7 @@ class LDAPClient(object):
                 elif target_type in (DN, Principal):
                     return target_type(val.decode('utf-8'))
                 elif target_type is crypto_x509.Certificate:
-                    return x509.load_der_x509_certificate(val)
+                    return x509.load_der_x509_certificate_cached(val)
                 else:
                     return target_type(val)
             except Exception:
@@ -1117,7 +1135,7 @@ class LDAPClient(object):
         """
         Perform simple bind operation.
         """
-        with self.error_handler():
+        with timed('ldap_bind'), self.error_handler():
             self._flush_schema()
             assert isinstance(bind_dn, DN)
             bind_dn = str(bind_dn)
@@ -1130,7 +1148,7 @@ class LDAPClient(object):
         Perform SASL bind operation using the SASL EXTERNAL mechanism.
         """
         user_name = pwd.getpwuid(os.geteuid()).pw_name
-        with self.error_handler():
+        with timed('ldap_bind'), self.error_handler():
             auth_tokens = ldap.sasl.external(user_name)
             self._flush_schema()
             self.conn.sasl_interactive_bind_s(
@@ -1140,7 +1158,7 @@ class LDAPClient(object):
         """
         Perform SASL bind operation using the SASL GSSAPI mechanism.
         """
-        with self.error_handler():
+        with timed('ldap_bind'), self.error_handler():
             if self._protocol == 'ldapi':
                 auth_tokens = SASL_GSS_SPNEGO
             else:
@@ -1404,7 +1422,8 @@ class LDAPClient(object):
             paged_search = False
 
         # pass arguments to python-ldap
-        with self.error_handler():
+        with timed('ldap_search', entries=0, bytes=0) as counters, \
+                self.error_handler():
             if six.PY2:
                 filter = self.encode(filter)
                 attrs_list = self.encode(attrs_list)
@@ -1424,6 +1443,8 @@ class LDAPClient(object):
                         objtype, res_list, _res_id, res_ctrls = result
                         if objtype == ldap.RES_SEARCH_RESULT:
                             break
+                        if counters is not None:
+                            counters['bytes'] += _result_size(res_list)
                         res_list = self._convert_result(res_list)
                         if res_list:
                             res.append(res_list[0])
@@ -1469,6 +1490,9 @@ class LDAPClient(object):
                 if not paged_search or not cookie:
                     break
 
+            if counters is not None:
+                counters['entries'] = len(res)
+
         if not res and not truncated:
             raise errors.EmptyResult(reason='no matching entry found')
 
@@ -1516,6 +1540,132 @@ class LDAPClient(object):
 
         return entries[0]
 
+    def wait_for_entry(self, dn, condition, attrs_list=None, timeout=None,
+                       min_interval=0.1, max_interval=1, not_found=None):
+        """
+        Wait until condition(entry) is true for the entry at dn.
+
+        The entry is watched with a persistent search, so a change is
+        noticed as soon as the server reports it. Many entries we wait for
+        (tasks, replication agreements) live in cn=config and their status
+        attributes change without any notification, so while no change
+        arrives the entry is re-read with an exponentially growing interval
+        between min_interval and max_interval seconds. Servers which refuse
+        the persistent search are only polled.
+
+        The condition is called with every version of the entry seen, it is
+        not called while the entry does not exist.
+
+        :param timeout: seconds to wait, unlimited if None or 0
+        :param not_found: seconds the entry may be missing before
+            errors.NotFound is raised, e.g. a grace period for a task to be
+            created; if None, wait for the entry to appear
+        :return: the entry satisfying condition, None on timeout
+        """
+        assert isinstance(dn, DN)
+
+        deadline = None
+        if timeout:
+            deadline = time.time() + timeout
+        interval = min_interval
+        use_psearch = True
+        msgid = None
+        missing_since = [None]
+
+        if attrs_list:
+            attrs_list = [a.lower() for a in set(attrs_list)]
+
+        def read_entry():
+            try:
+                return self.conn.search_s(
+                    str(dn), ldap.SCOPE_BASE, '(objectClass=*)', attrs_list)
+            except ldap.NO_SUCH_OBJECT:
+                return []
+
+        def check_missing():
+            now = time.time()
+            if missing_since[0] is None:
+                missing_since[0] = now
+            if (not_found is not None and
+                    now - missing_since[0] >= not_found):
+                raise errors.NotFound(reason='%s: entry not found' % dn)
+
+        with self.error_handler():
+            if six.PY2:
+                attrs_list = self.encode(attrs_list)
+
+            try:
+                while True:
+                    wait = interval
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.time())
+                        if wait <= 0:
+                            return None
+
+                    entries = []
+                    if use_psearch and msgid is None:
+                        ctrl = PersistentSearchControl(
+                            criticality=True, changesOnly=False,
+                            returnECs=False)
+                        msgid = self.conn.search_ext(
+                            str(dn), ldap.SCOPE_BASE, '(objectClass=*)',
+                            attrs_list, serverctrls=[ctrl])
+
+                    if msgid is not None:
+                        try:
+                            objtype, res_list, _res_id, _ctrls = (
+                                self.conn.result3(msgid, 0, wait))
+                        except ldap.TIMEOUT:
+                            # no notification, re-read the entry
+                            interval = min(interval * 2, max_interval)
+                            res_list = read_entry()
+                            if not res_list:
+                                check_missing()
+                        except ldap.NO_SUCH_OBJECT:
+                            check_missing()
+                            msgid = None
+                            time.sleep(wait)
+                            interval = min(interval * 2, max_interval)
+                            continue
+                        except (ldap.SERVER_DOWN, ldap.INSUFFICIENT_ACCESS):
+                            raise
+                        except ldap.LDAPError as e:
+                            logger.debug(
+                                "Persistent search on %s failed, falling "
+                                "back to polling: %s", dn, e)
+                            msgid = None
+                            use_psearch = False
+                            continue
+                        else:
+                            if objtype == ldap.RES_SEARCH_RESULT:
+                                # the server ended the search
+                                msgid = None
+                                use_psearch = False
+                                continue
+                        entries = self._convert_result(res_list)
+                    else:
+                        entries = self._convert_result(read_entry())
+                        if not entries:
+                            check_missing()
+                        else:
+                            missing_since[0] = None
+                        if not entries or not condition(entries[0]):
+                            time.sleep(wait)
+                            interval = min(interval * 2, max_interval)
+                            continue
+                        return entries[0]
+
+                    for entry in entries:
+                        missing_since[0] = None
+                        if condition(entry):
+                            return entry
+            finally:
+                if msgid is not None:
+                    try:
+                        self.conn.abandon(msgid)
+                    except ldap.LDAPError:
+                        pass
+
     def add_entry(self, entry):
         """Create a new entry.
 
@@ -1524,7 +1674,7 @@ class LDAPClient(object):
         # remove all [] values (python-ldap hates 'em)
         attrs = dict((k, v) for k, v in entry.raw.items() if v)
 
-        with self.error_handler():
+        with timed('ldap_add'), self.error_handler():
             attrs = self.encode(attrs)
             self.conn.add_s(str(entry.dn), list(attrs.items()))
 
@@ -1556,7 +1706,7 @@ class LDAPClient(object):
         else:
             new_superior = str(DN(*new_dn[1:]))
 
-        with self.error_handler():
+        with timed('ldap_modrdn'), self.error_handler():
             self.conn.rename_s(str(dn), str(new_rdn), newsuperior=new_superior,
                                delold=int(del_old))
             time.sleep(.3)  # Give memberOf plugin a chance to work
@@ -1572,7 +1722,7 @@ class LDAPClient(object):
             raise errors.EmptyModlist()
 
         # pass arguments to python-ldap
-        with self.error_handler():
+        with timed('ldap_modify'), self.error_handler():
             modlist = [(a, str(b), self.encode(c))
                        for a, b, c in modlist]
             self.conn.modify_s(str(entry.dn), modlist)
@@ -1586,9 +1736,107 @@ class LDAPClient(object):
         else:
             dn = entry_or_dn.dn
 
-        with self.error_handler():
+        with timed('ldap_delete'), self.error_handler():
             self.conn.delete_s(str(dn))
 
+    def _send_operation(self, operation, target):
+        """
+        Start an asynchronous add, update or delete operation.
+
+        Returns a tuple of the entry whose modlist is reset when the
+        operation succeeds (or None) and the message ID.
+        """
+        if operation == 'add':
+            # remove all [] values (python-ldap hates 'em)
+            attrs = dict((k, v) for k, v in target.raw.items() if v)
+            with self.error_handler():
+                attrs = self.encode(attrs)
+                return target, self.conn.add_ext(
+                    str(target.dn), list(attrs.items()))
+        elif operation == 'update':
+            modlist = target.generate_modlist()
+            if not modlist:
+                raise errors.EmptyModlist()
+            with self.error_handler():
+                modlist = [(a, str(b), self.encode(c))
+                           for a, b, c in modlist]
+                return target, self.conn.modify_ext(str(target.dn), modlist)
+        elif operation == 'delete':
+            if isinstance(target, DN):
+                dn = target
+            else:
+                dn = target.dn
+            with self.error_handler():
+                return None, self.conn.delete_ext(str(dn))
+        raise ValueError("unknown operation %r" % operation)
+
+    def pipeline(self, operations, window=None):
+        """Run many write operations without waiting for each result.
+
+        The operations are sent asynchronously, at most ``window`` of them
+        (``pipeline_window`` by default) are in flight at any time. The
+        server processes the operations of one connection in order, so an
+        operation may depend on an earlier one succeeding.
+
+        :param operations: iterable of (key, operation, target) tuples,
+            operation is 'add', 'update' or 'delete' and target is the
+            entry, or for 'delete' also the DN, as for add_entry(),
+            update_entry() and delete_entry()
+        :param window: maximum number of operations in flight
+        :return: generator yielding a (key, error) tuple for every
+            operation in order, error is None on success, otherwise the
+            PublicError error_handler() maps the LDAP error to
+        """
+        if window is None:
+            window = self.pipeline_window
+        pending = collections.deque()
+
+        def collect():
+            key, dn, entry, msgid = pending.popleft()
+            try:
+                with timed('ldap_pipeline'), self.error_handler():
+                    self.conn.result3(msgid)
+            except errors.PublicError as e:
+                return key, e
+            self._entry_written(dn)
+            if entry is not None:
+                entry.reset_modlist()
+            return key, None
+
+        try:
+            for key, operation, target in operations:
+                if len(pending) >= window:
+                    yield collect()
+                try:
+                    with timed('ldap_pipeline'):
+                        entry, msgid = self._send_operation(operation, target)
+                except errors.PublicError as e:
+                    yield key, e
+                    continue
+                dn = target if isinstance(target, DN) else target.dn
+                pending.append((key, dn, entry, msgid))
+
+            while pending:
+                yield collect()
+        finally:
+            # the caller stopped early, the operations cannot be taken back
+            # but their results must not be left on the connection
+            for _key, dn, _entry, msgid in pending:
+                try:
+                    self.conn.result3(msgid)
+                except ldap.LDAPError:
+                    pass
+                else:
+                    self._entry_written(dn)
+
+    def _entry_written(self, dn):
+        """
+        Called when a write to the entry at dn sent by pipeline() completed.
+
+        Subclasses may override it to drop data cached about the entry.
+        """
+        pass
+
     def entry_exists(self, dn):
         """
         Test whether the given object exists in LDAP.
@@ -1232,6 +1232,13 @@ def backup_config_and_replace_variables(
     return old_values
 
 
+# Waiting for a port or socket starts with short intervals, so that services
+# which come up quickly are noticed immediately, and backs off to at most
+# one connection attempt per second.
+PORT_WAIT_MIN_INTERVAL = 0.1  # seconds
+PORT_WAIT_MAX_INTERVAL = 1  # seconds
+
+
 def wait_for_open_ports(host, ports, timeout=0):
     """
     Wait until the specified port(s) on the remote host are open. Timeout
@@ -1248,6 +1255,7 @@ def wait_for_open_ports(host, ports, timeout=0):
     for port in ports:
         logger.debug('waiting for port: %s', port)
         log_error = True
+        delay = PORT_WAIT_MIN_INTERVAL
         while True:
             port_open = host_port_open(host, port, log_errors=log_error)
             log_error = False  # Log only first err so that the log is readable
@@ -1257,7 +1265,8 @@ def wait_for_open_ports(host, ports, timeout=0):
                 break
             if timeout and time.time() > op_timeout: # timeout exceeded
                 raise socket.timeout("Timeout exceeded")
-            time.sleep(1)
+            time.sleep(delay)
+            delay = min(delay * 2, PORT_WAIT_MAX_INTERVAL)
 
 
 def wait_for_open_socket(socket_name, timeout=0):
@@ -1267,6 +1276,7 @@ def wait_for_open_socket(socket_name, timeout=0):
     """
     timeout = float(timeout)
     op_timeout = time.time() + timeout
+    delay = PORT_WAIT_MIN_INTERVAL
 
     while True:
         try:
@@ -1278,7 +1288,8 @@ def wait_for_open_socket(socket_name, timeout=0):
             if e.errno in (2,111):  # 111: Connection refused, 2: File not found
                 if timeout and time.time() > op_timeout: # timeout exceeded
                     raise e
-                time.sleep(1)
+                time.sleep(delay)
+                delay = min(delay * 2, PORT_WAIT_MAX_INTERVAL)
             else:
                 raise e
 
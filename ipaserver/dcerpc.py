@@ -24,10 +24,12 @@
 
 import logging
 import re
+import threading
 import time
 
 from ipalib import api, _
 from ipalib import errors
+from ipalib.request import context
 from ipapython import ipautil
 from ipapython.dn import DN
 from ipaserver.install import installutils
@@ -80,6 +82,12 @@ and Samba4 python bindings.
 
 logger = logging.getLogger(__name__)
 
+# Lifetime (in seconds) of cached trust topology and AD object lookups.
+# Failed lookups are remembered for a shorter period so that newly created
+# AD objects become visible quickly.
+TRUST_CACHE_TTL = 300
+TRUST_CACHE_NEGATIVE_TTL = 60
+
 
 def is_sid_valid(sid):
     try:
@@ -190,6 +198,133 @@ class ExtendedDNControl(LDAPControl):
         )
 
 
+class TrustInfoCache(object):
+    """
+    Process-wide cache of trusted domain information.
+
+    Holds the trust topology read from IPA LDAP together with name to SID,
+    SID to name and SID to group membership lookups resolved through SSSD
+    or AD domain controllers. Entries expire after TRUST_CACHE_TTL seconds;
+    lookups which failed with NotFound are cached as well, for
+    TRUST_CACHE_NEGATIVE_TTL seconds.
+
+    The lookups are done with the LDAP bind of the current user, whose
+    ACIs decide what is visible, so entries are kept per principal.
+
+    flush() only reaches the current process. Trusts added or removed in
+    another server process are noticed by validate(), which compares the
+    stamp of the trusts subtree with the one seen by the previous check.
+    """
+
+    def __init__(self, ttl=TRUST_CACHE_TTL,
+                 negative_ttl=TRUST_CACHE_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = {}
+        # stamp of the trusts subtree seen by each principal, principals
+        # may not be able to read the same attributes
+        self._stamps = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(kind, key):
+        if isinstance(key, six.string_types):
+            key = key.lower()
+        return (kind, key, getattr(context, 'principal', None))
+
+    def get(self, kind, key):
+        """
+        Return a tuple (found, value) for a cached lookup.
+
+        A cached negative result raises a new exception of the original
+        class with the original arguments.
+        """
+        cache_key = self._make_key(kind, key)
+        with self._lock:
+            item = self._entries.get(cache_key)
+            if item is None:
+                return False, None
+            expires, value, error = item
+            if expires < time.time():
+                del self._entries[cache_key]
+                return False, None
+        if error is not None:
+            error_class, message, kw = error
+            raise error_class(message=message, **kw)
+        return True, value
+
+    def set(self, kind, key, value):
+        with self._lock:
+            self._entries[self._make_key(kind, key)] = (
+                time.time() + self.ttl, value, None)
+
+    def set_negative(self, kind, key, error):
+        # Keep only what is needed to raise the error again, a stored
+        # instance would collect tracebacks each time it is raised
+        message = error.msg if getattr(error, 'forwarded', False) else None
+        error = (type(error), message, dict(error.kw))
+        with self._lock:
+            self._entries[self._make_key(kind, key)] = (
+                time.time() + self.negative_ttl, None, error)
+
+    def lookup(self, kind, key, func, *args, **kwargs):
+        """
+        Return the cached value for (kind, key), calling func on a miss.
+
+        NotFound raised by func is cached as a negative result.
+        """
+        found, value = self.get(kind, key)
+        if found:
+            return value
+        try:
+            value = func(*args, **kwargs)
+        except errors.NotFound as e:
+            self.set_negative(kind, key, e)
+            raise
+        self.set(kind, key, value)
+        return value
+
+    def validate(self, ldap, dn):
+        """
+        Drop all entries if the trusts below dn changed since the previous
+        check.
+
+        The stamp of the subtree is the DN, entryUSN and modifyTimestamp of
+        every entry in it, read with one small search.
+        """
+        principal = getattr(context, 'principal', None)
+        stamp = self._get_stamp(ldap, dn)
+        with self._lock:
+            previous = self._stamps.get(principal)
+            if previous is not None and previous != stamp:
+                logger.debug('trusts changed, flushing TrustInfoCache')
+                self._entries.clear()
+                self._stamps.clear()
+            self._stamps[principal] = stamp
+
+    @staticmethod
+    def _get_stamp(ldap, dn):
+        try:
+            entries, _truncated = ldap.find_entries(
+                None, ['entryusn', 'modifytimestamp'], base_dn=dn,
+                scope=ldap.SCOPE_SUBTREE, time_limit=0, size_limit=0)
+        except errors.NotFound:
+            return frozenset()
+        return frozenset(
+            (e.dn, e.single_value.get('entryusn'),
+             e.single_value.get('modifytimestamp'))
+            for e in entries)
+
+    def flush(self):
+        logger.debug('flushing TrustInfoCache')
+        with self._lock:
+            self._entries.clear()
+            self._stamps.clear()
+
+
+trust_cache = TrustInfoCache()
+
+
 class DomainValidator(object):
     ATTR_FLATNAME = 'ipantflatname'
     ATTR_SID = 'ipantsecurityidentifier'
@@ -209,6 +344,18 @@ class DomainValidator(object):
         self._creds = None
         self._admin_creds = None
         self._parm = None
+        self._trust_cache_checked = False
+
+    def _check_trust_cache(self):
+        """
+        Drop cached trust information if trusts were changed, e.g. by
+        another server process. Checked once per validator.
+        """
+        if not self._trust_cache_checked:
+            cn_trust = DN(('cn', 'ad'), self.api.env.container_trusts,
+                          self.api.env.basedn)
+            trust_cache.validate(self.ldap, cn_trust)
+            self._trust_cache_checked = True
 
     def is_configured(self):
         cn_trust_local = DN(('cn', self.api.env.domain),
@@ -230,7 +377,19 @@ class DomainValidator(object):
         """
         Returns case-insensitive dict of trusted domain tuples
         (flatname, sid, trust_auth_outgoing), keyed by domain name.
+
+        The result is shared through trust_cache and must not be modified.
         """
+        self._check_trust_cache()
+        found, domains = trust_cache.get('topology', self.api.env.basedn)
+        if found:
+            return domains
+        domains = self.__get_trusted_domains()
+        if domains:
+            trust_cache.set('topology', self.api.env.basedn, domains)
+        return domains
+
+    def __get_trusted_domains(self):
         cn_trust = DN(('cn', 'ad'), self.api.env.container_trusts,
                       self.api.env.basedn)
 
@@ -402,6 +561,13 @@ class DomainValidator(object):
 
     def get_trusted_domain_object_sid(self, object_name,
                                       fallback_to_ldap=True):
+        self._check_trust_cache()
+        kind = 'name_to_sid' if fallback_to_ldap else 'name_to_sid_sssd'
+        return trust_cache.lookup(kind, object_name,
+                                  self.__get_trusted_domain_object_sid,
+                                  object_name, fallback_to_ldap)
+
+    def __get_trusted_domain_object_sid(self, object_name, fallback_to_ldap):
         result = pysss_nss_idmap.getsidbyname(object_name)
         if object_name in result and \
            (pysss_nss_idmap.SID_KEY in result[object_name]):
@@ -474,6 +640,12 @@ class DomainValidator(object):
         if not self.is_trusted_sid_valid(sid):
             raise errors.ValidationError(name='sid', error='SID is not valid')
 
+        self._check_trust_cache()
+        return trust_cache.lookup('sid_to_name', sid,
+                                  self.__get_trusted_domain_object_from_sid,
+                                  sid)
+
+    def __get_trusted_domain_object_from_sid(self, sid):
         # Use pysss_nss_idmap to obtain the name
         result = pysss_nss_idmap.getnamebysid(sid).get(sid)
 
@@ -516,6 +688,62 @@ class DomainValidator(object):
 
         return unicode(object_name)
 
+    def get_trusted_domain_objects_from_sids(self, sids):
+        """
+        Resolve a list of SIDs of trusted domain objects at once.
+
+        Returns a dict mapping each resolved SID to a tuple (name, type),
+        where type is 'user', 'group' or 'both' as returned by
+        get_trusted_domain_object_type(). SIDs which are not valid or could
+        not be resolved are left out of the result.
+
+        SSSD is queried for all uncached SIDs in a single call; AD DC LDAP is
+        only searched for the SIDs SSSD could not resolve.
+        """
+        self._check_trust_cache()
+        result = {}
+        unresolved = []
+        for sid in set(sids):
+            if not self.is_trusted_sid_valid(sid):
+                continue
+            try:
+                found, value = trust_cache.get('sid_to_object', sid)
+            except errors.NotFound:
+                continue
+            if found:
+                result[sid] = value
+            else:
+                unresolved.append(sid)
+
+        if not unresolved:
+            return result
+
+        valid_types = (pysss_nss_idmap.ID_USER,
+                       pysss_nss_idmap.ID_GROUP,
+                       pysss_nss_idmap.ID_BOTH)
+
+        sssd_result = pysss_nss_idmap.getnamebysid(unresolved)
+        for sid in unresolved:
+            info = sssd_result.get(sid) or {}
+            object_type = info.get(pysss_nss_idmap.TYPE_KEY)
+            if object_type in valid_types:
+                value = (info.get(pysss_nss_idmap.NAME_KEY),
+                         pysss_type_key_translation_dict[object_type])
+            else:
+                # Fall back to AD DC LDAP for this SID
+                try:
+                    name = self.get_trusted_domain_object_from_sid(sid)
+                except errors.NotFound as e:
+                    trust_cache.set_negative('sid_to_object', sid, e)
+                    continue
+                except errors.ValidationError:
+                    continue
+                value = (name, self.get_trusted_domain_object_type(name))
+            trust_cache.set('sid_to_object', sid, value)
+            result[sid] = value
+
+        return result
+
     def __get_trusted_domain_user_and_groups(self, object_name):
         """
         Returns a tuple with user SID and a list of SIDs of all groups he is
@@ -592,6 +820,13 @@ class DomainValidator(object):
             - List of group SIDs does not contain group memberships outside
               of the trusted domain
         """
+        self._check_trust_cache()
+        object_sid, group_sids = trust_cache.lookup(
+            'user_and_groups', object_name,
+            self.__resolve_trusted_domain_user_and_groups, object_name)
+        return (object_sid, list(group_sids))
+
+    def __resolve_trusted_domain_user_and_groups(self, object_name):
         group_sids = None
         group_list = None
         object_sid = None
@@ -454,6 +454,9 @@ class CertDB(object):
     def add_cert(self, cert, nick, flags):
         self.nssdb.add_cert(cert, nick, flags)
 
+    def update_certs(self, certs, remove=()):
+        return self.nssdb.update_certs(certs, remove)
+
     def import_cert(self, cert_fname, nickname):
         """
         Load a certificate from a PEM file and add minimal trust.
@@ -39,6 +39,7 @@ from cryptography.hazmat.backends import default_backend
 
 from ipaplatform.paths import paths
 from ipapython import admintool
+from ipapython.dn import DN
 from ipalib import api, errors
 from ipaserver.plugins.ldap2 import AUTOBIND_DISABLED
 
@@ -49,6 +50,9 @@ if six.PY3:
 logger = logging.getLogger(__name__)
 
 
+PSKC_KEYPACKAGE = "{urn:ietf:params:xml:ns:keyprov:pskc}KeyPackage"
+
+
 class ValidationError(Exception):
     pass
 
@@ -457,14 +461,24 @@ class PSKCDocument(object):
     def __init__(self, filename):
         self.__keyname = None
         self.__decryptor = None
-        self.__doc = etree.parse(filename)
-        self.__mkey = fetch(self.__doc, "./pskc:MACMethod/pskc:MACKey")
-        self.__algo = fetch(self.__doc, "./pskc:MACMethod/@Algorithm", convertHMACType)
 
-        self.__keypackages = fetchAll(self.__doc, "./pskc:KeyPackage")
-        if not self.__keypackages:
+        # Key packages are parsed incrementally as they are consumed, so
+        # that only the packages which were not imported are kept in memory.
+        # The header elements precede them, they are complete as soon as
+        # the first key package is.
+        self.__parser = etree.iterparse(
+            filename, events=('end',), tag=PSKC_KEYPACKAGE)
+        self.__keypackages = []
+        for _event, keypackage in self.__parser:
+            self.__doc = keypackage.getparent()
+            self.__keypackages.append(keypackage)
+            break
+        else:
             raise ValueError("PSKC file is invalid!")
 
+        self.__mkey = fetch(self.__doc, "./pskc:MACMethod/pskc:MACKey")
+        self.__algo = fetch(self.__doc, "./pskc:MACMethod/@Algorithm", convertHMACType)
+
         self.__enckey = fetch(self.__doc, "./pskc:EncryptionKey")
         if self.__enckey is not None:
             # Check for x509 key.
@@ -496,12 +510,30 @@ class PSKCDocument(object):
             )
             self.__decryptor = XMLDecryptor(key, tmp)
 
+    def __prune(self):
+        # Forget key packages which were removed from the document.
+        self.__keypackages = [
+            kp for kp in self.__keypackages if kp.getparent() is not None]
+
     def getKeyPackages(self):
-        for kp in self.__keypackages:
+        self.__prune()
+        for kp in list(self.__keypackages):
+            yield PSKCKeyPackage(kp, self.__decryptor)
+
+        pruned = len(self.__keypackages)
+        for _event, kp in self.__parser:
+            self.__keypackages.append(kp)
             yield PSKCKeyPackage(kp, self.__decryptor)
 
+            if len(self.__keypackages) > 2 * pruned + 1000:
+                self.__prune()
+                pruned = len(self.__keypackages)
+
     def save(self, dest):
-        self.__doc.write(dest)
+        # Key packages which were not consumed yet must be saved too.
+        for _event in self.__parser:
+            pass
+        self.__doc.getroottree().write(dest)
 
 
 class OTPTokenImport(admintool.AdminTool):
@@ -515,6 +547,9 @@ class OTPTokenImport(admintool.AdminTool):
 
         parser.add_option("-k", "--keyfile", dest="keyfile",
                           help="File containing the key used to decrypt token secrets")
+        parser.add_option("--batch-size", dest="batch_size", type="int",
+                          default=100,
+                          help="Number of tokens processed together")
 
     def validate_options(self):
         super(OTPTokenImport, self).validate_options()
@@ -541,6 +576,80 @@ class OTPTokenImport(admintool.AdminTool):
             with open(keyfile) as f:
                 self.doc.setKey(f.read())
 
+        if self.options.batch_size < 1:
+            raise admintool.ScriptError("Batch size must be positive!")
+
+    def make_entry(self, keypkg, user):
+        """
+        Build the LDAP entry of a token the way otptoken_add does, without
+        the per-token owner and issuer lookups.
+        """
+        return api.Command.otptoken_add.make_entry(
+            api.Backend.ldap2, user, keypkg.id, no_qrcode=True,
+            **keypkg.options)
+
+    def get_user(self):
+        """
+        Tokens are owned and managed by the user running the import, look
+        the user up once for all of them.
+        """
+        result = api.Command.user_find(whoami=True, no_members=True)['result']
+        if result:
+            return result[0]
+        return None
+
+    def get_existing(self, entries):
+        """Return unique IDs of the tokens which are already present."""
+        ldap = api.Backend.ldap2
+        ids = [entry.single_value['ipatokenuniqueid'] for entry in entries]
+        if not ids:
+            return set()
+        try:
+            existing, _truncated = ldap.find_entries(
+                ldap.make_filter_from_attr('ipatokenuniqueid', ids),
+                ['ipatokenuniqueid'],
+                DN(api.env.container_otp, api.env.basedn),
+                ldap.SCOPE_ONELEVEL,
+                size_limit=0, time_limit=0)
+        except errors.EmptyResult:
+            return set()
+        return set(e.single_value['ipatokenuniqueid'] for e in existing)
+
+    def import_batch(self, batch, user):
+        """
+        Import a batch of key packages, successfully added and already
+        present ones are removed from the document. Returns the number of
+        tokens added.
+        """
+        entries = []
+        for keypkg in batch:
+            try:
+                entries.append((keypkg, self.make_entry(keypkg, user)))
+            except Exception as e:
+                logger.warning("Error adding token: %s", e)
+
+        existing = self.get_existing([entry for _keypkg, entry in entries])
+
+        operations = []
+        for keypkg, entry in entries:
+            if entry.single_value['ipatokenuniqueid'] in existing:
+                logger.warning("Error adding token: %s already exists",
+                               keypkg.id)
+                keypkg.remove()
+                continue
+            operations.append((keypkg, 'add', entry))
+
+        added = 0
+        for keypkg, error in api.Backend.ldap2.pipeline(operations):
+            if error is not None:
+                logger.warning("Error adding token: %s", error)
+            else:
+                logger.info("Added token: %s", keypkg.id)
+                keypkg.remove()
+                added += 1
+
+        return added
+
     def run(self):
         api.bootstrap(in_server=True, confdir=paths.ETC_IPA)
         api.finalize()
@@ -551,18 +660,34 @@ class OTPTokenImport(admintool.AdminTool):
         except (gssapi.exceptions.GSSError, errors.ACIError):
             raise admintool.ScriptError("Unable to connect to LDAP! Did you kinit?")
 
+        total = 0
+        added = 0
         try:
+            user = self.get_user()
+
             # Parse tokens
+            batch = []
             for keypkg in self.doc.getKeyPackages():
-                try:
-                    api.Command.otptoken_add(keypkg.id, no_qrcode=True, **keypkg.options)
-                except Exception as e:
-                    logger.warning("Error adding token: %s", e)
-                else:
-                    logger.info("Added token: %s", keypkg.id)
-                    keypkg.remove()
+                batch.append(keypkg)
+                if len(batch) >= self.options.batch_size:
+                    added += self.import_batch(batch, user)
+                    total += len(batch)
+                    batch = []
+                    logger.info("Processed %d tokens, %d added",
+                                total, added)
+            if batch:
+                added += self.import_batch(batch, user)
+                total += len(batch)
         finally:
             api.Backend.ldap2.disconnect()
 
-        # Write out the XML file without the tokens that succeeded.
-        self.doc.save(self.output)
+            # Write out the XML file without the tokens that succeeded, so
+            # that it can be used to resume an interrupted import.
+            try:
+                self.doc.save(self.output)
+            except etree.XMLSyntaxError as e:
+                # The import was already stopped by the same error, don't
+                # hide it.
+                logger.error("Unable to write %s: %s", self.output, e)
+
+        logger.info("Processed %d tokens, %d added", total, added)
@@ -17,13 +17,18 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import base64
+import gzip
 import logging
 import os
 import shutil
+import subprocess
+import sys
+import tarfile
 import tempfile
+import threading
 import time
 import pwd
-import ldif
 import itertools
 
 import six
@@ -106,31 +111,113 @@ def decrypt_file(tmpdir, filename, keyring):
     return dest
 
 
-class RemoveRUVParser(ldif.LDIFParser):
-    def __init__(self, input_file, writer):
-        ldif.LDIFParser.__init__(self, input_file)
-        self.writer = writer
-
-    def handle(self, dn, entry):
-        objectclass = None
-        nsuniqueid = None
-
-        for name, value in entry.items():
-            name = name.lower()
-            if name == 'objectclass':
-                objectclass = [x.lower() for x in value]
-            elif name == 'nsuniqueid':
-                nsuniqueid = [x.lower() for x in value]
-
-        if (
-            objectclass and nsuniqueid and
-            b'nstombstone' in objectclass and
-            b'ffffffff-ffffffff-ffffffff-ffffffff' in nsuniqueid
-        ):
-            logger.debug("Removing RUV entry %s", dn)
-            return
+RUV_NSUNIQUEID = b'ffffffff-ffffffff-ffffffff-ffffffff'
+
+# Minimum number of seconds between two progress messages
+PROGRESS_INTERVAL = 10
+
 
-        self.writer.unparse(dn, entry)
+def _ldif_attributes(record):
+    """
+    Yield the (lowercased name, value) pairs of the raw lines of an LDIF
+    record.
+    """
+    lines = []
+    for line in record:
+        line = line.rstrip(b'\r\n')
+        if line.startswith(b' ') and lines:
+            lines[-1] += line[1:]
+        else:
+            lines.append(line)
+
+    for line in lines:
+        if line.startswith(b'#'):
+            continue
+        name, _sep, value = line.partition(b':')
+        if value.startswith(b':'):
+            value = base64.b64decode(value[1:].strip())
+        else:
+            value = value.strip()
+        yield name.lower(), value
+
+
+def is_ruv_entry(record):
+    """
+    Check whether the raw lines of an LDIF record are the replica update
+    vector (RUV) tombstone entry.
+    """
+    if not any(line[:11].lower() == b'nsuniqueid:' for line in record):
+        return False
+
+    objectclass = set()
+    nsuniqueid = set()
+    for name, value in _ldif_attributes(record):
+        if name == b'objectclass':
+            objectclass.add(value.lower())
+        elif name == b'nsuniqueid':
+            nsuniqueid.add(value.lower())
+
+    return b'nstombstone' in objectclass and RUV_NSUNIQUEID in nsuniqueid
+
+
+def remove_ruv_entries(in_file, out_file, progress=None):
+    """
+    Copy an LDIF stream without the RUV entries.
+
+    The entries are copied verbatim record by record, so only one entry
+    is held in memory at any time.
+
+    :param progress: optional callable called with the number of bytes
+        read so far after each record
+    :return: the number of entries removed
+    """
+    removed = 0
+    nbytes = 0
+    record = []
+    for line in itertools.chain(in_file, [b'']):
+        nbytes += len(line)
+        if line.rstrip(b'\r\n'):
+            record.append(line)
+            continue
+        if is_ruv_entry(record):
+            logger.debug("Removing RUV entry %s",
+                         dict(_ldif_attributes(record)).get(b'dn'))
+            removed += 1
+            # keep the LDIF version line if it belongs to the record
+            record = [x for x in record if x[:8].lower() == b'version:']
+            line = b'\n' if record else b''
+        out_file.writelines(record)
+        out_file.write(line)
+        record = []
+        if progress is not None:
+            progress(nbytes)
+    return removed
+
+
+def ldif_member_name(member):
+    """
+    Return the name of a LDIF file in the top directory of the backup
+    archive, None for any other archive member.
+    """
+    name = os.path.normpath(member.name)
+    if (member.isfile() and os.path.dirname(name) == '' and
+            name.endswith('.ldif')):
+        return name
+    return None
+
+
+class TeeReader(object):
+    """
+    File-like object passing on everything read from it to out_file.
+    """
+    def __init__(self, in_file, out_file):
+        self.in_file = in_file
+        self.out_file = out_file
+
+    def read(self, size=-1):
+        data = self.in_file.read(size)
+        self.out_file.write(data)
+        return data
 
 
 class Restore(admintool.AdminTool):
@@ -152,6 +239,8 @@ class Restore(admintool.AdminTool):
     def __init__(self, options, args):
         super(Restore, self).__init__(options, args)
         self._conn = None
+        self._ldif2db_lock = threading.Lock()
+        self.ldif_files = {}
 
     @classmethod
     def add_options(cls, parser):
@@ -333,8 +422,7 @@ class Restore(admintool.AdminTool):
             for instance in self.instances:
                 for backend in self.backends:
                     database = (instance, backend)
-                    ldiffile = os.path.join(self.dir, '%s-%s.ldif' % database)
-                    if os.path.exists(ldiffile):
+                    if '%s-%s.ldif' % database in self.ldif_files:
                         databases.append(database)
 
             if options.instance:
@@ -398,8 +486,7 @@ class Restore(admintool.AdminTool):
 
             # Always restore the data from ldif
             # We need to restore both userRoot and ipaca.
-            for instance, backend in databases:
-                self.ldif2db(instance, backend, online=options.online)
+            self.restore_databases(databases, online=options.online)
 
             if restore_type != 'FULL':
                 if not options.online:
@@ -532,39 +619,104 @@ class Restore(admintool.AdminTool):
                     repl.disable_agreement(host)
 
 
-    def ldif2db(self, instance, backend, online=True):
+    def restore_databases(self, databases, online=True):
         '''
-        Restore a LDIF backup of the data in this instance.
+        Restore the LDIF backups of the given (instance, backend) pairs.
 
-        If executed online create a task and wait for it to complete.
+        The backup archive is read once. Every LDIF file is streamed into
+        its import file as the archive is read, and the import of a backend
+        starts while the following LDIF files are still being read.
         '''
-        logger.info('Restoring from %s in %s', backend, instance)
+        if online:
+            # create the shared connection before the threads need it
+            self.get_connection()
 
-        cn = time.strftime('import_%Y_%m_%d_%H_%M_%S')
-        dn = DN(('cn', cn), ('cn', 'import'), ('cn', 'tasks'), ('cn', 'config'))
+        wanted = dict(
+            ('%s-%s.ldif' % database, database) for database in databases)
+        failures = []
+        threads = []
+
+        def restore(instance, backend, ldiffile):
+            try:
+                self.ldif2db(instance, backend, ldiffile, online=online)
+            except Exception:
+                failures.append(sys.exc_info())
 
+        try:
+            with tarfile.open(self.archive, 'r|*') as tar:
+                for member in tar:
+                    database = wanted.pop(ldif_member_name(member), None)
+                    if database is None:
+                        continue
+                    ldiffile = self.write_import_ldif(
+                        database[0], database[1], tar.extractfile(member),
+                        member.size)
+                    thread = threading.Thread(
+                        target=restore, args=database + (ldiffile,),
+                        name='ldif2db-%s-%s' % database)
+                    thread.start()
+                    threads.append(thread)
+                    if not wanted:
+                        # the rest of the archive is not needed
+                        break
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if wanted:
+            raise admintool.ScriptError(
+                '%s not found in backup' % ', '.join(sorted(wanted)))
+        if failures:
+            six.reraise(*failures[0])
+
+    def write_import_ldif(self, instance, backend, in_file, size):
+        '''
+        Write the LDIF backup of a backend read from in_file to the file
+        imported by ldif2db, leaving out the RUV entries.
+
+        :return: the name of the import file
+        '''
         ldifdir = paths.SLAPD_INSTANCE_LDIF_DIR_TEMPLATE % instance
         ldifname = '%s-%s.ldif' % (instance, backend)
         ldiffile = os.path.join(ldifdir, ldifname)
-        srcldiffile = os.path.join(self.dir, ldifname)
 
+        pent = pwd.getpwnam(constants.DS_USER)
         if not os.path.exists(ldifdir):
-            pent = pwd.getpwnam(constants.DS_USER)
             os.mkdir(ldifdir)
             os.chmod(ldifdir, 0o770)
             os.chown(ldifdir, pent.pw_uid, pent.pw_gid)
 
+        last = [time.time()]
+
+        def progress(nbytes):
+            now = time.time()
+            if now - last[0] >= PROGRESS_INTERVAL:
+                last[0] = now
+                logger.info("Processing %s: %d%%", ldifname,
+                            nbytes * 100 // max(size, 1))
+
         ipautil.backup_file(ldiffile)
-        with open(ldiffile, 'w') as out_file:
-            ldif_writer = ldif.LDIFWriter(out_file)
-            with open(srcldiffile, 'rb') as in_file:
-                ldif_parser = RemoveRUVParser(in_file, ldif_writer)
-                ldif_parser.parse()
+        with open(ldiffile, 'wb') as out_file:
+            removed = remove_ruv_entries(in_file, out_file, progress)
+        logger.debug("Removed %d RUV entries from %s", removed, ldifname)
 
         # Make sure the modified ldiffile is owned by DS_USER
-        pent = pwd.getpwnam(constants.DS_USER)
         os.chown(ldiffile, pent.pw_uid, pent.pw_gid)
 
+        return ldiffile
+
+    def ldif2db(self, instance, backend, ldiffile, online=True):
+        '''
+        Restore a LDIF backup of the data in this instance from ldiffile
+        written by write_import_ldif.
+
+        If executed online create a task and wait for it to complete.
+        '''
+        logger.info('Restoring from %s in %s', backend, instance)
+
+        cn = '%s_%s' % (time.strftime('import_%Y_%m_%d_%H_%M_%S'), backend)
+        dn = DN(('cn', cn), ('cn', 'import'), ('cn', 'tasks'), ('cn', 'config'))
+
         if online:
             conn = self.get_connection()
             ent = conn.make_entry(
@@ -584,7 +736,7 @@ class Restore(admintool.AdminTool):
                 logger.error("Unable to bind to LDAP server: %s", e)
                 return
 
-            logger.info("Waiting for LDIF to finish")
+            logger.info("Waiting for LDIF import of %s to finish", backend)
             wait_for_task(conn, dn)
         else:
             try:
@@ -596,10 +748,13 @@ class Restore(admintool.AdminTool):
                     '-Z', instance,
                     '-i', ldiffile,
                     '-n', backend]
-            result = run(args, raiseonerr=False)
+            # offline imports lock the whole instance, run one at a time
+            with self._ldif2db_lock:
+                result = run(args, raiseonerr=False)
             if result.returncode != 0:
                 logger.critical("ldif2db failed: %s", result.error_log)
 
+        logger.info('Restored %s in %s', backend, instance)
 
     def bak2db(self, instance, backend, online=True):
         '''
@@ -770,22 +925,61 @@ class Restore(admintool.AdminTool):
 
         os.chdir(self.dir)
 
+        # The archive is decompressed here and tar extracts everything but
+        # the LDIF files from the decompressed stream, which is read here as
+        # well to record the LDIF files in the same pass. The LDIF files are
+        # streamed straight into the import files by restore_databases.
         args = ['tar',
                 '--xattrs',
                 '--selinux',
-                '-xzf',
-                filename,
+                '--exclude=*.ldif',
+                '-xf',
+                '-',
                 '.'
                ]
-        run(args)
+        self.ldif_files = {}
+        read_error = None
+        with tempfile.TemporaryFile() as error_log:
+            tar_proc = subprocess.Popen(
+                args, stdin=subprocess.PIPE, stderr=error_log)
+            try:
+                with gzip.open(filename, 'rb') as archive:
+                    tee = TeeReader(archive, tar_proc.stdin)
+                    with tarfile.open(fileobj=tee, mode='r|') as tar:
+                        for member in tar:
+                            name = ldif_member_name(member)
+                            if name is not None:
+                                self.ldif_files[name] = member.size
+                    # pass on the padding after the end of the archive
+                    while tee.read(tarfile.RECORDSIZE):
+                        pass
+            except (IOError, OSError, tarfile.TarError) as e:
+                # tar's own error is more useful if it exited early
+                read_error = e
+            finally:
+                try:
+                    tar_proc.stdin.close()
+                except (IOError, OSError):
+                    pass
+                returncode = tar_proc.wait()
+
+            if returncode != 0:
+                error_log.seek(0)
+                raise admintool.ScriptError(
+                    'tar returned non-zero code %d: %s' % (
+                        returncode,
+                        error_log.read().decode('utf-8', 'replace')))
+        if read_error is not None:
+            raise admintool.ScriptError(
+                'Unable to read %s: %s' % (filename, read_error))
 
         pent = pwd.getpwnam(constants.DS_USER)
         os.chown(self.top_dir, pent.pw_uid, pent.pw_gid)
         recursive_chown(self.dir, pent.pw_uid, pent.pw_gid)
 
-        if encrypt:
-            # We can remove the decoded tarball
-            os.unlink(filename)
+        # The decrypted archive is kept in the temporary directory until
+        # the LDIF files are restored.
+        self.archive = filename
 
     def __create_dogtag_log_dirs(self):
         """
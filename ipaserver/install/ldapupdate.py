@@ -562,35 +562,31 @@ class LDAPUpdate(object):
 
         assert isinstance(dn, DN)
 
-        # Pause for a moment to give the task time to be created
-        time.sleep(1)
-
         attrlist = ['nstaskstatus', 'nstaskexitcode']
-        entry = None
-
-        while True:
-            try:
-                entry = self.conn.get_entry(dn, attrlist)
-            except errors.NotFound as e:
-                logger.error("Task not found: %s", dn)
-                return
-            except errors.DatabaseError as e:
-                logger.error("Task lookup failure %s", e)
-                return
 
+        def finished(entry):
             status = entry.single_value.get('nstaskstatus')
             if status is None:
                 # task doesn't have a status yet
-                time.sleep(1)
-                continue
-
+                return False
             if status.lower().find("finished") > -1:
-                logger.debug("Indexing finished")
-                break
-
+                return True
             logger.debug("Indexing in progress")
-            time.sleep(1)
+            return False
+
+        try:
+            # give the task a moment to be created
+            entry = self.conn.wait_for_entry(dn, finished, attrlist,
+                                             not_found=1)
+        except errors.NotFound:
+            logger.error("Task not found: %s", dn)
+            return
+        except errors.DatabaseError as e:
+            logger.error("Task lookup failure %s", e)
+            return
 
+        if entry is not None:
+            logger.debug("Indexing finished")
         return
 
     def _create_default_entry(self, dn, default):
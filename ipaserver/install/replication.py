@@ -149,48 +149,42 @@ def wait_for_task(conn, dn):
     attrlist = [
         'nsTaskLog', 'nsTaskStatus', 'nsTaskExitCode', 'nsTaskCurrentItem',
         'nsTaskTotalItems']
-    while True:
-        entry = conn.get_entry(dn, attrlist)
-        if entry.single_value.get('nsTaskExitCode'):
-            exit_code = int(entry.single_value['nsTaskExitCode'])
-            break
-        time.sleep(1)
-    return exit_code
+    # raises NotFound if the task does not exist (anymore)
+    entry = conn.wait_for_entry(
+        dn, lambda e: e.single_value.get('nsTaskExitCode'), attrlist,
+        not_found=0)
+    return int(entry.single_value['nsTaskExitCode'])
 
 
 def wait_for_entry(connection, dn, timeout=7200, attr='', quiet=True):
     """Wait for entry and/or attr to show up"""
 
-    filter = "(objectclass=*)"
     attrlist = []
     if attr:
-        filter = "(%s=*)" % attr
         attrlist.append(attr)
-    timeout += int(time.time())
+
+    def condition(entry):
+        if not attr or entry.get(attr):
+            return True
+        if not quiet:
+            sys.stdout.write(".")
+            sys.stdout.flush()
+        return False
 
     if not quiet:
         sys.stdout.write("Waiting for %s %s:%s " % (connection, dn, attr))
         sys.stdout.flush()
-    entry = None
-    while not entry and int(time.time()) < timeout:
-        try:
-            [entry] = connection.get_entries(
-                dn, ldap.SCOPE_BASE, filter, attrlist)
-        except errors.NotFound:
-            pass  # no entry yet
-        except Exception as e:  # badness
-            logger.error("Error reading entry %s: %s", dn, e)
-            raise
-        if not entry:
-            if not quiet:
-                sys.stdout.write(".")
-                sys.stdout.flush()
-            time.sleep(1)
-
-    if not entry and int(time.time()) > timeout:
+    try:
+        entry = connection.wait_for_entry(
+            dn, condition, attrlist or None, timeout=timeout)
+    except Exception as e:  # badness
+        logger.error("Error reading entry %s: %s", dn, e)
+        raise
+
+    if not entry:
         raise errors.NotFound(
             reason="wait_for_entry timeout for %s for %s" % (connection, dn))
-    elif entry and not quiet:
+    elif not quiet:
         logger.error("The waited for entry is: %s", entry)
 
 
@@ -895,15 +889,22 @@ class ReplicationManager(object):
         except Exception as e:
             logger.debug("Failed to remove referral value: %s", str(e))
 
-    def check_repl_init(self, conn, agmtdn, start):
+    REPL_INIT_ATTRS = ['cn', 'nsds5BeginReplicaRefresh',
+                       'nsds5replicaUpdateInProgress',
+                       'nsds5ReplicaLastInitStatus',
+                       'nsds5ReplicaLastInitStart',
+                       'nsds5ReplicaLastInitEnd']
+
+    REPL_UPDATE_ATTRS = ['cn', 'nsds5replicaUpdateInProgress',
+                         'nsds5ReplicaLastUpdateStatus',
+                         'nsds5ReplicaLastUpdateStart',
+                         'nsds5ReplicaLastUpdateEnd']
+
+    def check_repl_init(self, conn, agmtdn, start, entry=None):
         done = False
         hasError = 0
-        attrlist = ['cn', 'nsds5BeginReplicaRefresh',
-                    'nsds5replicaUpdateInProgress',
-                    'nsds5ReplicaLastInitStatus',
-                    'nsds5ReplicaLastInitStart',
-                    'nsds5ReplicaLastInitEnd']
-        entry = conn.get_entry(agmtdn, attrlist)
+        if entry is None:
+            entry = conn.get_entry(agmtdn, self.REPL_INIT_ATTRS)
         if not entry:
             print("Error reading status from agreement", agmtdn)
             hasError = 1
@@ -938,14 +939,12 @@ class ReplicationManager(object):
 
         return done, hasError
 
-    def check_repl_update(self, conn, agmtdn):
+    def check_repl_update(self, conn, agmtdn, entry=None):
         done = False
         hasError = 0
         error_message = ''
-        attrlist = ['cn', 'nsds5replicaUpdateInProgress',
-                    'nsds5ReplicaLastUpdateStatus', 'nsds5ReplicaLastUpdateStart',
-                    'nsds5ReplicaLastUpdateEnd']
-        entry = conn.get_entry(agmtdn, attrlist)
+        if entry is None:
+            entry = conn.get_entry(agmtdn, self.REPL_UPDATE_ATTRS)
         if not entry:
             print("Error reading status from agreement", agmtdn)
             hasError = 1
@@ -977,27 +976,35 @@ class ReplicationManager(object):
         return done, hasError, error_message
 
     def wait_for_repl_init(self, conn, agmtdn):
-        done = False
-        haserror = 0
         start = datetime.datetime.now()
-        while not done and not haserror:
-            time.sleep(1)  # give it a few seconds to get going
-            done, haserror = self.check_repl_init(conn, agmtdn, start)
+        status = [0]
+
+        def check(entry):
+            done, haserror = self.check_repl_init(conn, agmtdn, start, entry)
+            status[0] = haserror
+            return done or haserror
+
+        time.sleep(1)  # give it a moment to get going
+        conn.wait_for_entry(agmtdn, check, self.REPL_INIT_ATTRS, not_found=0)
         print("")
-        return haserror
+        return status[0]
 
     def wait_for_repl_update(self, conn, agmtdn, maxtries=600):
-        done = False
-        haserror = 0
-        error_message = ''
-        while not done and not haserror and maxtries > 0:
-            time.sleep(1)  # give it a few seconds to get going
-            done, haserror, error_message = self.check_repl_update(conn, agmtdn)
-            maxtries -= 1
-        if maxtries == 0: # too many tries
+        status = [0, '']
+
+        def check(entry):
+            done, haserror, error_message = self.check_repl_update(
+                conn, agmtdn, entry)
+            status[:] = [haserror, error_message]
+            return done or haserror
+
+        time.sleep(1)  # give it a moment to get going
+        # maxtries used to be the number of checks done a second apart
+        if not conn.wait_for_entry(agmtdn, check, self.REPL_UPDATE_ATTRS,
+                                   timeout=maxtries, not_found=0):
             print("Error: timeout: could not determine agreement status: please check your directory server logs for possible errors")
-            haserror = 1
-        return haserror, error_message
+            status[0] = 1
+        return status[0], status[1]
 
     def start_replication(self, conn, hostname=None, master=None):
         print("Starting replication, please wait until this has completed.")
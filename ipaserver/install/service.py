@@ -25,6 +25,9 @@ import socket
 import datetime
 import traceback
 import tempfile
+import threading
+import time
+import collections
 
 import six
 
@@ -60,6 +63,93 @@ SERVICE_LIST = {
     'DNSKeySync': ('ipa-dnskeysyncd', 110),
 }
 
+# Start-up dependencies between the *nix services from SERVICE_LIST. A
+# service is started only after all services it depends on are up and it is
+# stopped before any of them. Services not listed here depend only on the
+# Directory Server, which is always started first and stopped last.
+SERVICE_DEPENDENCIES = {
+    'kadmin': ('krb5kdc',),
+    'httpd': ('krb5kdc',),
+    'winbind': ('smb',),
+    'ipa-dnskeysyncd': ('named',),
+    'ods-enforcerd': ('ipa-ods-exporter',),
+}
+
+ServiceResult = collections.namedtuple('ServiceResult',
+                                       ['name', 'elapsed', 'error'])
+
+def run_in_dependency_order(svc_list, action, reverse=False,
+                            stop_on_failure=True, dependencies=None):
+    """
+    Run ``action(svc)`` for every service in svc_list, concurrently where
+    the dependency graph allows it.
+
+    A service is handed to its own thread as soon as all services it depends
+    on (see SERVICE_DEPENDENCIES) have finished. With reverse=True the graph
+    is inverted, which is the order needed to stop services. Dependencies on
+    services that are not in svc_list are ignored.
+
+    If stop_on_failure is set, no new service is scheduled once an action
+    has raised an exception; actions already running are waited for.
+
+    Returns a list of ServiceResult tuples in completion order, the error
+    field holds the exception raised by the action or None.
+    """
+    if dependencies is None:
+        dependencies = SERVICE_DEPENDENCIES
+
+    pending = [svc for svc in svc_list]
+    if reverse:
+        pending.reverse()
+
+    waits_for = dict((svc, set()) for svc in pending)
+    for svc in pending:
+        for dep in dependencies.get(svc, ()):
+            if dep == svc or dep not in waits_for:
+                continue
+            if reverse:
+                waits_for[dep].add(svc)
+            else:
+                waits_for[svc].add(dep)
+
+    results = []
+    running = set()
+    cond = threading.Condition()
+
+    def worker(svc):
+        start = time.time()
+        error = None
+        try:
+            action(svc)
+        except Exception as e:
+            error = e
+        with cond:
+            results.append(ServiceResult(svc, time.time() - start, error))
+            running.discard(svc)
+            for deps in waits_for.values():
+                deps.discard(svc)
+            cond.notify()
+
+    with cond:
+        while pending or running:
+            if stop_on_failure and any(r.error for r in results):
+                del pending[:]
+            ready = [svc for svc in pending if not waits_for[svc]]
+            if not ready and not running and pending:
+                # dependency cycle, fall back to the configured order
+                ready = pending[:1]
+            for svc in ready:
+                pending.remove(svc)
+                running.add(svc)
+                thread = threading.Thread(target=worker, args=(svc,))
+                thread.daemon = True
+                thread.start()
+            if running:
+                cond.wait()
+
+    return results
+
+
 def print_msg(message, output_fd=sys.stdout):
     logger.debug("%s", message)
     output_fd.write(message)
@@ -387,8 +477,8 @@ class Service(object):
         except errors.NotFound:
             pass
         else:
-            for cert, nickname, trust_flags in ca_certs:
-                db.add_cert(cert, nickname, trust_flags)
+            for _nickname, e in db.update_certs(ca_certs):
+                raise e
 
     def is_configured(self):
         return self.sstore.has_state(self.service_name)
@@ -117,8 +117,10 @@ must include all existing attributes as well. When doing an aci-mod the
 targetattr REPLACES the current attributes, it does not add to them.
 
 """
+import collections
 from copy import deepcopy
 import logging
+import threading
 
 import six
 
@@ -141,6 +143,9 @@ register = Registry()
 
 ACI_NAME_PREFIX_SEP = ":"
 
+# Maximum number of entries whose parsed ACIs are cached
+ACI_CACHE_SIZE = 16
+
 _type_map = {
     'user': 'ldap:///' + str(DN(('uid', '*'), api.env.container_user, api.env.basedn)),
     'group': 'ldap:///' + str(DN(('cn', '*'), api.env.container_group, api.env.basedn)),
@@ -316,12 +321,15 @@ def _make_aci(ldap, current, aciname, kw):
 
     return a
 
-def _aci_to_kw(ldap, a, test=False, pkey_only=False):
+def _aci_to_kw(ldap, a, test=False, pkey_only=False, groups=None):
     """Convert an ACI into its equivalent keywords.
 
        This is used for the modify operation so we can merge the
        incoming kw and existing ACI and pass the result to
        _make_aci().
+
+       groups is an optional dict used to remember the group entries
+       looked up, for converting many ACIs at once.
     """
     kw = {}
     kw['aciprefix'], kw['aciname'] = _parse_aci_name(a.name)
@@ -375,7 +383,17 @@ def _aci_to_kw(ldap, a, test=False, pkey_only=False):
             dn = DN()
             entry = ldap.make_entry(dn)
             try:
-                entry = ldap.get_entry(groupdn, ['cn'])
+                if groups is None:
+                    entry = ldap.get_entry(groupdn, ['cn'])
+                else:
+                    if groupdn not in groups:
+                        try:
+                            groups[groupdn] = ldap.get_entry(groupdn, ['cn'])
+                        except errors.NotFound as e:
+                            groups[groupdn] = e
+                    if isinstance(groups[groupdn], errors.NotFound):
+                        raise groups[groupdn]
+                    entry = groups[groupdn]
             except errors.NotFound as e:
                 # FIXME, use real name here
                 if test:
@@ -399,6 +417,108 @@ def _convert_strings_to_acis(acistrs):
             logger.warning("Failed to parse: %s", a)
     return acis
 
+class ACISet(object):
+    """
+    The parsed ACIs of an entry, indexed by name, target and bind rule.
+
+    The ACI objects are shared between requests and must not be modified.
+    """
+    def __init__(self, acistrs, parsed):
+        """
+        :param acistrs: the ACI values of the entry
+        :param parsed: dict mapping ACI strings to already parsed ACIs (or to
+            None for unparseable ones), new strings are added to it
+        """
+        self.acis = []
+        self.acistrs = []
+        self.by_name = collections.defaultdict(list)
+        self.by_target = collections.defaultdict(list)
+        self.by_bindrule = collections.defaultdict(list)
+
+        for acistr in acistrs:
+            if acistr not in parsed:
+                try:
+                    parsed[acistr] = ACI(acistr)
+                except SyntaxError:
+                    logger.warning("Failed to parse: %s", acistr)
+                    parsed[acistr] = None
+            a = parsed[acistr]
+            if a is None:
+                continue
+            self.acis.append(a)
+            self.acistrs.append(acistr)
+            self.by_name[a.name.lower()].append((a, acistr))
+            if 'target' in a.target:
+                target = a.target['target']['expression']
+                self.by_target[target.lower()].append(a)
+            self.by_bindrule[a.bindrule.get('expression')].append(a)
+
+    def find_by_name(self, name):
+        """Return the first (aci, acistring) pair with the given name"""
+        try:
+            return self.by_name[name.lower()][0]
+        except IndexError:
+            raise KeyError(name)
+
+
+class ACICache(object):
+    """
+    Per-process cache of parsed ACIs.
+
+    ACISets are keyed by the DN and the ACI values of an entry, i.e. its
+    modification state as far as ACIs are concerned. The values are part of
+    the key because different users may be allowed to read different ACIs.
+    An ACI string already parsed for any entry is never parsed again.
+    """
+    def __init__(self, size=ACI_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._sets = collections.OrderedDict()
+        self._parsed = {}
+
+    def get(self, entry):
+        """Return the ACISet of an LDAP entry read with the aci attribute"""
+        acistrs = tuple(entry.get('aci', ()))
+        key = (entry.dn, acistrs)
+        with self._lock:
+            aciset = self._sets.pop(key, None)
+            if aciset is not None:
+                self._sets[key] = aciset
+                return aciset
+            aciset = ACISet(acistrs, self._parsed)
+            self._sets[key] = aciset
+            while len(self._sets) > self.size:
+                self._sets.popitem(last=False)
+            self._drop_unused()
+        return aciset
+
+    def parse(self, acistr):
+        """Parse a single ACI string, raises SyntaxError if invalid"""
+        with self._lock:
+            a = self._parsed.get(acistr)
+        if a is None:
+            a = ACI(acistr)
+        return a
+
+    def _drop_unused(self):
+        # forget the ACI strings which are not used by any cached set
+        used = set()
+        for _dn, acistrs in self._sets:
+            used.update(acistrs)
+        if len(self._parsed) > 2 * len(used):
+            for acistr in list(self._parsed):
+                if acistr not in used:
+                    del self._parsed[acistr]
+
+    def clear(self):
+        with self._lock:
+            self._sets.clear()
+            self._parsed.clear()
+
+
+aci_cache = ACICache()
+
+
 def _find_aci_by_name(acis, aciprefix, aciname):
     name = _make_aci_name(aciprefix, aciname).lower()
     for a in acis:
@@ -702,12 +822,31 @@ class aci_find(crud.Search):
     takes_options = (_prefix_option.clone_rename("aciprefix?", required=False),
                      gen_pkey_only_option("name"),)
 
+    def _get_candidates(self, aciset, kw):
+        """
+        Use the indexes of aciset to pick the ACIs which may match kw,
+        the filters in execute() are still applied to them.
+        """
+        candidates = [aciset.acis]
+        if kw.get('aciname') and kw.get('aciprefix'):
+            name = _make_aci_name(kw['aciprefix'], kw['aciname']).lower()
+            candidates.append(
+                [a for a, _acistr in aciset.by_name.get(name, ())])
+        if kw.get('type') in _type_map:
+            candidates.append(
+                aciset.by_target.get(_type_map[kw['type']].lower(), []))
+        if kw.get('subtree'):
+            candidates.append(aciset.by_target.get(kw['subtree'].lower(), []))
+        if kw.get('selfaci', False) is True:
+            candidates.append(aciset.by_bindrule.get(u'ldap:///self', []))
+        return list(min(candidates, key=len))
+
     def execute(self, term=None, **kw):
         ldap = self.api.Backend.ldap2
 
         entry = ldap.get_entry(self.api.env.basedn, ['aci'])
 
-        acis = _convert_strings_to_acis(entry.get('aci', []))
+        acis = self._get_candidates(aci_cache.get(entry), kw)
         results = []
 
         if term:
@@ -866,12 +1005,13 @@ class aci_find(crud.Search):
                         pass
 
         acis = []
+        groups = {}
         for result in results:
             if kw.get('raw', False):
                 aci = dict(aci=unicode(result))
             else:
                 aci = _aci_to_kw(ldap, result,
-                        pkey_only=kw.get('pkey_only', False))
+                        pkey_only=kw.get('pkey_only', False), groups=groups)
             acis.append(aci)
 
         return dict(
@@ -909,9 +1049,12 @@ class aci_show(crud.Retrieve):
         dn = kw.get('location', self.api.env.basedn)
         entry = ldap.get_entry(dn, ['aci'])
 
-        acis = _convert_strings_to_acis(entry.get('aci', []))
-
-        aci = _find_aci_by_name(acis, kw['aciprefix'], aciname)
+        try:
+            aci, _acistr = aci_cache.get(entry).find_by_name(
+                _make_aci_name(kw['aciprefix'], aciname))
+        except KeyError:
+            raise errors.NotFound(
+                reason=_('ACI with name "%s" not found') % aciname)
         if kw.get('raw', False):
             result = dict(aci=unicode(aci))
         else:
@@ -21,9 +21,11 @@
 import six
 
 from ipalib import api, errors
-from ipalib import Str, IA5Str
+from ipalib import Flag, Str, IA5Str
+from ipalib.parameters import Dict
 from ipalib.plugable import Registry
 from .baseldap import (
+    entry_to_dict,
     pkey_to_value,
     LDAPObject,
     LDAPCreate,
@@ -208,6 +210,10 @@ automountInformation: -ro,soft,rsize=8192,wsize=8192 nfs.example.com:/vol/arch
 register = Registry()
 
 DIRECT_MAP_KEY = u'/-'
+# Maps and keys pre-created by automountlocation_add, their duplicates are
+# ignored by automountlocation_import_maps
+DEFAULT_MAPS = (u'auto.direct', )
+DEFAULT_KEYS = (DIRECT_MAP_KEY, )
 
 @register()
 class automountlocation(LDAPObject):
@@ -269,7 +275,8 @@ class automountlocation_add(LDAPCreate):
 
         # add additional pre-created maps and keys
         # IMPORTANT: add pre-created maps/keys to DEFAULT_MAPS/DEFAULT_KEYS
-        # so that they do not cause conflicts during import operation
+        # here and in ipaclient so that they do not cause conflicts during
+        # import operation
         self.api.Command['automountmap_add_indirect'](
             keys[-1], u'auto.direct', key=DIRECT_MAP_KEY
         )
@@ -303,14 +310,46 @@ class automountlocation_tofiles(LDAPQuery):
     __doc__ = _('Generate automount files for a specific location.')
 
     def execute(self, *args, **options):
-        self.api.Command['automountlocation_show'](args[0])
+        ldap = self.obj.backend
+        automountmap = self.api.Object.automountmap
+        automountkey = self.api.Object.automountkey
 
-        result = self.api.Command['automountkey_find'](args[0], u'auto.master')
-        maps = result['result']
+        location_dn = self.obj.get_dn(*args)
+        try:
+            ldap.get_entry(location_dn, [''])
+        except errors.NotFound:
+            self.obj.handle_not_found(*args)
+
+        # Get all maps and keys of the location at once
+        attrs_list = list(set(
+            automountmap.default_attributes + automountkey.default_attributes
+        ))
+        try:
+            entries = ldap.get_entries(
+                location_dn, ldap.SCOPE_SUBTREE,
+                '(|(objectclass=automountmap)(objectclass=automount))',
+                attrs_list, paged_search=True, time_limit=0, size_limit=0)
+        except errors.EmptyResult:
+            entries = []
+
+        mapentries = {}
+        keyentries = {}
+        for entry in entries:
+            mapname = entry.dn['automountmapname'].lower()
+            if len(entry.dn) == len(location_dn) + 1:
+                mapentries[mapname] = entry
+            else:
+                keyentries.setdefault(mapname, []).append(entry)
 
-        # maps, truncated
-        # TODO: handle truncated results
-        #       ?use ldap.find_entries instead of automountkey_find?
+        def get_keys(mapname):
+            # sorted like automountkey_find does
+            keys = sorted(
+                keyentries.get(mapname.lower(), []),
+                key=lambda e: automountkey.primary_key.sort_key(
+                    e[automountkey.primary_key.name][0]))
+            return [self._entry_to_dict(e, **options) for e in keys]
+
+        maps = get_keys(u'auto.master')
 
         keys = {}
         mapnames = [u'auto.master']
@@ -318,26 +357,167 @@ class automountlocation_tofiles(LDAPQuery):
             info = m['automountinformation'][0]
             mapnames.append(info)
             key = info.split(None)
-            result = self.api.Command['automountkey_find'](args[0], key[0])
-            keys[info] = result['result']
-            # TODO: handle truncated results, same as above
+            keys[info] = get_keys(key[0])
 
-        allmaps = self.api.Command['automountmap_find'](args[0])['result']
         orphanmaps = []
-        for m in allmaps:
-            if m['automountmapname'][0] not in mapnames:
-                orphanmaps.append(m)
-
         orphankeys = []
-        # Collect all the keys for the orphaned maps
-        for m in orphanmaps:
-            key = m['automountmapname']
-            result = self.api.Command['automountkey_find'](args[0], key[0])
-            orphankeys.append(result['result'])
+        mapnames = set(name.lower() for name in mapnames)
+        for name in sorted(mapentries,
+                           key=automountmap.primary_key.sort_key):
+            if name not in mapnames:
+                orphanmaps.append(
+                    self._entry_to_dict(mapentries[name], **options))
+                # Collect all the keys for the orphaned maps
+                orphankeys.append(get_keys(name))
 
         return dict(result=dict(maps=maps, keys=keys,
                     orphanmaps=orphanmaps, orphankeys=orphankeys))
 
+    def _entry_to_dict(self, entry, **options):
+        result = entry_to_dict(entry, **options)
+        result['dn'] = entry.dn
+        return result
+
+
+@register()
+class automountlocation_import_maps(LDAPQuery):
+    __doc__ = _('Import parsed automount maps into a specific location.')
+
+    NO_CLI = True
+
+    takes_options = (
+        Dict('maps*',
+            doc=_('Maps to import. Each map is a dict with the map name '
+                  '(automountmapname), whether to create the map (add) and '
+                  'a list of (key, mount information) pairs (keys).'),
+        ),
+        Flag('continue',
+            doc=_('Continuous operation mode. Errors are reported but the '
+                  'process continues.'),
+        ),
+    )
+
+    def execute(self, *args, **options):
+        ldap = self.obj.backend
+        location = args[0]
+
+        try:
+            ldap.get_entry(self.obj.get_dn(location), [''])
+        except errors.NotFound:
+            self.obj.handle_not_found(location)
+
+        result = dict(maps=[], keys=[], duplicatemaps=[], duplicatekeys=[])
+        for m in options.get('maps') or ():
+            self._import_map(ldap, location, m, result,
+                             options.get('continue', False))
+
+        return dict(result=result)
+
+    def _import_map(self, ldap, location, m, result, cont):
+        automountmap = self.api.Object.automountmap
+        automountkey = self.api.Object.automountkey
+
+        def check(param, value):
+            value = param(value)
+            param.validate(value)
+            return value
+
+        if 'automountmapname' not in m:
+            raise errors.RequirementError(name='automountmapname')
+        mapname = check(automountmap.primary_key, m['automountmapname'])
+        map_dn = automountmap.get_dn(location, mapname)
+
+        if m.get('add', False):
+            entry = ldap.make_entry(
+                map_dn,
+                objectclass=list(automountmap.object_class),
+                automountmapname=[mapname],
+            )
+            try:
+                ldap.add_entry(entry)
+                result['maps'].append(mapname)
+            except errors.DuplicateEntry:
+                if mapname in DEFAULT_MAPS:
+                    # ignore conflict when the map was pre-created
+                    pass
+                elif cont:
+                    result['duplicatemaps'].append(mapname)
+                else:
+                    raise errors.DuplicateEntry(
+                        message=_('map %(map)s already exists') % dict(
+                            map=mapname))
+
+        keys = m.get('keys') or ()
+        if not keys:
+            return
+
+        # Check uniqueness of all the keys against a single search, keys of
+        # the direct map are unique only together with their information
+        try:
+            entries = ldap.get_entries(
+                map_dn, ldap.SCOPE_ONELEVEL, '(objectclass=automount)',
+                ['automountkey', 'automountinformation'],
+                paged_search=True, time_limit=0, size_limit=0)
+        except errors.EmptyResult:
+            entries = []
+        except errors.NotFound:
+            automountmap.handle_not_found(location, mapname)
+        existing = set()
+        for entry in entries:
+            for key in entry.get('automountkey', []):
+                existing.add(key)
+                if key == DIRECT_MAP_KEY:
+                    for info in entry.get('automountinformation', []):
+                        existing.add((key, info))
+
+        def duplicate_key(key, pk):
+            if mapname == u'auto.master' and key in DEFAULT_KEYS:
+                # ignore conflict when the key was pre-created
+                return
+            if cont:
+                result['duplicatekeys'].append(key)
+            elif mapname == u'auto.master':
+                raise errors.DuplicateEntry(
+                    message=_('key %(key)s already exists') % dict(key=key))
+            else:
+                automountkey.handle_duplicate_entry(location, mapname, pk)
+
+        keyparam = automountkey.params['automountkey']
+        infoparam = automountkey.params['automountinformation']
+
+        def operations():
+            for key, info in keys:
+                key = check(keyparam, key)
+                info = check(infoparam, info)
+                pk = automountkey.get_pk(key, info)
+                if key == DIRECT_MAP_KEY:
+                    duplicate = (key, info) in existing
+                else:
+                    duplicate = key in existing
+                if duplicate:
+                    duplicate_key(key, pk)
+                    continue
+
+                existing.update((key, (key, info)))
+                entry = ldap.make_entry(
+                    automountkey.get_dn(
+                        location, mapname, pk, add_operation=True),
+                    objectclass=list(automountkey.object_class),
+                    automountkey=[key],
+                    automountinformation=[info],
+                    description=[pk],
+                )
+                yield (key, pk), 'add', entry
+
+        # Add the keys without waiting for each of them
+        for (key, pk), error in ldap.pipeline(operations()):
+            if error is None:
+                result['keys'].append([key, mapname])
+            elif isinstance(error, errors.DuplicateEntry):
+                duplicate_key(key, pk)
+            else:
+                raise error
+
 
 @register()
 class automountmap(LDAPObject):
@@ -26,7 +26,7 @@ import logging
 from operator import attrgetter
 
 import cryptography.x509
-from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives import serialization
 import six
 
 from ipalib import Command, Str, Int, Flag
@@ -50,6 +50,7 @@ from ipalib.request import context
 from ipalib import output
 from ipapython import kerberos
 from ipapython.dn import DN
+from ipaserver.plugins.ldap2 import cached_lookup
 from ipaserver.plugins.service import normalize_principal, validate_realm
 
 try:
@@ -470,23 +471,18 @@ class BaseCertObject(Object):
 
         """
         if 'certificate' in obj:
-            cert = x509.load_der_x509_certificate(
+            data = x509.get_certificate_data(
                 base64.b64decode(obj['certificate']))
-            obj['subject'] = DN(cert.subject)
-            obj['issuer'] = DN(cert.issuer)
-            obj['serial_number'] = cert.serial_number
-            obj['valid_not_before'] = x509.format_datetime(
-                    cert.not_valid_before)
-            obj['valid_not_after'] = x509.format_datetime(
-                    cert.not_valid_after)
+            obj['subject'] = data.subject
+            obj['issuer'] = data.issuer
+            obj['serial_number'] = data.serial_number
+            obj['valid_not_before'] = data.valid_not_before
+            obj['valid_not_after'] = data.valid_not_after
             if full:
-                obj['sha1_fingerprint'] = x509.to_hex_with_colons(
-                    cert.fingerprint(hashes.SHA1()))
-                obj['sha256_fingerprint'] = x509.to_hex_with_colons(
-                    cert.fingerprint(hashes.SHA256()))
+                obj['sha1_fingerprint'] = data.sha1_fingerprint
+                obj['sha256_fingerprint'] = data.sha256_fingerprint
 
-            general_names = x509.process_othernames(
-                    cert.san_general_names)
+            general_names = data.san_general_names
 
             for gn in general_names:
                 try:
@@ -1695,6 +1691,20 @@ class cert_find(Search, CertMethod):
         return ret
 
 
+@cached_lookup(
+    lambda ldap: [(DN(('cn', 'masters'), ('cn', 'ipa'), ('cn', 'etc'),
+                      ldap.api.env.basedn), ldap.SCOPE_SUBTREE)])
+def _ca_enabled(ldap):
+    base_dn = DN(('cn', 'masters'), ('cn', 'ipa'), ('cn', 'etc'),
+                 ldap.api.env.basedn)
+    filter = '(&(objectClass=ipaConfigObject)(cn=CA))'
+    try:
+        ldap.find_entries(base_dn=base_dn, filter=filter, attrs_list=[])
+    except errors.NotFound:
+        return False
+    return True
+
+
 @register()
 class ca_is_enabled(Command):
     """
@@ -1704,14 +1714,5 @@ class ca_is_enabled(Command):
     has_output = output.standard_value
 
     def execute(self, *args, **options):
-        base_dn = DN(('cn', 'masters'), ('cn', 'ipa'), ('cn', 'etc'),
-                     self.api.env.basedn)
-        filter = '(&(objectClass=ipaConfigObject)(cn=CA))'
-        try:
-            self.api.Backend.ldap2.find_entries(
-                base_dn=base_dn, filter=filter, attrs_list=[])
-        except errors.NotFound:
-            result = False
-        else:
-            result = True
+        result = _ca_enabled(self.api.Backend.ldap2)
         return dict(result=result, value=pkey_to_value(None, options))
@@ -82,6 +82,7 @@ from ipapython.ipautil import CheckedIPAddress
 from ipapython.dnsutil import check_zone_overlap
 from ipapython.dnsutil import DNSName
 from ipapython.dnsutil import related_to_auto_empty_zone
+from ipaserver.plugins.ldap2 import cached_lookup
 from ipaserver.dns_data_management import (
     IPASystemRecords,
     IPADomainIsNotManagedByIPAError,
@@ -1571,6 +1572,8 @@ def dns_container_exists(ldap):
     return True
 
 
+@cached_lookup(lambda ldap: [(DN(api.env.container_masters, api.env.basedn),
+                               ldap.SCOPE_SUBTREE)])
 def dnssec_installed(ldap):
     """
     * Method opendnssecinstance.get_dnssec_key_masters() CANNOT be used in the
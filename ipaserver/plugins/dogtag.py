@@ -253,6 +253,7 @@ from ipalib import Backend, api
 from ipapython.dn import DN
 import ipapython.cookie
 from ipapython import dogtag, ipautil, certdb
+from ipaserver.plugins.ldap2 import cached_lookup
 
 if api.env.in_server:
     import pki
@@ -1145,6 +1146,29 @@ def parse_unrevoke_cert_xml(doc):
     return response
 
 
+@cached_lookup(
+    lambda ldap2, service: [(DN(('cn', 'masters'), ('cn', 'ipa'),
+                                ('cn', 'etc'), api.env.basedn),
+                             ldap2.SCOPE_SUBTREE)])
+def _find_service_masters(ldap2, service):
+    """
+    Return the names of the hosts which are masters for a service.
+    """
+    base_dn = DN(('cn', 'masters'), ('cn', 'ipa'), ('cn', 'etc'),
+                  api.env.basedn)
+    filter_attrs = {
+         'objectClass': 'ipaConfigObject',
+         'cn': service,
+         'ipaConfigString': 'enabledService',}
+    query_filter = ldap2.make_filter(filter_attrs, rules='&')
+    try:
+        ent, _trunc = ldap2.find_entries(filter=query_filter, base_dn=base_dn,
+                                         attrs_list=[])
+    except errors.NotFound:
+        return ()
+    return tuple(entry.dn[1].value for entry in ent)
+
+
 def host_has_service(host, ldap2, service='CA'):
     """
     :param host: A host which might be a master for a service.
@@ -1154,21 +1178,10 @@ def host_has_service(host, ldap2, service='CA'):
 
     Check if a specified host is a master for a specified service.
     """
-    base_dn = DN(('cn', host), ('cn', 'masters'), ('cn', 'ipa'),
-                 ('cn', 'etc'), api.env.basedn)
-    filter_attrs = {
-        'objectClass': 'ipaConfigObject',
-        'cn': service,
-        'ipaConfigString': 'enabledService',
-        }
-    query_filter = ldap2.make_filter(filter_attrs, rules='&')
     try:
-        ent, _trunc = ldap2.find_entries(filter=query_filter, base_dn=base_dn)
-        if len(ent):
-            return True
+        return host in _find_service_masters(ldap2, service)
     except Exception:
-        pass
-    return False
+        return False
 
 
 def select_any_master(ldap2, service='CA'):
@@ -1179,20 +1192,12 @@ def select_any_master(ldap2, service='CA'):
 
     Select any host which is a master for a specified service.
     """
-    base_dn = DN(('cn', 'masters'), ('cn', 'ipa'), ('cn', 'etc'),
-                  api.env.basedn)
-    filter_attrs = {
-         'objectClass': 'ipaConfigObject',
-         'cn': service,
-         'ipaConfigString': 'enabledService',}
-    query_filter = ldap2.make_filter(filter_attrs, rules='&')
     try:
-        ent, _trunc = ldap2.find_entries(filter=query_filter, base_dn=base_dn)
-        if len(ent):
-            entry = random.choice(ent)
-            return entry.dn[1].value
+        masters = _find_service_masters(ldap2, service)
     except Exception:
-        pass
+        return None
+    if masters:
+        return random.choice(masters)
     return None
 
 #-------------------------------------------------------------------------------
@@ -1206,6 +1211,7 @@ import random
 from ipaserver.plugins import rabase
 from ipalib.constants import TYPE_ERROR
 from ipalib import _
+from ipalib.request import context
 from ipaplatform.paths import paths
 
 register = Registry()
@@ -1253,9 +1259,21 @@ class RestClient(Backend):
         super(RestClient, self).__init__(api)
 
         self._ca_host = None
-        # session cookie
         self.override_port = None
-        self.cookie = None
+
+    @property
+    def cookie(self):
+        """
+        Session cookie of the current request
+
+        Requests served concurrently each log in and out on their own, so
+        the cookie is kept on request.context.
+        """
+        return getattr(context, '%s_cookie' % self.name, None)
+
+    @cookie.setter
+    def cookie(self, value):
+        setattr(context, '%s_cookie' % self.name, value)
 
     @property
     def ca_host(self):
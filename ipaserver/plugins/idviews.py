@@ -37,6 +37,7 @@ from ipalib.constants import (
     PATTERN_GROUPUSER_NAME,
 )
 from ipalib.plugable import Registry
+from ipalib.request import context
 from ipalib.util import (normalize_sshpubkey, validate_sshpubkey,
     convert_sshpubkey_post)
 
@@ -82,6 +83,12 @@ fallback_to_ldap_option = Flag(
 
 DEFAULT_TRUST_VIEW_NAME = "default trust view"
 
+# Maximum number of IPA anchors resolved by a single LDAP search
+ANCHOR_RESOLVE_CHUNK_SIZE = 100
+
+# Maximum number of host names looked up by a single LDAP search
+HOST_LOOKUP_CHUNK_SIZE = 1000
+
 ANCHOR_REGEX = re.compile(
     r':IPA:.*:[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}'
     r'|'
@@ -351,27 +358,37 @@ class baseidview_apply(LDAPQuery):
                 failed['hostgroup'].append((hostgroup, "%s : %s" % (
                                             e.__class__.__name__, str(e))))
 
-        for host in hosts_to_apply:
-            try:
-                host_dn = api.Object['host'].get_dn_if_exists(host)
-
-                host_entry = ldap.get_entry(host_dn,
-                                            attrs_list=['ipaassignedidview'])
-                host_entry['ipaassignedidview'] = view_dn
-
-                ldap.update_entry(host_entry)
+        host_entries = self.find_hosts(ldap, hosts_to_apply)
 
-                # If no exception was raised, view assignment went well
+        # Hosts already in the desired state are reported without sending
+        # any modification to the server
+        to_update = []
+        seen = set()
+        for host in hosts_to_apply:
+            entry = host_entries.get(host.lower())
+            if entry is None:
+                failed['host'].append((host, unicode(_("not found"))))
+            elif isinstance(entry, errors.PublicError):
+                failed['host'].append((host, str(entry)))
+            else:
+                entry['ipaassignedidview'] = view_dn
+                if entry.dn in seen or not entry.generate_modlist():
+                    failed['host'].append(
+                        (host, unicode(_("ID View already applied"))))
+                else:
+                    seen.add(entry.dn)
+                    to_update.append((host, entry))
+
+        results = ldap.pipeline(
+            (host, 'update', entry) for host, entry in to_update)
+        for host, error in results:
+            if error is None:
                 completed = completed + 1
                 succeeded['host'].append(host)
-            except errors.EmptyModlist:
-                # If view was already applied, complain about it
-                failed['host'].append((host,
-                                       unicode(_("ID View already applied"))))
-            except errors.NotFound:
+            elif isinstance(error, errors.NotFound):
                 failed['host'].append((host, unicode(_("not found"))))
-            except errors.PublicError as e:
-                failed['host'].append((host, str(e)))
+            else:
+                failed['host'].append((host, str(error)))
 
         # Wrap dictionary containing failures in another dictionary under key
         # 'memberhost', since that is output parameter in global_output_params
@@ -393,6 +410,64 @@ class baseidview_apply(LDAPQuery):
             failed=failed,
         )
 
+    def find_hosts(self, ldap, hosts):
+        """
+        Look up host entries for the given host names.
+
+        Hosts are searched by fully qualified or short host name with one
+        paged search per HOST_LOOKUP_CHUNK_SIZE names.
+
+        Returns a dict mapping lowercased host names to their entries. Short
+        names matching more than one host map to a SingleMatchExpected
+        error, names which were not found are left out.
+        """
+        base_dn = DN(self.api.Object['host'].container_dn, self.api.env.basedn)
+        names = list(set(host.lower() for host in hosts))
+        by_fqdn = {}
+        by_shortname = {}
+
+        for i in range(0, len(names), HOST_LOOKUP_CHUNK_SIZE):
+            chunk = names[i:i + HOST_LOOKUP_CHUNK_SIZE]
+            filter = ldap.combine_filters(
+                [
+                    ldap.make_filter_from_attr('objectclass', 'ipahost'),
+                    ldap.combine_filters(
+                        [
+                            ldap.make_filter_from_attr(
+                                'fqdn', chunk, rules=ldap.MATCH_ANY),
+                            ldap.make_filter_from_attr(
+                                'serverhostname', chunk, rules=ldap.MATCH_ANY),
+                        ],
+                        rules=ldap.MATCH_ANY
+                    ),
+                ],
+                rules=ldap.MATCH_ALL
+            )
+            try:
+                entries, _truncated = ldap.find_entries(
+                    filter, ['fqdn', 'serverhostname', 'ipaassignedidview'],
+                    base_dn=base_dn, size_limit=0, paged_search=True)
+            except errors.EmptyResult:
+                continue
+
+            for entry in entries:
+                by_fqdn[entry.single_value['fqdn'].lower()] = entry
+                shortname = entry.single_value.get('serverhostname')
+                if shortname:
+                    by_shortname.setdefault(shortname.lower(), []).append(
+                        entry)
+
+        result = {}
+        for name in names:
+            if name in by_fqdn:
+                result[name] = by_fqdn[name]
+            elif len(by_shortname.get(name, [])) == 1:
+                result[name] = by_shortname[name][0]
+            elif name in by_shortname:
+                result[name] = errors.SingleMatchExpected(
+                    found=len(by_shortname[name]))
+        return result
+
 
 @register()
 class idview_apply(baseidview_apply):
@@ -494,6 +569,10 @@ class idview_unapply(baseidview_apply):
 def verify_trusted_domain_object_type(validator, desired_type, name_or_sid):
 
     object_type = validator.get_trusted_domain_object_type(name_or_sid)
+    return check_trusted_domain_object_type(desired_type, object_type)
+
+
+def check_trusted_domain_object_type(desired_type, object_type):
 
     if object_type == desired_type:
         # In case SSSD returns the same type as the type being
@@ -649,6 +728,99 @@ def resolve_anchor_to_object_name(ldap, obj_type, anchor):
                % dict(anchor=anchor))
 
 
+def resolve_anchors_to_object_names(ldap, obj_type, anchors):
+    """
+    Resolves a collection of anchors to the actual common object names at
+    once.
+
+    IPA anchors are resolved with one search per ANCHOR_RESOLVE_CHUNK_SIZE
+    UUIDs, SID anchors with a single batched translation. Results are
+    cached for the rest of the request.
+
+    Takes options:
+        ldap - the backend
+        obj_type - either 'user' or 'group'
+        anchors - iterable of anchors
+
+    Returns a dict mapping anchors to object names. Anchors which could not
+    be resolved are left out.
+    """
+
+    cache = getattr(context, 'idoverride_anchor_names', None)
+    if cache is None:
+        cache = {}
+        setattr(context, 'idoverride_anchor_names', cache)
+
+    result = {}
+    uuids = {}
+    sids = {}
+
+    for anchor in set(anchors):
+        if (obj_type, anchor) in cache:
+            if cache[(obj_type, anchor)] is not None:
+                result[anchor] = cache[(obj_type, anchor)]
+        elif anchor.startswith(IPA_ANCHOR_PREFIX):
+            uuid = anchor.rpartition(':')[-1].strip().lower()
+            uuids.setdefault(uuid, []).append(anchor)
+        elif anchor.startswith(SID_ANCHOR_PREFIX):
+            sids[anchor[len(SID_ANCHOR_PREFIX):].strip()] = anchor
+        else:
+            cache[(obj_type, anchor)] = None
+
+    if uuids:
+        accounts_dn = DN(api.env.container_accounts, api.env.basedn)
+
+        objectclass, name_attr = {
+            'user': ('posixaccount', 'uid'),
+            'group': ('ipausergroup', 'cn'),
+        }[obj_type]
+
+        uuid_list = list(uuids)
+        for i in range(0, len(uuid_list), ANCHOR_RESOLVE_CHUNK_SIZE):
+            chunk = uuid_list[i:i + ANCHOR_RESOLVE_CHUNK_SIZE]
+            filter = ldap.combine_filters(
+                [
+                    ldap.make_filter_from_attr('objectclass', objectclass),
+                    ldap.make_filter_from_attr('ipaUniqueID', chunk,
+                                               rules=ldap.MATCH_ANY),
+                ],
+                rules=ldap.MATCH_ALL
+            )
+            try:
+                entries, _truncated = ldap.find_entries(
+                    filter, [name_attr, 'ipaUniqueID'],
+                    base_dn=accounts_dn, size_limit=len(chunk))
+            except errors.EmptyResult:
+                continue
+
+            for entry in entries:
+                uuid = entry.single_value['ipaUniqueID'].lower()
+                for anchor in uuids.get(uuid, []):
+                    result[anchor] = entry.single_value[name_attr]
+
+    if sids and _dcerpc_bindings_installed:
+        domain_validator = ipaserver.dcerpc.DomainValidator(api)
+        if domain_validator.is_configured():
+            try:
+                objects = (domain_validator.
+                           get_trusted_domain_objects_from_sids(list(sids)))
+            except errors.ValidationError:
+                # The domain may no longer be trusted
+                objects = {}
+
+            for sid, (name, object_type) in objects.items():
+                if check_trusted_domain_object_type(obj_type, object_type):
+                    result[sids[sid]] = name
+
+    for anchor_list in uuids.values():
+        for anchor in anchor_list:
+            cache[(obj_type, anchor)] = result.get(anchor)
+    for anchor in sids.values():
+        cache[(obj_type, anchor)] = result.get(anchor)
+
+    return result
+
+
 def remove_ipaobject_overrides(ldap, api, dn):
     """
     Removes all ID overrides for given object. This method is to be
@@ -748,6 +920,21 @@ class baseidoverride(LDAPObject):
                     # longer trusted
                     pass
 
+    def convert_anchors_to_human_readable_form(self, entries, **options):
+        if options.get('raw'):
+            return
+
+        anchors = [entry.single_value['ipaanchoruuid'] for entry in entries
+                   if entry.single_value.get('ipaanchoruuid')]
+        object_names = resolve_anchors_to_object_names(
+            self.backend, self.override_object, anchors)
+
+        # Anchors which could not be resolved are kept in the raw form
+        for entry in entries:
+            anchor = entry.single_value.get('ipaanchoruuid')
+            if anchor in object_names:
+                entry.single_value['ipaanchoruuid'] = object_names[anchor]
+
     def prohibit_ipa_users_in_default_view(self, dn, entry_attrs):
         # Check if parent object is Default Trust View, if so, prohibit
         # adding overrides for IPA objects
@@ -828,8 +1015,7 @@ class baseidoverride_find(LDAPSearch):
     takes_options = LDAPSearch.takes_options + (fallback_to_ldap_option,)
 
     def post_callback(self, ldap, entries, truncated, *args, **options):
-        for entry in entries:
-            self.obj.convert_anchor_to_human_readable_form(entry, **options)
+        self.obj.convert_anchors_to_human_readable_form(entries, **options)
         return truncated
 
 
@@ -27,8 +27,11 @@ Backend plugin for LDAP.
 # binding encodes them into the appropriate representation. This applies to
 # everything except the CrudBackend methods, where dn is part of the entry dict.
 
+import functools
 import logging
 import os
+import threading
+import time
 
 import ldap as _ldap
 
@@ -36,7 +39,7 @@ from ipalib import krb_utils
 from ipaplatform.paths import paths
 from ipapython.dn import DN
 from ipapython.ipaldap import (LDAPClient, AUTOBIND_AUTO, AUTOBIND_ENABLED,
-                               AUTOBIND_DISABLED)
+                               AUTOBIND_DISABLED, schema_cache)
 
 from ldap.controls.simple import GetEffectiveRightsControl
 
@@ -50,6 +53,129 @@ register = Registry()
 
 _missing = object()
 
+# Seconds a cached lookup is used without checking whether the entries it
+# was computed from changed
+LOOKUP_CACHE_TTL = 60
+
+
+class LookupCache(object):
+    """
+    Process-wide cache of the results of read-mostly lookups.
+
+    Every result is stored with the subtrees it was computed from and their
+    stamp: the DN, entryUSN and modifyTimestamp of every entry in them. For
+    ``ttl`` seconds the result is used as it is, afterwards the stamp is
+    read again with one small search and the lookup is repeated only if the
+    stamp changed. Writes done through ldap2 in this process drop the
+    results watching the written entry at once, writes done by other
+    processes are noticed when the TTL expires.
+
+    Only lookups reading a subtree are worth caching: for a single entry
+    checking the stamp costs the same search as reading the entry again.
+
+    Results are kept separately for each principal, as ACIs may give
+    another user a different result of the same lookup. Exceptions are not
+    cached.
+    """
+    def __init__(self, ttl=LOOKUP_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = {}
+        # incremented by every invalidation, results computed while an
+        # invalidation happened are not stored
+        self._generation = 0
+
+    def get(self, ldap, key, watch, func):
+        """
+        Return the cached result of func() for key.
+
+        :param ldap: the ldap2 backend func reads from
+        :param key: hashable identifying the lookup and its arguments
+        :param watch: list of (dn, scope) pairs of the subtrees the result
+            is computed from, scope is ldap2.SCOPE_BASE or
+            ldap2.SCOPE_SUBTREE
+        :param func: callable computing the result
+        """
+        key = (key, getattr(context, 'principal', None))
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            generation = self._generation
+        if item is not None and now < item[0]:
+            return item[1]
+
+        stamp = self._get_stamp(ldap, watch)
+        if item is not None and stamp is not None and stamp == item[2]:
+            value = item[1]
+        else:
+            value = func()
+        with self._lock:
+            if generation == self._generation:
+                self._items[key] = (now + self.ttl, value, stamp, watch)
+        return value
+
+    def _get_stamp(self, ldap, watch):
+        stamp = set()
+        for dn, scope in watch:
+            try:
+                entries, _truncated = ldap.find_entries(
+                    None, ['entryusn', 'modifytimestamp'], base_dn=dn,
+                    scope=scope, time_limit=0, size_limit=0)
+            except errors.NotFound:
+                continue
+            for e in entries:
+                usn = e.single_value.get('entryusn')
+                modified = e.single_value.get('modifytimestamp')
+                if usn is None and modified is None:
+                    # not readable, the result is never known to be current
+                    return None
+                stamp.add((e.dn, usn, modified))
+        return frozenset(stamp)
+
+    def invalidate(self, dn):
+        """Drop the results computed from the entry at dn"""
+        with self._lock:
+            self._generation += 1
+            for key, item in list(self._items.items()):
+                for watch_dn, scope in item[3]:
+                    if (dn == watch_dn or
+                            scope != _ldap.SCOPE_BASE and
+                            dn.endswith(watch_dn)):
+                        del self._items[key]
+                        break
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._items.clear()
+
+
+lookup_cache = LookupCache()
+
+
+def cached_lookup(watch):
+    """
+    Decorator caching the result of a lookup in ``lookup_cache``.
+
+    The decorated function (or method of ldap2) takes the ldap2 backend as
+    its first argument, its other arguments must be hashable. ``watch`` is
+    called with the same arguments and returns the (dn, scope) pairs of the
+    subtrees the result is computed from.
+
+    The result is shared, it must not be modified.
+    """
+    def decorator(func):
+        name = '%s.%s' % (func.__module__, func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(ldap, *args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            return lookup_cache.get(
+                ldap, key, watch(ldap, *args, **kwargs),
+                lambda: func(ldap, *args, **kwargs))
+        return wrapper
+    return decorator
+
 
 @register()
 class ldap2(CrudBackend, LDAPClient):
@@ -64,8 +190,18 @@ class ldap2(CrudBackend, LDAPClient):
         LDAPClient.__init__(self, None,
                             force_schema_updates=force_schema_updates)
 
-        self._time_limit = float(LDAPClient.time_limit)
-        self._size_limit = int(LDAPClient.size_limit)
+    # The limits are set per connection, so they are kept on request.context
+    # along with the connection rather than on the shared backend instance.
+
+    @property
+    def _limits(self):
+        return context.__dict__.setdefault('%s_limits' % self.id, {})
+
+    def _set_limit(self, name, val):
+        if val is _missing:
+            self._limits.pop(name, None)
+        else:
+            self._limits[name] = val
 
     @property
     def ldap_uri(self):
@@ -73,37 +209,39 @@ class ldap2(CrudBackend, LDAPClient):
 
     @property
     def time_limit(self):
-        if self._time_limit is None:
+        val = self._limits.get('time_limit', float(LDAPClient.time_limit))
+        if val is None:
             return float(self.get_ipa_config().single_value.get(
                 'ipasearchtimelimit', 2))
-        return self._time_limit
+        return val
 
     @time_limit.setter
     def time_limit(self, val):
         if val is not None:
             val = float(val)
-        object.__setattr__(self, '_time_limit', val)
+        self._set_limit('time_limit', val)
 
     @time_limit.deleter
     def time_limit(self):
-        object.__setattr__(self, '_time_limit', int(LDAPClient.size_limit))
+        self._set_limit('time_limit', _missing)
 
     @property
     def size_limit(self):
-        if self._size_limit is None:
+        val = self._limits.get('size_limit', int(LDAPClient.size_limit))
+        if val is None:
             return int(self.get_ipa_config().single_value.get(
                 'ipasearchrecordslimit', 0))
-        return self._size_limit
+        return val
 
     @size_limit.setter
     def size_limit(self, val):
         if val is not None:
             val = int(val)
-        object.__setattr__(self, '_size_limit', val)
+        self._set_limit('size_limit', val)
 
     @size_limit.deleter
     def size_limit(self):
-        object.__setattr__(self, '_size_limit', float(LDAPClient.time_limit))
+        self._set_limit('size_limit', _missing)
 
     def _connect(self):
         # Connectible.conn is a proxy to thread-local storage;
@@ -114,6 +252,16 @@ class ldap2(CrudBackend, LDAPClient):
         if self.isconnected():
             self.disconnect()
 
+    def warm_up(self):
+        """Fetch the LDAP schema into the process-wide schema cache."""
+        super(ldap2, self).warm_up()
+        # Read the schema anonymously on a separate connection, connecting
+        # this backend would bind with the default ccache and set the
+        # principal of the calling thread's context.
+        with LDAPClient(self.ldap_uri, cacert=paths.IPA_CA_CRT) as client:
+            schema_cache.get_schema(self.ldap_uri, client.conn)
+            client.unbind()
+
     def __str__(self):
         return self.ldap_uri
 
@@ -188,10 +336,7 @@ class ldap2(CrudBackend, LDAPClient):
             if ldapi:
                 with client.error_handler():
                     conn.set_option(_ldap.OPT_HOST_NAME, self.api.env.host)
-            if ccache is None:
-                os.environ.pop('KRB5CCNAME', None)
-            else:
-                os.environ['KRB5CCNAME'] = ccache
+            krb_utils.set_default_ccache(ccache)
 
             principal = krb_utils.get_principal(ccache_name=ccache)
 
@@ -268,6 +413,36 @@ class ldap2(CrudBackend, LDAPClient):
         org_filter = upg_entries[0].single_value['originfilter']
         return '(objectclass=disable)' not in org_filter
 
+    # Writes drop the cached lookups computed from the written entries
+
+    def add_entry(self, entry):
+        super(ldap2, self).add_entry(entry)
+        lookup_cache.invalidate(entry.dn)
+
+    def update_entry(self, entry):
+        super(ldap2, self).update_entry(entry)
+        lookup_cache.invalidate(entry.dn)
+
+    def delete_entry(self, entry_or_dn):
+        super(ldap2, self).delete_entry(entry_or_dn)
+        if isinstance(entry_or_dn, DN):
+            lookup_cache.invalidate(entry_or_dn)
+        else:
+            lookup_cache.invalidate(entry_or_dn.dn)
+
+    def move_entry(self, dn, new_dn, del_old=True):
+        super(ldap2, self).move_entry(dn, new_dn, del_old=del_old)
+        lookup_cache.invalidate(dn)
+        lookup_cache.invalidate(new_dn)
+
+    def modify_s(self, dn, modlist):
+        result = super(ldap2, self).modify_s(dn, modlist)
+        lookup_cache.invalidate(dn)
+        return result
+
+    def _entry_written(self, dn):
+        lookup_cache.invalidate(dn)
+
     def get_effective_rights(self, dn, attrs_list):
         """Returns the rights the currently bound user has for the given DN.
 
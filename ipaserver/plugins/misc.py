@@ -17,9 +17,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from ipalib import _
+from ipalib import Flag, _
 from ipalib.misc import env, plugins
+from ipalib.output import Output
 from ipalib.plugable import Registry
+from ipalib.request import timing_totals
+from .virtual import VirtualCommand
 
 __doc__ = _("""
 Misc plug-ins
@@ -30,3 +33,45 @@ register = Registry()
 
 env = register()(env)
 plugins = register()(plugins)
+
+
+@register()
+class request_timing(VirtualCommand):
+    __doc__ = _("""
+    Show where the server spent the time of the requests it served.
+
+    The totals are kept only while the request_timing option is enabled
+    in the server configuration. Each WSGI process of the server keeps
+    its own totals: the result covers only the requests served by the
+    process which handled this command, and --reset resets only its
+    totals.
+
+    Requires the "Read Request Timing" permission.
+    """)
+
+    takes_options = (
+        Flag(
+            'reset',
+            doc=_('Reset the totals of the server process after showing '
+                  'them'),
+        ),
+    )
+
+    has_output = (
+        Output(
+            'result',
+            type=dict,
+            doc=_('Totals of the timing of the requests served by the '
+                  'server process'),
+        ),
+    )
+
+    operation = 'request timing'
+
+    def execute(self, reset=False, **options):
+        self.check_access()
+
+        result = timing_totals.as_dict()
+        if reset:
+            timing_totals.reset()
+        return dict(result=result)
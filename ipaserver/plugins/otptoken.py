@@ -282,39 +282,74 @@ class otptoken_add(LDAPCreate):
     def execute(self, ipatokenuniqueid=None, **options):
         return super(otptoken_add, self).execute(ipatokenuniqueid, **options)
 
-    def pre_callback(self, ldap, dn, entry_attrs, attrs_list, *keys, **options):
-        # Fill in a default UUID when not specified.
-        if entry_attrs.get('ipatokenuniqueid', None) is None:
-            entry_attrs['ipatokenuniqueid'] = str(uuid.uuid4())
-            dn = DN("ipatokenuniqueid=%s" % entry_attrs['ipatokenuniqueid'], dn)
-
+    def prepare_entry(self, entry_attrs, user, **options):
+        """
+        Set the object class and the owner of a new token entry.
+
+        :param entry_attrs: entry of the token
+        :param user: entry of the user adding the token as returned by
+            user_find(whoami=True), or None
+        """
         if not _check_interval(options.get('ipatokennotbefore', None),
                                options.get('ipatokennotafter', None)):
             raise ValidationError(name='not_after',
                                   error='is before the validity start')
 
         # Set the object class and defaults for specific token types
-        options['type'] = options['type'].lower()
-        entry_attrs['objectclass'] = otptoken.object_class + ['ipatoken' + options['type']]
+        token_type = options['type'].lower()
+        entry_attrs['objectclass'] = otptoken.object_class + ['ipatoken' + token_type]
         for ttype, tattrs in TOKEN_TYPES.items():
-            if ttype != options['type']:
+            if ttype != token_type:
                 for tattr in tattrs:
                     if tattr in entry_attrs:
                         del entry_attrs[tattr]
 
         # If owner was not specified, default to the person adding this token.
         # If managedby was not specified, attempt a sensible default.
+        if user is not None:
+            cur_uid = user['uid'][0]
+            prev_uid = entry_attrs.setdefault('ipatokenowner', cur_uid)
+            if cur_uid == prev_uid:
+                # No need to look up the person adding this token
+                entry_attrs['ipatokenowner'] = DN(user['dn'])
+                entry_attrs.setdefault('managedby', user['dn'])
+
+        # Resolve the owner's dn
+        _normalize_owner(self.api.Object.user, entry_attrs)
+
+    def make_entry(self, ldap, user, *keys, **options):
+        """
+        Return the entry of the token this command would add.
+
+        The arguments are processed as for a call of the command, but the
+        user adding the token is not looked up and no URI is generated.
+
+        :param user: entry of the user adding the token as returned by
+            user_find(whoami=True), or None
+        """
+        keys, options = self.process_args(*keys, **options)
+        entry_attrs = ldap.make_entry(
+            self.obj.get_dn(*keys, **options),
+            self.args_options_2_entry(*keys, **options))
+        self.prepare_entry(entry_attrs, user, **options)
+        return entry_attrs
+
+    def pre_callback(self, ldap, dn, entry_attrs, attrs_list, *keys, **options):
+        # Fill in a default UUID when not specified.
+        if entry_attrs.get('ipatokenuniqueid', None) is None:
+            entry_attrs['ipatokenuniqueid'] = str(uuid.uuid4())
+            dn = DN("ipatokenuniqueid=%s" % entry_attrs['ipatokenuniqueid'], dn)
+
+        options['type'] = options['type'].lower()
+
+        user = None
         if 'ipatokenowner' not in entry_attrs or 'managedby' not in entry_attrs:
             result = self.api.Command.user_find(
                 whoami=True, no_members=False)['result']
             if result:
-                cur_uid = result[0]['uid'][0]
-                prev_uid = entry_attrs.setdefault('ipatokenowner', cur_uid)
-                if cur_uid == prev_uid:
-                    entry_attrs.setdefault('managedby', result[0]['dn'])
+                user = result[0]
 
-        # Resolve the owner's dn
-        _normalize_owner(self.api.Object.user, entry_attrs)
+        self.prepare_entry(entry_attrs, user, **options)
 
         # Get the issuer for the URI
         owner = entry_attrs.get('ipatokenowner', None)
@@ -24,6 +24,7 @@ import traceback
 import six
 
 from . import baseldap
+from .aci import aci_cache
 from .privilege import validate_permission_to_privilege
 from ipalib import errors
 from ipalib.parameters import Str, StrEnum, DNParam, Flag
@@ -694,14 +695,8 @@ class permission(baseldap.LDAPObject):
                 acientry = ldap.get_entry(location, ['aci'])
             except errors.NotFound:
                 acientry = ldap.make_entry(location)
-        acis = acientry.get('aci', ())
-        for acistring in acis:
-            try:
-                aci = ACI(acistring)
-            except SyntaxError as e:
-                logger.warning('Unparseable ACI %s: %s (at %s)',
-                               acistring, e, location)
-                continue
+        aciset = aci_cache.get(acientry)
+        for aci, acistring in aciset.by_name.get(wanted_aciname.lower(), ()):
             if aci.name == wanted_aciname:
                 return acientry, acistring
         else:
@@ -743,7 +738,7 @@ class permission(baseldap.LDAPObject):
         # (pylint thinks `base` is just a dict, but it's an LDAPEntry)
         assert base.dn == self.api.env.basedn, base  # pylint: disable=E1103
 
-        aci = ACI(acistring)
+        aci = aci_cache.parse(acistring)
 
         if 'target' in aci.target:
             target_entry.single_value['ipapermtarget'] = DN(strip_ldap_prefix(
@@ -757,7 +752,7 @@ class permission(baseldap.LDAPObject):
             target_entry.single_value['ipapermbindruletype'] = u'anonymous'
         else:
             target_entry.single_value['ipapermbindruletype'] = u'permission'
-        target_entry['ipapermright'] = aci.permissions
+        target_entry['ipapermright'] = list(aci.permissions)
         if 'targetattr' in aci.target:
             target_entry['ipapermincludedattr'] = [
                 unicode(a) for a in aci.target['targetattr']['expression']]
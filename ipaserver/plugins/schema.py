@@ -832,6 +832,11 @@ class schema(Command):
 
         return schema
 
+    def warm_up(self):
+        super(schema, self).warm_up()
+        if not hasattr(self.api, '_schema'):
+            setattr(self.api, '_schema', self._generate_schema())
+
     def execute(self, *args, **kwargs):
         try:
             schema = self.api._schema
@@ -21,7 +21,6 @@
 
 import logging
 
-from cryptography.hazmat.primitives import hashes
 import six
 
 from ipalib import api, errors, messages
@@ -262,17 +261,15 @@ def set_certificate_attrs(entry_attrs):
         cert = entry_attrs['usercertificate'][0]
     else:
         cert = entry_attrs['usercertificate']
-    entry_attrs['subject'] = unicode(DN(cert.subject))
-    entry_attrs['serial_number'] = unicode(cert.serial_number)
-    entry_attrs['serial_number_hex'] = u'0x%X' % cert.serial_number
-    entry_attrs['issuer'] = unicode(DN(cert.issuer))
-    entry_attrs['valid_not_before'] = x509.format_datetime(
-            cert.not_valid_before)
-    entry_attrs['valid_not_after'] = x509.format_datetime(cert.not_valid_after)
-    entry_attrs['sha1_fingerprint'] = x509.to_hex_with_colons(
-        cert.fingerprint(hashes.SHA1()))
-    entry_attrs['sha256_fingerprint'] = x509.to_hex_with_colons(
-        cert.fingerprint(hashes.SHA256()))
+    data = x509.get_certificate_data(cert)
+    entry_attrs['subject'] = unicode(data.subject)
+    entry_attrs['serial_number'] = unicode(data.serial_number)
+    entry_attrs['serial_number_hex'] = data.serial_number_hex
+    entry_attrs['issuer'] = unicode(data.issuer)
+    entry_attrs['valid_not_before'] = data.valid_not_before
+    entry_attrs['valid_not_after'] = data.valid_not_after
+    entry_attrs['sha1_fingerprint'] = data.sha1_fingerprint
+    entry_attrs['sha256_fingerprint'] = data.sha256_fingerprint
 
 def check_required_principal(ldap, principal):
     """
@@ -21,10 +21,11 @@ import logging
 import posixpath
 from copy import deepcopy
 
+import ldap as _ldap
 import six
 
 from ipalib import api, errors
-from ipalib import Bool
+from ipalib import Bool, Str
 from ipalib.plugable import Registry
 from .baseldap import (
     LDAPCreate,
@@ -100,12 +101,21 @@ EXAMPLES:
  Add a stageuser from the deleted users container:
    ipa stageuser-add  --first=Tim --last=User --from-delete tuser1
 
+ Activate several stage users at once:
+   ipa stageuser-activate-bulk tuser1 tuser2
+
+ Activate all stage users matching a search string:
+   ipa stageuser-activate-bulk --criteria=tuser
+
 """)
 
 logger = logging.getLogger(__name__)
 
 register = Registry()
 
+# Maximum number of stage users looked up by a single LDAP search
+ACTIVATE_LOOKUP_CHUNK_SIZE = 1000
+
 
 stageuser_output_params = baseuser_output_params
 
@@ -658,6 +668,37 @@ class stageuser_activate(LDAPQuery):
         else:
             return value
 
+    def _make_active_entry(self, ldap, args, options, staging_dn,
+                           entry_attrs):
+        """
+        Build the active entry for the staged entry entry_attrs, a dict with
+        lowercased attribute names.
+        """
+        active_dn = DN(staging_dn[0], api.env.container_user, api.env.basedn)
+
+        # Check the original entry is valid
+        self._check_validy(staging_dn, entry_attrs)
+
+        # Time to build the new entry
+        result_entry = {'dn' : active_dn}
+        new_entry_attrs = self.__dict_new_entry()
+        for (attr, values) in entry_attrs.items():
+            self.__merge_values(args, options, entry_attrs, new_entry_attrs, attr)
+            result_entry[attr] = values
+
+        # Allow Managed entry plugin to do its work
+        if 'description' in new_entry_attrs and NO_UPG_MAGIC in new_entry_attrs['description']:
+            new_entry_attrs['description'].remove(NO_UPG_MAGIC)
+            if result_entry['description'] == NO_UPG_MAGIC:
+                del result_entry['description']
+
+        for (k, v) in new_entry_attrs.items():
+            logger.debug("new entry: k=%r and v=%r)", k, v)
+
+        self._build_new_entry(ldap, staging_dn, entry_attrs, new_entry_attrs)
+
+        return ldap.make_entry(active_dn, new_entry_attrs)
+
     def execute(self, *args, **options):
 
         ldap = self.obj.backend
@@ -686,29 +727,10 @@ class stageuser_activate(LDAPQuery):
         except errors.NotFound:
             pass
 
-        # Check the original entry is valid
-        self._check_validy(staging_dn, entry_attrs)
-
-        # Time to build the new entry
-        result_entry = {'dn' : active_dn}
-        new_entry_attrs = self.__dict_new_entry()
-        for (attr, values) in entry_attrs.items():
-            self.__merge_values(args, options, entry_attrs, new_entry_attrs, attr)
-            result_entry[attr] = values
-
-        # Allow Managed entry plugin to do its work
-        if 'description' in new_entry_attrs and NO_UPG_MAGIC in new_entry_attrs['description']:
-            new_entry_attrs['description'].remove(NO_UPG_MAGIC)
-            if result_entry['description'] == NO_UPG_MAGIC:
-                del result_entry['description']
-
-        for (k, v) in new_entry_attrs.items():
-            logger.debug("new entry: k=%r and v=%r)", k, v)
-
-        self._build_new_entry(ldap, staging_dn, entry_attrs, new_entry_attrs)
+        entry = self._make_active_entry(
+            ldap, args, options, staging_dn, entry_attrs)
 
         # Add the Active entry
-        entry = ldap.make_entry(active_dn, new_entry_attrs)
         self._exc_wrapper(args, options, ldap.add_entry)(entry)
 
         # Now delete the Staging entry
@@ -750,6 +772,194 @@ class stageuser_activate(LDAPQuery):
         return result
 
 
+@register()
+class stageuser_activate_bulk(stageuser_activate):
+    __doc__ = _('Activate several stage users.')
+
+    msg_summary = ngettext(
+        '%(count)d stage user activated', '%(count)d stage users activated',
+        0
+    )
+
+    takes_options = (
+        Str('criteria?',
+            doc=_('Activate all stage users matching the search string'),
+        ),
+    )
+
+    has_output = (
+        output.summary,
+        output.Output('succeeded',
+            type=list,
+            doc=_('Stage users which were activated.'),
+        ),
+        output.Output('failed',
+            type=list,
+            doc=_('Stage users which could not be activated, with the '
+                  'reason.'),
+        ),
+        output.Output('completed',
+            type=int,
+            doc=_('Number of stage users activated.'),
+        ),
+    )
+    has_output_params = ()
+
+    def get_args(self):
+        for arg in super(stageuser_activate_bulk, self).get_args():
+            if arg.name == self.obj.primary_key.name:
+                yield arg.clone(multivalue=True, required=False)
+            else:
+                yield arg
+
+    def find_users(self, ldap, uids):
+        """
+        Look up the staged entries of the given users and the active users
+        with the same names with one paged search each per
+        ACTIVATE_LOOKUP_CHUNK_SIZE names.
+
+        Returns a tuple (staged, active) where staged maps lowercased user
+        names to their staged entries and active is a set of lowercased
+        names of existing active users.
+        """
+        staged = {}
+        active = set()
+        staging_base = DN(self.obj.container_dn, api.env.basedn)
+        active_base = DN(api.env.container_user, api.env.basedn)
+
+        for i in range(0, len(uids), ACTIVATE_LOOKUP_CHUNK_SIZE):
+            filter = ldap.make_filter_from_attr(
+                'uid', uids[i:i + ACTIVATE_LOOKUP_CHUNK_SIZE],
+                rules=ldap.MATCH_ANY)
+            try:
+                entries, _truncated = ldap.find_entries(
+                    filter, ['*'], base_dn=staging_base,
+                    scope=ldap.SCOPE_ONELEVEL, size_limit=0,
+                    paged_search=True)
+            except errors.EmptyResult:
+                entries = []
+            for entry in entries:
+                staged[entry.dn[0].value.lower()] = entry
+            try:
+                entries, _truncated = ldap.find_entries(
+                    filter, ['uid'], base_dn=active_base,
+                    scope=ldap.SCOPE_ONELEVEL, size_limit=0,
+                    paged_search=True)
+            except errors.EmptyResult:
+                entries = []
+            for entry in entries:
+                active.add(entry.dn[0].value.lower())
+
+        return staged, active
+
+    def execute(self, *args, **options):
+        ldap = self.obj.backend
+
+        uids = list(args[-1] or ())
+        criteria = options.get('criteria')
+        if criteria is not None:
+            found = self.api.Command.stageuser_find(
+                criteria, pkey_only=True, sizelimit=0)['result']
+            uids.extend(entry['uid'][0] for entry in found)
+        elif not uids:
+            raise errors.RequirementError(name=self.obj.primary_key.cli_name)
+
+        seen = set()
+        uids = [uid for uid in uids
+                if not (uid.lower() in seen or seen.add(uid.lower()))]
+
+        succeeded = []
+        failed = []
+
+        # Validate all users and build their active entries before anything
+        # is written
+        staged, active = self.find_users(ldap, uids)
+        to_activate = []
+        for uid in uids:
+            entry = staged.get(uid.lower())
+            if entry is None:
+                failed.append((uid, unicode(self.obj.object_not_found_msg % {
+                    'pkey': uid, 'oname': self.obj.object_name})))
+                continue
+            if uid.lower() in active:
+                failed.append((uid, unicode(
+                    _('active user with name "%(user)s" already exists') %
+                    dict(user=uid))))
+                continue
+            entry_attrs = dict((k.lower(), v) for (k, v) in entry.items())
+            try:
+                active_entry = self._make_active_entry(
+                    ldap, (uid,), options, entry.dn, entry_attrs)
+            except errors.PublicError as e:
+                failed.append((uid, unicode(e)))
+                continue
+            to_activate.append((uid, entry.dn, active_entry))
+
+        # Add the Active entries, letting the DNA and Managed entry plugins
+        # do their work
+        added = []
+        results = ldap.pipeline(
+            ((uid, staging_dn, entry.dn), 'add', entry)
+            for uid, staging_dn, entry in to_activate)
+        for (uid, staging_dn, active_dn), error in results:
+            if error is None:
+                added.append((uid, staging_dn, active_dn))
+            else:
+                failed.append((uid, unicode(error)))
+
+        # Now delete the Staging entries
+        activated = []
+        results = ldap.pipeline(
+            ((uid, staging_dn, active_dn), 'delete', staging_dn)
+            for uid, staging_dn, active_dn in added)
+        for (uid, staging_dn, active_dn), error in results:
+            if error is None:
+                activated.append((uid, active_dn))
+                continue
+            logger.error("Fail to delete the Staging user after "
+                         "activating it %s ", staging_dn)
+            try:
+                ldap.delete_entry(active_dn)
+            except Exception:
+                logger.error("Fail to cleanup activation. The user remains "
+                             "active %s", active_dn)
+            failed.append((uid, unicode(error)))
+
+        # add the users we just created into the default primary group
+        config = ldap.get_ipa_config()
+        def_primary_group = config.get('ipadefaultprimarygroup')
+        group_dn = self.api.Object['group'].get_dn(def_primary_group)
+
+        if activated:
+            modlist = [(_ldap.MOD_ADD, 'member',
+                        [active_dn for _uid, active_dn in activated])]
+            try:
+                with ldap.error_handler():
+                    modlist = [(a, b, ldap.encode(c)) for a, b, c in modlist]
+                    ldap.conn.modify_s(str(group_dn), modlist)
+            except errors.DatabaseError:
+                # some of the users are already members of the group (e.g.
+                # through an automember rule), add them one by one
+                for uid, active_dn in activated:
+                    try:
+                        ldap.add_entry_to_group(active_dn, group_dn)
+                    except errors.AlreadyGroupMember:
+                        pass
+                    except errors.PublicError as e:
+                        failed.append((uid, unicode(e)))
+                        continue
+                    succeeded.append(uid)
+            else:
+                succeeded.extend(uid for uid, _active_dn in activated)
+
+        return dict(
+            summary=unicode(self.msg_summary % dict(count=len(succeeded))),
+            succeeded=succeeded,
+            failed=failed,
+            completed=len(succeeded),
+        )
+
+
 @register()
 class stageuser_add_manager(baseuser_add_manager):
     __doc__ = _("Add a manager to the stage user entry")
@@ -418,6 +418,18 @@ def add_range(myapi, trustinstance, range_name, dom_sid, *keys, **options):
     return range_type, range_size, base_id
 
 
+def flush_trust_cache():
+    """
+    Drop cached trust topology and trusted domain object lookups.
+
+    Must be called whenever trusts or trusted domains are added or removed.
+    This only affects the current process, other server processes notice
+    the change on their next check of the trusts subtree.
+    """
+    if _bindings_installed:
+        ipaserver.dcerpc.trust_cache.flush()
+
+
 def fetch_trusted_domains_over_dbus(myapi, forest_name):
     if not _bindings_installed:
         return
@@ -450,6 +462,7 @@ def fetch_trusted_domains_over_dbus(myapi, forest_name):
             error=_('Fetching domains from trusted forest failed. '
                     'See details in the error_log')
         )
+    flush_trust_cache()
     return
 
 
@@ -781,6 +794,8 @@ ipa idrange-del before retrying the command with the desired range type.
                 # add_new_domains_from_trust() on its own.
                 fetch_trusted_domains_over_dbus(self.api, result['value'])
 
+        flush_trust_cache()
+
         # Format the output into human-readable values unless `--raw` is given
         self._format_trust_attrs(result, **options)
         del result['verified']
@@ -1080,6 +1095,10 @@ class trust_del(LDAPDelete):
 
     msg_summary = _('Deleted trust "%(value)s"')
 
+    def post_callback(self, ldap, dn, *keys, **options):
+        flush_trust_cache()
+        return True
+
 
 @register()
 class trust_mod(LDAPUpdate):
@@ -1619,6 +1638,10 @@ class trustdomain_add(LDAPCreate):
         e_attrs['ipanttrustpartner'] = [dn[0]['cn']]
         return dn
 
+    def post_callback(self, ldap, dn, entry_attrs, *keys, **options):
+        flush_trust_cache()
+        return dn
+
 
 @register()
 class trustdomain_del(LDAPDelete):
@@ -1653,6 +1676,7 @@ class trustdomain_del(LDAPDelete):
                 pass
 
         result = super(trustdomain_del, self).execute(*keys, **options)
+        flush_trust_cache()
         result['value'] = pkey_to_value(keys[1], options)
         return result
 
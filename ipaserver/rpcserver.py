@@ -23,10 +23,15 @@ RPC server.
 Also see the `ipalib.rpc` module.
 """
 
+import itertools
+import json
 import logging
 from xml.sax.saxutils import escape
 import os
+import threading
+import time
 import traceback
+import zlib
 
 import gssapi
 import requests
@@ -48,9 +53,10 @@ from ipalib.backend import Executioner
 from ipalib.errors import (PublicError, InternalError, JSONError,
     CCacheError, RefererError, InvalidSessionPassword, NotFound, ACIError,
     ExecutionError, PasswordExpired, KrbPrincipalExpired, UserLocked)
-from ipalib.request import context, destroy_context
+from ipalib.request import (
+    context, destroy_context, start_timing, timed, timing_totals)
 from ipalib.rpc import (xml_dumps, xml_loads,
-    json_encode_binary, json_decode_binary)
+    json_iterencode_binary, json_decode_binary)
 from ipapython.dn import DN
 from ipaserver.plugins.ldap2 import ldap2
 from ipalib.backend import Backend
@@ -198,6 +204,96 @@ def read_input(environ):
     return environ['wsgi.input'].read(length).decode('utf-8')
 
 
+def accepts_gzip(environ):
+    """
+    Return ``True`` if the Accept-Encoding request header allows gzip.
+    """
+    for coding in environ.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _sep, params = coding.partition(';')
+        if coding.strip().lower() not in ('gzip', 'x-gzip'):
+            continue
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def gzip_chunks(chunks):
+    """
+    Compress an iterable of byte strings with gzip, chunk by chunk.
+    """
+    compressor = zlib.compressobj(
+        zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_chunks(chunks):
+    """
+    Return an iterator of ``chunks`` which produces the first one right away.
+
+    An error producing the first chunk is raised here, before the response
+    is started. An error producing a later one is logged and raised again
+    while the response is sent, so that the server aborts the connection
+    rather than ending a truncated response normally. The time spent
+    producing the later chunks is added to the 'marshal' phase of the
+    request.
+    """
+    chunks = iter(chunks)
+    head = list(itertools.islice(chunks, 1))
+    timing = getattr(context, 'request_timing', None)
+    return itertools.chain(head, _stream_rest(chunks, timing))
+
+
+def _stream_rest(chunks, timing):
+    seconds = 0.0
+    try:
+        while True:
+            start = time.time()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                seconds += time.time() - start
+            yield chunk
+    except Exception:
+        logger.exception('failed to produce the response, aborting it')
+        raise
+    if timing is not None:
+        timing.extend('marshal', seconds)
+
+
+class ClosingResponse(object):
+    """
+    WSGI response iterable which calls ``on_close`` when the server is done
+    with the response, so that per-request cleanup waits for a response
+    produced while it is sent.
+    """
+
+    def __init__(self, response, on_close):
+        self.__response = response
+        self.__on_close = on_close
+
+    def __iter__(self):
+        return iter(self.__response)
+
+    def close(self):
+        try:
+            close = getattr(self.__response, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self.__on_close()
+
+
 def params_2_args_options(params):
     if len(params) == 0:
         return (tuple(), dict())
@@ -261,10 +357,37 @@ class wsgi_dispatch(Executioner, HTTP_Status):
 
     def __call__(self, environ, start_response):
         logger.debug('WSGI wsgi_dispatch.__call__:')
+        if self.api.env.request_timing:
+            return self.__timed_route(environ, start_response)
         try:
-            return self.route(environ, start_response)
-        finally:
+            response = self.route(environ, start_response)
+        except BaseException:
+            destroy_context()
+            raise
+        return ClosingResponse(response, destroy_context)
+
+    def __timed_route(self, environ, start_response):
+        timing = start_timing()
+        timing.info['path'] = environ.get('PATH_INFO')
+
+        def timed_start_response(status, headers, *args):
+            if self.api.env.debug:
+                headers.append(('Server-Timing', timing.server_timing()))
+            return start_response(status, headers, *args)
+
+        def finish():
             destroy_context()
+            timing_totals.add(timing)
+            record = dict(timing.info, **timing.as_dict())
+            logger.info('request timing: %s',
+                        json.dumps(record, sort_keys=True))
+
+        try:
+            response = self.route(environ, timed_start_response)
+        except BaseException:
+            finish()
+            raise
+        return ClosingResponse(response, finish)
 
     def _on_finalize(self):
         self.url = self.env['mount_ipa']
@@ -303,9 +426,10 @@ class WSGIExecutioner(Executioner):
     Base class for execution backends with a WSGI application interface.
     """
 
-    headers = None
     content_type = None
     key = ''
+    # responses from this size on are compressed if the client accepts gzip
+    compress_threshold = 4096
 
     _system_commands = {}
 
@@ -334,11 +458,11 @@ class WSGIExecutioner(Executioner):
         result = None
         error = None
         _id = None
-        lang = os.environ['LANG']
         name = None
         args = ()
         options = {}
         command = None
+        command_params = {}
 
         e = None
         if not 'HTTP_REFERER' in environ:
@@ -354,20 +478,32 @@ class WSGIExecutioner(Executioner):
                     reg = lang_reg.split('-')[1].upper()
                 else:
                     reg = lang_.upper()
-                os.environ['LANG'] = '%s_%s' % (lang_, reg)
-            if (
-                environ.get('CONTENT_TYPE', '').startswith(self.content_type)
-                and environ['REQUEST_METHOD'] == 'POST'
-            ):
-                data = read_input(environ)
-                (name, args, options, _id) = self.unmarshal(data)
-            else:
-                (name, args, options, _id) = self.simple_unmarshal(environ)
-            if name in self._system_commands:
-                result = self._system_commands[name](self, *args, **options)
-            else:
-                command = self._get_command(name)
-                result = command(*args, **options)
+                # the language is per request, see ipalib.text
+                context.languages = ['%s_%s' % (lang_, reg)]
+            with timed('unmarshal'):
+                if (
+                    environ.get('CONTENT_TYPE', '').startswith(
+                        self.content_type)
+                    and environ['REQUEST_METHOD'] == 'POST'
+                ):
+                    data = read_input(environ)
+                    (name, args, options, _id) = self.unmarshal(data)
+                else:
+                    (name, args, options, _id) = self.simple_unmarshal(
+                        environ)
+            with timed('execute'):
+                if name in self._system_commands:
+                    result = self._system_commands[name](
+                        self, *args, **options)
+                else:
+                    command = self._get_command(name)
+                    # Collects the params merged by the command, only while
+                    # it runs
+                    context.command_params = command_params
+                    try:
+                        result = command(*args, **options)
+                    finally:
+                        del context.command_params
         except PublicError as e:
             if self.api.env.debug:
                 logger.debug('WSGI wsgi_execute PublicError: %s',
@@ -378,13 +514,15 @@ class WSGIExecutioner(Executioner):
                 'non-public: %s: %s', e.__class__.__name__, str(e)
             )
             error = InternalError()
-        finally:
-            os.environ['LANG'] = lang
 
         principal = getattr(context, 'principal', 'UNKNOWN')
         if command is not None:
             try:
-                params = command.args_options_2_params(*args, **options)
+                # Reuse the params the command merged while it was running,
+                # merge them again only if it did not get that far
+                params = command_params.get(command)
+                if params is None:
+                    params = command.args_options_2_params(*args, **options)
             except Exception as e:
                 logger.info(
                    'exception %s caught when converting options: %s',
@@ -410,8 +548,13 @@ class WSGIExecutioner(Executioner):
                         name,
                         type(error).__name__)
 
+        timing = getattr(context, 'request_timing', None)
+        if timing is not None:
+            timing.info.update(command=name, principal=principal)
+
         version = options.get('version', VERSION_WITHOUT_CAPABILITIES)
-        return self.marshal(result, error, _id, version)
+        with timed('marshal'):
+            return self.marshal(result, error, _id, version)
 
     def simple_unmarshal(self, environ):
         name = environ['PATH_INFO'].strip('/')
@@ -427,11 +570,10 @@ class WSGIExecutioner(Executioner):
         try:
             status = HTTP_STATUS_SUCCESS
             response = self.wsgi_execute(environ)
-            if self.headers:
-                headers = self.headers
-            else:
-                headers = [('Content-Type',
-                            self.content_type + '; charset=utf-8')]
+            headers = [('Content-Type',
+                        self.content_type + '; charset=utf-8')]
+            if accepts_gzip(environ):
+                response = self.compress(response, headers)
         except Exception:
             logger.exception('WSGI %s.__call__():', self.name)
             status = HTTP_STATUS_SERVER_ERROR
@@ -443,7 +585,35 @@ class WSGIExecutioner(Executioner):
             headers.append(('IPASESSION', logout_cookie))
 
         start_response(status, headers)
-        return [response]
+        if isinstance(response, bytes):
+            return [response]
+        # marshal() may return an iterator of chunks of the response
+        return response
+
+    def compress(self, response, headers):
+        """
+        Compress ``response`` with gzip unless it is smaller than
+        ``compress_threshold``.
+
+        Only the beginning of a chunked response is read to decide, the rest
+        is compressed while it is sent.
+        """
+        if isinstance(response, bytes):
+            response = [response]
+        chunks = iter(response)
+        head = []
+        size = 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size >= self.compress_threshold:
+                break
+        else:
+            return head
+
+        headers.append(('Content-Encoding', 'gzip'))
+        headers.append(('Vary', 'Accept-Encoding'))
+        return gzip_chunks(itertools.chain(head, chunks))
 
     def unmarshal(self, data):
         raise NotImplementedError('%s.unmarshal()' % type(self).__name__)
@@ -491,10 +661,11 @@ class jsonserver(WSGIExecutioner, HTTP_Status):
             principal=unicode(principal),
             version=unicode(VERSION),
         )
-        dump = json_encode_binary(
+        # Serialize entry by entry while the response is sent, so that the
+        # whole result is never primed or encoded at once
+        return stream_chunks(json_iterencode_binary(
             response, version, pretty_print=self.api.env.debug
-        )
-        return dump.encode('utf-8')
+        ))
 
     def unmarshal(self, data):
         try:
@@ -625,8 +796,9 @@ class KerberosSession(HTTP_Status):
         gss_name = gssapi.Name(principal, gssapi.NameType.kerberos_principal)
 
         # Fail if Kerberos credentials are expired or missing
-        creds = get_credentials_if_valid(name=gss_name,
-                                         ccache_name=ccache_name)
+        with timed('auth'):
+            creds = get_credentials_if_valid(name=gss_name,
+                                             ccache_name=ccache_name)
         if not creds:
             logger.debug(
                 'ccache expired or invalid, deleting session, need login')
@@ -671,11 +843,6 @@ class KerberosWSGIExecutioner(WSGIExecutioner, KerberosSession):
         logger.debug('KerberosWSGIExecutioner.__call__:')
         user_ccache=environ.get('KRB5CCNAME')
 
-        object.__setattr__(
-            self, 'headers',
-            [('Content-Type', '%s; charset=utf-8' % self.content_type)]
-        )
-
         if user_ccache is None:
 
             status = HTTP_STATUS_SERVER_ERROR
@@ -694,7 +861,9 @@ class KerberosWSGIExecutioner(WSGIExecutioner, KerberosSession):
         except PublicError as e:
             status = HTTP_STATUS_SUCCESS
             response = status.encode('utf-8')
-            start_response(status, self.headers)
+            start_response(
+                status,
+                [('Content-Type', '%s; charset=utf-8' % self.content_type)])
             return self.marshal(None, e)
         finally:
             destroy_context()
@@ -926,8 +1095,10 @@ class login_password(Backend, KerberosSession):
             return self.bad_request(environ, start_response, "no password specified")
 
         # Get the ccache we'll use and attempt to get credentials in it with user,password
-        ipa_ccache_name = os.path.join(paths.IPA_CCACHES,
-                                       'kinit_{}'.format(os.getpid()))
+        ipa_ccache_name = os.path.join(
+            paths.IPA_CCACHES,
+            'kinit_{}_{}'.format(os.getpid(), threading.current_thread().ident)
+        )
         try:
             # try to remove in case an old file was there
             os.unlink(ipa_ccache_name)
@@ -962,8 +1133,10 @@ class login_password(Backend, KerberosSession):
 
     def kinit(self, principal, password, ccache_name):
         # get anonymous ccache as an armor for FAST to enable OTP auth
-        armor_path = os.path.join(paths.IPA_CCACHES,
-                                  "armor_{}".format(os.getpid()))
+        armor_path = os.path.join(
+            paths.IPA_CCACHES,
+            "armor_{}_{}".format(os.getpid(), threading.current_thread().ident)
+        )
 
         logger.debug('Obtaining armor in ccache %s', armor_path)
 
@@ -74,11 +74,12 @@ The available role/attribute instances are stored in
 import abc
 from collections import namedtuple, defaultdict
 
-from ldap import SCOPE_ONELEVEL
+from ldap import SCOPE_ONELEVEL, SCOPE_SUBTREE
 import six
 
 from ipalib import _, errors
 from ipapython.dn import DN
+from ipaserver.plugins.ldap2 import lookup_cache
 
 
 if six.PY3:
@@ -539,8 +540,18 @@ class ServiceBasedRole(BaseServerRole):
         return search_base, search_filter
 
     def status(self, api_instance, server=None):
-        return super(ServiceBasedRole, self).status(
-            api_instance, server=server, attrs_list=('ipaConfigString', 'cn'))
+        # the status only depends on the service entries of the masters,
+        # it is cached in the process until they change
+        ldap2 = api_instance.Backend.ldap2
+        masters_dn = DN(api_instance.env.container_masters,
+                        api_instance.env.basedn)
+        result = lookup_cache.get(
+            ldap2, ('server role status', self.name, server),
+            [(masters_dn, SCOPE_SUBTREE)],
+            lambda: super(ServiceBasedRole, self).status(
+                api_instance, server=server,
+                attrs_list=('ipaConfigString', 'cn')))
+        return [dict(r) for r in result]
 
 
 class ADtrustBasedRole(BaseServerRole):
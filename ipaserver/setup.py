@@ -45,6 +45,9 @@ if __name__ == '__main__':
             'ipaserver.install.plugins',
             'ipaserver.install.server',
         ],
+        package_data={
+            'ipaserver.plugins': ['plugins.manifest'],
+        },
         install_requires=[
             "cryptography",
             "custodia",
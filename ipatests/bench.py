@@ -0,0 +1,364 @@
+#
+# Copyright (C) 2017  FreeIPA Contributors see COPYING for license
+#
+"""Microbenchmarks of ipalib and ipapython hot paths
+
+The benchmarks run offline on synthetic data: LDAP results are converted and
+decoded by an LDAPClient which never connects to a server. Run them from the
+top of the source tree:
+
+    $ python -m ipatests.bench --save base.json      # store a baseline
+    $ python -m ipatests.bench -b base.json          # compare with it
+    $ python -m ipatests.bench -b base.json dn_ json_  # only some benchmarks
+
+A baseline file keeps the results separately for each major version of
+Python. A benchmark which got slower than its baseline by more than the
+threshold is reported as a regression and makes the run fail. Timings depend
+on the machine, so compare against a baseline saved on the same machine, e.g.
+one saved before applying a change.
+"""
+from __future__ import print_function
+
+import argparse
+import collections
+import datetime
+import json
+import sys
+import timeit
+
+import six
+
+from ipalib import create_api, Command, Flag, Int, Str
+from ipalib.rpc import (
+    json_encode_binary, json_decode_binary, json_iterencode_binary,
+    xml_dumps, xml_loads, xml_wrap)
+from ipapython.dn import DN
+from ipapython.ipaldap import LDAPClient
+from ipapython.version import API_VERSION
+
+if six.PY3:
+    unicode = str
+
+USERS_DN = DN(('cn', 'users'), ('cn', 'accounts'),
+              ('dc', 'example'), ('dc', 'com'))
+
+# name -> (function returning the callable to time, calls per round)
+benchmarks = collections.OrderedDict()
+
+
+def benchmark(number):
+    """
+    Register a benchmark which times ``number`` calls per round.
+
+    The decorated function sets the benchmark up and returns the callable
+    to time, or raises ImportError if the benchmark cannot run here.
+    """
+    def register(setup):
+        benchmarks[setup.__name__] = (setup, number)
+        return setup
+    return register
+
+
+def make_ldap_result(count=100):
+    """
+    Return ``count`` synthetic user entries as python-ldap returns them.
+    """
+    result = []
+    for i in range(count):
+        uid = 'user%d' % i
+        result.append(('uid=%s,%s' % (uid, USERS_DN), {
+            'uid': [uid.encode('ascii')],
+            'cn': [('User %d' % i).encode('ascii')],
+            'givenName': [b'User'],
+            'sn': [str(i).encode('ascii')],
+            'uidNumber': [str(100000 + i).encode('ascii')],
+            'gidNumber': [str(100000 + i).encode('ascii')],
+            'homeDirectory': [('/home/%s' % uid).encode('ascii')],
+            'loginShell': [b'/bin/sh'],
+            'mail': [('%s@example.com' % uid).encode('ascii')],
+            'krbPrincipalName': [('%s@EXAMPLE.COM' % uid).encode('ascii')],
+            'memberOf': [
+                b'cn=ipausers,cn=groups,cn=accounts,dc=example,dc=com',
+                b'cn=admins,cn=groups,cn=accounts,dc=example,dc=com',
+            ],
+            'objectClass': [b'top', b'person', b'inetorgperson',
+                            b'krbprincipalaux', b'posixaccount'],
+        }))
+    return result
+
+
+def make_command_result(count=100):
+    """
+    Return a synthetic result of a ``*_find`` command.
+    """
+    entries = []
+    for i in range(count):
+        uid = u'user%d' % i
+        entries.append(dict(
+            dn=DN(('uid', uid), USERS_DN),
+            uid=(uid,),
+            cn=(u'User %d' % i,),
+            uidnumber=(unicode(100000 + i),),
+            homedirectory=(u'/home/%s' % uid,),
+            memberof_group=(u'ipausers', u'admins'),
+            krblastpwdchange=(datetime.datetime(2017, 1, 1, 12, 0, 0),),
+            usercertificate=(bytes(bytearray(range(256))),),
+            nsaccountlock=False,
+        ))
+    return dict(
+        result=tuple(entries),
+        count=count,
+        truncated=False,
+        summary=u'%d users matched' % count,
+    )
+
+
+def make_client():
+    # python-ldap only connects on the first operation
+    return LDAPClient('ldap://bench.invalid', no_schema=True)
+
+
+@benchmark(number=100)
+def json_encode(count=100):
+    result = make_command_result(count)
+    return lambda: json_encode_binary(result, API_VERSION)
+
+
+@benchmark(number=100)
+def json_iterencode(count=100):
+    result = make_command_result(count)
+    return lambda: b''.join(json_iterencode_binary(result, API_VERSION))
+
+
+@benchmark(number=100)
+def json_decode(count=100):
+    data = json_encode_binary(make_command_result(count), API_VERSION)
+    return lambda: json_decode_binary(data)
+
+
+@benchmark(number=100)
+def xml_wrap_result(count=100):
+    result = make_command_result(count)
+    return lambda: xml_wrap(result, API_VERSION)
+
+
+@benchmark(number=50)
+def xml_dumps_result(count=100):
+    result = make_command_result(count)
+    return lambda: xml_dumps((result,), API_VERSION, methodresponse=True)
+
+
+@benchmark(number=50)
+def xml_loads_result(count=100):
+    data = xml_dumps((make_command_result(count),), API_VERSION,
+                     methodresponse=True)
+    return lambda: xml_loads(data)
+
+
+@benchmark(number=1000)
+def dn_parse():
+    dns = [str(DN(('uid', 'user%d' % i), USERS_DN)) for i in range(10)]
+    return lambda: [DN(dn) for dn in dns]
+
+
+@benchmark(number=1000)
+def dn_hash():
+    dns = [DN(('uid', 'user%d' % i), USERS_DN) for i in range(10)]
+    return lambda: [hash(dn) for dn in dns]
+
+
+@benchmark(number=1000)
+def dn_compare():
+    dns = [DN(('uid', 'user%d' % i), USERS_DN) for i in range(10)]
+    others = [DN(dn) for dn in dns]
+    return lambda: [dn == other for dn, other in zip(dns, others)] + [
+        dn.endswith(USERS_DN) for dn in dns]
+
+
+@benchmark(number=100)
+def ldap_convert_result(count=100):
+    client = make_client()
+    result = make_ldap_result(count)
+    return lambda: client._convert_result(result)
+
+
+@benchmark(number=100)
+def ldap_decode(count=100):
+    client = make_client()
+    entries = [
+        dict((k.encode('utf-8'), v) for k, v in attrs.items())
+        for _dn, attrs in make_ldap_result(count)
+    ]
+    return lambda: [client.decode(attrs, None) for attrs in entries]
+
+
+@benchmark(number=100)
+def entry_to_dict(count=100):
+    # pylint: disable=import-error,ipa-forbidden-import
+    from ipaserver.plugins.baseldap import entry_to_dict as to_dict
+    # pylint: enable=import-error,ipa-forbidden-import
+    entries = make_client()._convert_result(make_ldap_result(count))
+    return lambda: [to_dict(entry, all=True) for entry in entries]
+
+
+@benchmark(number=10000)
+def param_convert():
+    params = (
+        (Str('uid'), u'jdoe'),
+        (Str('mail*', normalizer=lambda value: value.lower()),
+         [u'JDoe@Example.com']),
+        (Int('uidnumber', minvalue=1), u'1234'),
+        (Flag('all'), True),
+    )
+
+    def convert():
+        for param, value in params:
+            value = param.normalize(value)
+            value = param.convert(value)
+            param.validate(value)
+    return convert
+
+
+class bench_user_add(Command):
+    takes_args = (
+        Str('uid', cli_name='login'),
+    )
+    takes_options = (
+        Str('givenname', cli_name='first'),
+        Str('sn', cli_name='last'),
+        Str('cn',
+            default_from=lambda givenname, sn: u'%s %s' % (givenname, sn),
+            autofill=True,
+        ),
+        Str('displayname?',
+            default_from=lambda givenname, sn: u'%s %s' % (givenname, sn),
+            autofill=True,
+        ),
+        Str('loginshell?', default=u'/bin/sh', autofill=True),
+        Str('mail*', normalizer=lambda value: value.lower()),
+        Int('uidnumber?', minvalue=1),
+        Flag('all'),
+        Flag('raw'),
+    )
+
+    def execute(self, *args, **options):
+        return dict(result=None)
+
+
+@benchmark(number=10000)
+def command_call():
+    api = create_api(mode='unit_test')
+    api.env.in_tree = True
+    api.env.in_server = True
+    api.finalize()
+
+    command = bench_user_add(api)
+    command.finalize()
+
+    return lambda: command(u'jdoe', givenname=u'John', sn=u'Doe',
+                           mail=[u'JDoe@Example.com'], uidnumber=u'1234',
+                           version=API_VERSION)
+
+
+@benchmark(number=1)
+def api_finalize():
+    def finalize():
+        api = create_api(mode=None)
+        api.bootstrap(
+            context='bench',
+            in_server=True,
+            in_tree=True,
+            validate_api=True,
+            enable_ra=True,
+            mode='developer',
+            plugins_on_demand=False,
+            realm='EXAMPLE.COM',
+            domain='example.com',
+        )
+        api.finalize()
+    # Import the server plugins outside of the timed rounds
+    finalize()
+    return finalize
+
+
+def run(name, repeat):
+    """
+    Return the best time of one call of benchmark ``name`` in usec.
+    """
+    setup, number = benchmarks[name]
+    func = setup()
+    timings = timeit.repeat(func, number=number, repeat=repeat)
+    return min(timings) / number * 10**6
+
+
+def read_baseline(filename):
+    if filename is None:
+        return {}
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except IOError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help='run only benchmarks whose name starts with '
+                             'NAME')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of rounds (default: 5)')
+    parser.add_argument('-t', '--threshold', type=float, default=25.0,
+                        help='slowdown in percent reported as a regression '
+                             '(default: 25)')
+    parser.add_argument('-b', '--baseline', metavar='FILE',
+                        help='compare the results with the baseline in FILE')
+    parser.add_argument('--save', metavar='FILE',
+                        help='store the results as the baseline in FILE')
+    options = parser.parse_args()
+
+    key = 'python%d' % sys.version_info[0]
+    baseline = read_baseline(options.baseline).get(key, {})
+    results = collections.OrderedDict()
+    regressions = []
+
+    for name in benchmarks:
+        if options.names and not any(name.startswith(n)
+                                     for n in options.names):
+            continue
+        try:
+            usec = run(name, options.repeat)
+        except ImportError as e:
+            print('%-24s skipped: %s' % (name, e))
+            continue
+        results[name] = usec
+
+        line = '%-24s %12.2f usec' % (name, usec)
+        if name in baseline:
+            change = (usec / baseline[name] - 1) * 100
+            line += '  %+7.1f%%' % change
+            if change > options.threshold:
+                line += '  REGRESSION'
+                regressions.append(name)
+        print(line)
+
+    if options.save:
+        all_baselines = read_baseline(options.save)
+        all_baselines.setdefault(key, {}).update(results)
+        with open(options.save, 'w') as f:
+            json.dump(all_baselines, f, indent=4, sort_keys=True)
+            f.write('\n')
+        print('Baseline saved to %s' % options.save)
+        return 0
+
+    if regressions:
+        print('%d benchmark(s) slower than the baseline by more than %g%%: '
+              '%s' % (len(regressions), options.threshold,
+                      ', '.join(regressions)))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#
+# Copyright (C) 2018  FreeIPA Contributors see COPYING for license
+#
+
+import threading
+import time
+
+import pytest
+
+from ipaclient.install import ipadiscovery
+
+
+@pytest.mark.tier0
+def test_run_in_parallel_order():
+    # later items finish first, results are still yielded in order
+    def func(item):
+        time.sleep(0.05 * (3 - item))
+        return item * 2
+
+    results = list(ipadiscovery.run_in_parallel(func, range(4)))
+    assert results == [(0, True, 0), (1, True, 2), (2, True, 4),
+                       (3, True, 6)]
+
+
+@pytest.mark.tier0
+def test_run_in_parallel_bounded():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def func(item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(item)
+
+    list(ipadiscovery.run_in_parallel(func, range(10), max_workers=3))
+    assert max(peak) <= 3
+
+
+@pytest.mark.tier0
+def test_run_in_parallel_deadline():
+    event = threading.Event()
+
+    def func(item):
+        if item == 'slow':
+            event.wait(5)
+        return item
+
+    try:
+        results = list(ipadiscovery.run_in_parallel(
+            func, ['fast', 'slow'], deadline=time.time() + 0.1))
+    finally:
+        event.set()
+    assert results == [('fast', True, 'fast'), ('slow', False, None)]
+
+
+@pytest.mark.tier0
+def test_search_keeps_srv_order(monkeypatch):
+    # the first server answers last, it is selected nevertheless
+    servers = ['a.example.test', 'b.example.test']
+    delays = {'a.example.test': 0.1, 'b.example.test': 0}
+
+    def probe(self, thost, trealm, ca_cert_path):
+        time.sleep(delays[thost])
+        return [0, thost, trealm], None
+
+    disc = ipadiscovery.IPADiscovery()
+    monkeypatch.setattr(disc, 'ipadns_search_srv',
+                        lambda *args, **kwargs: servers)
+    monkeypatch.setattr(disc, 'ipadnssearchkrbrealm', lambda: 'EXAMPLE.TEST')
+    monkeypatch.setattr(disc, 'ipadnssearchkrbkdc', lambda: ','.join(servers))
+    monkeypatch.setattr(ipadiscovery.IPADiscovery,
+                        '_IPADiscovery__probe_ldap', probe)
+
+    assert disc.search(domain='example.test') == 0
+    assert disc.server == 'a.example.test'
+    assert disc.servers == ['a.example.test']
+    assert disc.realm == 'EXAMPLE.TEST'
+    assert disc.kdc == 'a.example.test,b.example.test'
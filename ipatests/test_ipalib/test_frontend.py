@@ -466,6 +466,14 @@ class test_Command(ClassChecker):
         assert 'option2' in e
         assert e['option2'] == u'some value'
 
+        # The second call reuses the cached plan
+        e = o.get_default(option0=u'other value')
+        assert e['option1'] == u'other value'
+        assert e['option2'] == u'other value'
+        e = o.get_default(option0=u'other value', option1=u'one')
+        assert 'option1' not in e
+        assert e['option2'] == u'one'
+
     def test_validate(self):
         """
         Test the `ipalib.frontend.Command.validate` method.
@@ -605,6 +613,29 @@ class test_Command(ClassChecker):
         assert o.params_2_args_options(two=2) == ((), dict(two=2))
         assert o.params_2_args_options(two=2, one=1) == ((1,), dict(two=2))
 
+    def test_process_args(self):
+        """
+        Test the `ipalib.frontend.Command.process_args` method.
+        """
+        class my_cmd(self.cls):
+            takes_args = (
+                parameters.Str('one', normalizer=lambda value: value.lower()),
+            )
+            takes_options = (
+                parameters.Int('two', default=2),
+            )
+
+        api, _home = create_test_api(in_server=True)
+        api.finalize()
+        o = my_cmd(api)
+        o.finalize()
+        (args, options) = o.process_args(u'ONE')
+        assert args == (u'one',)
+        assert options == dict(two=2, version=API_VERSION)
+
+        e = raises(errors.ConversionError, o.process_args, u'one', two=u'x')
+        assert e.name == 'two'
+
     def test_run(self):
         """
         Test the `ipalib.frontend.Command.run` method.
@@ -24,12 +24,14 @@ Test the `ipalib.plugable` module.
 # FIXME: Pylint errors
 # pylint: disable=no-member
 
+import json
 import os
 import textwrap
 
 from ipalib import plugable, errors, create_api
 from ipatests.util import raises, read_only
 from ipatests.util import ClassChecker, create_test_api, TempHome
+from ipapython.version import VERSION
 
 import pytest
 
@@ -247,6 +249,53 @@ class test_API(ClassChecker):
         e = raises(Exception, api.finalize)
         assert str(e) == 'API.finalize() already called', str(e)
 
+    def test_warm_up(self):
+        """
+        Test the `ipalib.plugable.API.warm_up` method.
+        """
+        class base0(plugable.Plugin):
+            warmed_up = 0
+
+            def warm_up(self):
+                super(base0, self).warm_up()
+                object.__setattr__(self, 'warmed_up', self.warmed_up + 1)
+
+        class base1(base0):
+            pass
+
+        class API(plugable.API):
+            bases = (base0, base1)
+            modules = ()
+
+        api = API()
+        api.env.mode = 'unit_test'
+        api.env.in_tree = True
+        api.env.plugins_on_demand = True
+
+        class base0_plugin0(base0):
+            def warm_up(self):
+                raise RuntimeError('warm-up failure')
+        api.add_plugin(base0_plugin0)
+
+        class base1_plugin0(base1):
+            pass
+        api.add_plugin(base1_plugin0)
+
+        assert api.isdone('warm_up') is False
+        api.warm_up()
+        assert api.isdone('finalize') is True
+        assert api.isdone('warm_up') is True
+
+        # Plugins in several namespaces are warmed up once, failures are
+        # only logged
+        inst = api.base1.base1_plugin0
+        assert inst is api.base0.base1_plugin0
+        assert inst.warmed_up == 1
+        assert api.base0.base0_plugin0.warmed_up == 0
+
+        e = raises(Exception, api.warm_up)
+        assert str(e) == 'API.warm_up() already called'
+
     def test_bootstrap(self):
         """
         Test the `ipalib.plugable.API.bootstrap` method.
@@ -307,3 +356,53 @@ class test_API(ClassChecker):
                 os.environ['IPA_CONFDIR'] = ipa_confdir
             else:
                 os.environ.pop('IPA_CONFDIR')
+
+
+def test_read_plugin_manifest():
+    """
+    Test the `ipalib.plugable.read_plugin_manifest` function.
+    """
+    with TempHome() as home:
+        assert plugable.read_plugin_manifest(home.path, []) is None
+
+        source = home.join('user.py')
+        with open(source, 'w') as f:
+            f.write('\n')
+        os.utime(source, (0, 0))
+
+        filename = home.join(plugable.PLUGIN_MANIFEST)
+        modules = {
+            u'user': [
+                {u'name': u'user_show', u'version': u'1',
+                 u'bases': [u'Command'], u'obj_name': u'user'},
+            ],
+        }
+
+        def write(version=VERSION, sources=(u'user',)):
+            with open(filename, 'w') as f:
+                json.dump(dict(version=version, sources=list(sources),
+                               modules=modules), f)
+
+        write()
+        assert plugable.read_plugin_manifest(home.path, ['user']) == modules
+
+        # another version
+        write(version=u'0.0.0')
+        assert plugable.read_plugin_manifest(home.path, ['user']) is None
+
+        # a module was added or removed
+        write()
+        assert plugable.read_plugin_manifest(
+            home.path, ['group', 'user']) is None
+        write(sources=(u'group', u'user'))
+        assert plugable.read_plugin_manifest(home.path, ['user']) is None
+
+        # a module was modified after the manifest was generated
+        write()
+        os.utime(filename, (0, 0))
+        os.utime(source, None)
+        assert plugable.read_plugin_manifest(home.path, ['user']) is None
+
+        with open(filename, 'w') as f:
+            f.write('{')
+        assert plugable.read_plugin_manifest(home.path, ['user']) is None
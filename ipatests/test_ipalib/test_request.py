@@ -0,0 +1,82 @@
+#
+# Copyright (C) 2017  FreeIPA Contributors see COPYING for license
+#
+"""
+Test the `ipalib.request` module.
+"""
+
+import pytest
+
+from ipalib import request
+from ipalib.request import context
+
+pytestmark = pytest.mark.tier0
+
+
+def test_timed_without_timing():
+    """
+    Test that `ipalib.request.timed` records nothing unless enabled.
+    """
+    context.__dict__.clear()
+    with request.timed('ldap_search', entries=0) as counters:
+        assert counters is None
+    assert not hasattr(context, 'request_timing')
+
+
+def test_timed():
+    """
+    Test the `ipalib.request.timed` function.
+    """
+    context.__dict__.clear()
+    try:
+        timing = request.start_timing()
+        assert context.request_timing is timing
+
+        for n in (2, 3):
+            with request.timed('ldap_search', entries=0) as counters:
+                counters['entries'] += n
+        with pytest.raises(ValueError):
+            with request.timed('execute'):
+                raise ValueError()
+
+        assert list(timing.phases) == ['ldap_search', 'execute']
+        assert timing.phases['ldap_search'][0] == 2
+        assert timing.phases['execute'][0] == 1
+
+        d = timing.as_dict()
+        assert d['ldap_search_calls'] == 2
+        assert d['ldap_search_entries'] == 5
+        assert d['execute_calls'] == 1
+        assert d['total_ms'] >= d['ldap_search_ms']
+
+        header = timing.server_timing()
+        assert header.startswith('ldap_search;dur=')
+        assert ', execute;dur=' in header
+
+        timing.extend('execute', 1.0)
+        assert timing.phases['execute'][0] == 1
+        assert timing.phases['execute'][1] >= 1.0
+    finally:
+        context.__dict__.clear()
+
+
+def test_RequestTimingTotals():
+    """
+    Test the `ipalib.request.RequestTimingTotals` class.
+    """
+    totals = request.RequestTimingTotals()
+    assert totals.as_dict() == dict(requests=0)
+
+    for n in (1, 2):
+        timing = request.RequestTiming()
+        timing.add('ldap_search', 0.5, entries=n)
+        totals.add(timing)
+
+    d = totals.as_dict()
+    assert d['requests'] == 2
+    assert d['ldap_search_calls'] == 2
+    assert d['ldap_search_entries'] == 3
+    assert d['ldap_search_ms'] == 1000
+
+    totals.reset()
+    assert totals.as_dict() == dict(requests=0)
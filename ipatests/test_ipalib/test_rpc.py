@@ -22,6 +22,9 @@ Test the `ipalib.rpc` module.
 """
 from __future__ import print_function
 
+import io
+import zlib
+
 import nose
 import pytest
 import six
@@ -200,6 +203,80 @@ def test_xml_loads():
         assert type(e.faultString) is unicode
 
 
+def test_json_iterencode_binary():
+    """
+    Test the `ipalib.rpc.json_iterencode_binary` function.
+    """
+    f = rpc.json_iterencode_binary
+    entries = tuple(
+        dict(uid=(u'user%d' % i,), usercertificate=(binary_bytes,))
+        for i in range(100)
+    )
+    response = dict(
+        result=dict(result=entries, count=100, summary=None),
+        error=None,
+        id=0,
+        principal=unicode_str,
+    )
+    expected = rpc.json_decode_binary(
+        rpc.json_encode_binary(response, API_VERSION))
+
+    for depth in (0, 1, 3, 10):
+        chunks = list(f(response, API_VERSION, chunk_size=1024, depth=depth))
+        assert all(type(chunk) is bytes for chunk in chunks)
+        data = b''.join(chunks)
+        assert rpc.json_decode_binary(data.decode('utf-8')) == expected
+        if depth >= 3:
+            # every chunk but the last holds at least chunk_size bytes and
+            # at most one entry more
+            assert len(chunks) > 1
+            assert all(len(chunk) >= 1024 for chunk in chunks[:-1])
+            assert max(len(chunk) for chunk in chunks) < 2048
+
+    # non-string keys are converted to strings like json does
+    data = b''.join(f({1: (True,), None: {}}, API_VERSION))
+    assert rpc.json_decode_binary(data.decode('utf-8')) == {
+        u'1': (True,), u'null': {}}
+
+    data = b''.join(f(response, API_VERSION, pretty_print=True))
+    assert rpc.json_decode_binary(data.decode('utf-8')) == expected
+
+
+def test_parse_response():
+    """
+    Test the `ipalib.rpc.MultiProtocolTransport.parse_response` method.
+    """
+    class Response(io.BytesIO):
+        def __init__(self, data, content_encoding=None):
+            super(Response, self).__init__(data)
+            self.content_encoding = content_encoding
+
+        def getheader(self, name, default=None):
+            assert name == 'Content-Encoding'
+            if self.content_encoding is None:
+                return default
+            return self.content_encoding
+
+    body = b'{"result": "' + b'x' * 200000 + b'"}'
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    compressed = compressor.compress(body) + compressor.flush()
+
+    transport = rpc.MultiProtocolTransport(protocol='json')
+    transport.verbose = False
+    assert transport.parse_response(Response(body)) == body
+    assert transport.parse_response(Response(compressed, 'gzip')) == body
+
+    transport = rpc.MultiProtocolTransport()
+    transport.verbose = False
+    data = dumps((unicode_str,), methodresponse=True, allow_none=True)
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    compressed = compressor.compress(data) + compressor.flush()
+    assert transport.parse_response(Response(compressed, 'gzip')) == (
+        unicode_str,)
+
+
 class test_xmlclient(PluginTester):
     """
     Test the `ipalib.rpc.xmlclient` plugin.
@@ -25,6 +25,7 @@ import base64
 import datetime
 
 import pytest
+from cryptography.hazmat.primitives import hashes
 
 from ipalib import x509
 from ipapython.dn import DN
@@ -145,6 +146,26 @@ class test_x509(object):
         assert cert.not_valid_before == not_before
         assert cert.not_valid_after == not_after
 
+    def test_certificate_data(self):
+        """
+        Test the cached certificate data
+        """
+        der = base64.b64decode(goodcert)
+        data = x509.get_certificate_data(der)
+
+        assert data.subject == DN(('CN', 'ipa.example.com'), ('O', 'IPA'))
+        assert data.issuer == DN(('CN', 'IPA Test Certificate Authority'))
+        assert data.serial_number == 1093
+        assert data.serial_number_hex == u'0x445'
+        assert data.valid_not_before == u'Fri Jun 25 13:00:42 2010 UTC'
+        assert data.sha256_fingerprint == x509.to_hex_with_colons(
+            data.cert.fingerprint(hashes.SHA256()))
+
+        # the same certificate is parsed only once
+        assert x509.get_certificate_data(der) is data
+        assert x509.get_certificate_data(data.cert) is data
+        assert x509.load_der_x509_certificate_cached(der) is data.cert
+
     def test_load_pkcs7_pem(self):
         certlist = x509.pkcs7_to_certs(good_pkcs7, datatype=x509.PEM)
         assert len(certlist) == 1
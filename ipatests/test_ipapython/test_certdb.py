@@ -1,6 +1,13 @@
 import os
 
-from ipapython.certdb import NSSDatabase, TRUSTED_PEER_TRUST_FLAGS
+from ipapython.certdb import (
+    NSSDatabase,
+    TRUSTED_PEER_TRUST_FLAGS,
+    EXTERNAL_CA_TRUST_FLAGS,
+    EMPTY_TRUST_FLAGS,
+    parse_trust_flags,
+    same_trust_flags,
+)
 
 CERTNICK = 'testcert'
 
@@ -131,3 +138,46 @@ def test_convert_db_nokey():
         assert nssdb.certdb in nssdb.filenames
         assert os.path.basename(nssdb.keydb) == 'key4.db'
         assert os.path.basename(nssdb.secmod) == 'pkcs11.txt'
+
+
+def test_same_trust_flags():
+    assert same_trust_flags(parse_trust_flags('C,,'), EXTERNAL_CA_TRUST_FLAGS)
+    assert same_trust_flags(parse_trust_flags('Cu,u,u'),
+                            EXTERNAL_CA_TRUST_FLAGS)
+    assert same_trust_flags(parse_trust_flags(',,'), EMPTY_TRUST_FLAGS)
+    assert same_trust_flags(parse_trust_flags('p,p,p'),
+                            parse_trust_flags('p,p,p'))
+    assert not same_trust_flags(parse_trust_flags('CT,C,C'),
+                                EXTERNAL_CA_TRUST_FLAGS)
+    assert not same_trust_flags(parse_trust_flags('P,,'),
+                                EXTERNAL_CA_TRUST_FLAGS)
+
+
+def test_update_certs():
+    with NSSDatabase() as nssdb:
+        nssdb.create_db()
+        create_selfsigned(nssdb)
+        cert = nssdb.get_cert(CERTNICK)
+        nssdb.run_certutil(['-F', '-n', CERTNICK])
+        nssdb.delete_cert(CERTNICK)
+        assert not nssdb.has_nickname(CERTNICK)
+
+        certs = [(cert, CERTNICK, TRUSTED_PEER_TRUST_FLAGS)]
+        assert nssdb.update_certs(certs) == []
+        assert nssdb.has_nickname(CERTNICK)
+        assert nssdb.get_certs(CERTNICK) == [cert]
+
+        # nothing changed, the database is not modified
+        listing = nssdb.list_certs()
+        assert nssdb.update_certs(certs) == []
+        assert nssdb.list_certs() == listing
+
+        # only the trust flags changed
+        certs = [(cert, CERTNICK, EXTERNAL_CA_TRUST_FLAGS)]
+        assert nssdb.update_certs(certs) == []
+        (nickname, trust_flags), = nssdb.list_certs()
+        assert nickname == CERTNICK
+        assert same_trust_flags(trust_flags, EXTERNAL_CA_TRUST_FLAGS)
+
+        assert nssdb.update_certs([], remove=[CERTNICK]) == []
+        assert not nssdb.has_nickname(CERTNICK)
@@ -0,0 +1,75 @@
+#
+# Copyright (C) 2018  FreeIPA Contributors see COPYING for license
+#
+
+"""
+Test the ACI cache of the `ipaserver/plugins/aci.py` module.
+"""
+
+import pytest
+
+from ipapython.dn import DN
+from ipaserver.plugins.aci import ACICache
+
+ACI_SELF = (u'(targetattr = "givenname || sn")'
+            u'(version 3.0;acl "selfservice:Self can write own name";'
+            u'allow (write) userdn = "ldap:///self";)')
+ACI_USERS = (u'(target = "ldap:///uid=*,cn=users,cn=accounts,dc=example")'
+             u'(targetattr = "mail")'
+             u'(version 3.0;acl "permission:Write mail";'
+             u'allow (write) groupdn = "ldap:///cn=Write mail,'
+             u'cn=permissions,cn=pbac,dc=example";)')
+ACI_BROKEN = u'(version 3.0;acl "broken"'
+
+
+class FakeEntry(dict):
+    def __init__(self, dn, acis):
+        super(FakeEntry, self).__init__(aci=list(acis))
+        self.dn = dn
+
+
+@pytest.mark.tier0
+class TestACICache(object):
+    dn = DN('dc=example')
+
+    def test_indexes(self):
+        cache = ACICache()
+        aciset = cache.get(FakeEntry(self.dn, [ACI_SELF, ACI_USERS,
+                                               ACI_BROKEN]))
+
+        assert [a.name for a in aciset.acis] == [
+            u'selfservice:Self can write own name', u'permission:Write mail']
+        assert aciset.acistrs == [ACI_SELF, ACI_USERS]
+
+        a, acistr = aciset.find_by_name(u'PERMISSION:write mail')
+        assert acistr == ACI_USERS
+        with pytest.raises(KeyError):
+            aciset.find_by_name(u'permission:nonexistent')
+
+        [a] = aciset.by_target[
+            u'ldap:///uid=*,cn=users,cn=accounts,dc=example']
+        assert a.name == u'permission:Write mail'
+        [a] = aciset.by_bindrule[u'ldap:///self']
+        assert a.name == u'selfservice:Self can write own name'
+
+    def test_reuse(self):
+        cache = ACICache()
+        aciset = cache.get(FakeEntry(self.dn, [ACI_SELF, ACI_USERS]))
+        assert cache.get(FakeEntry(self.dn, [ACI_SELF, ACI_USERS])) is aciset
+
+        # a modified entry gets a new set, unchanged ACIs are not reparsed
+        modified = cache.get(FakeEntry(self.dn, [ACI_USERS]))
+        assert modified is not aciset
+        assert modified.acis[0] is aciset.acis[1]
+        assert cache.parse(ACI_USERS) is aciset.acis[1]
+
+        # users who can read fewer ACIs get their own set
+        other = cache.get(FakeEntry(self.dn, []))
+        assert other.acis == []
+
+    def test_size(self):
+        cache = ACICache(size=2)
+        first = cache.get(FakeEntry(self.dn, [ACI_SELF]))
+        cache.get(FakeEntry(self.dn, [ACI_USERS]))
+        cache.get(FakeEntry(self.dn, []))
+        assert cache.get(FakeEntry(self.dn, [ACI_SELF])) is not first
@@ -0,0 +1,84 @@
+#
+# Copyright (C) 2018  FreeIPA Contributors see COPYING for license
+#
+
+"""
+Test the trust information cache of the `ipaserver/dcerpc.py` module.
+"""
+
+import pytest
+
+from ipalib import errors
+from ipapython.dn import DN
+
+pytest.importorskip('samba')
+pytest.importorskip('pysss_nss_idmap')
+
+from ipaserver.dcerpc import TrustInfoCache  # noqa: E402
+
+CN_AD = DN(('cn', 'ad'), ('cn', 'trusts'), ('dc', 'example'))
+
+
+class FakeEntry(object):
+    def __init__(self, dn, usn):
+        self.dn = dn
+        self.single_value = {'entryusn': usn,
+                             'modifytimestamp': u'20180101000000Z'}
+
+
+class FakeLDAP(object):
+    """The trusts subtree shared by all server processes"""
+    SCOPE_SUBTREE = 2
+
+    def __init__(self):
+        self.entries = [
+            FakeEntry(CN_AD, 1),
+            FakeEntry(DN(('cn', 'ad.test'), CN_AD), 2),
+        ]
+
+    def find_entries(self, filter=None, attrs_list=None, base_dn=None,
+                     scope=None, time_limit=None, size_limit=None):
+        if not self.entries:
+            raise errors.NotFound(reason=u'no such entry')
+        return list(self.entries), False
+
+
+@pytest.mark.tier0
+class TestTrustInfoCache(object):
+    def test_validate(self):
+        ldap = FakeLDAP()
+        # the caches of two server processes
+        caches = [TrustInfoCache(), TrustInfoCache()]
+        for cache in caches:
+            cache.validate(ldap, CN_AD)
+            cache.set('topology', u'dc=example', {u'ad.test': ()})
+            cache.set('name_to_sid', u'user@ad.test', u'S-1-5-21-1-2-3-1000')
+
+        # nothing changed
+        for cache in caches:
+            cache.validate(ldap, CN_AD)
+            assert cache.get('topology', u'dc=example')[0]
+            assert cache.get('name_to_sid', u'user@ad.test')[0]
+
+        # the trust is removed by the first process
+        del ldap.entries[1]
+        caches[0].flush()
+
+        caches[1].validate(ldap, CN_AD)
+        assert caches[1].get('topology', u'dc=example') == (False, None)
+        assert caches[1].get('name_to_sid', u'user@ad.test') == (False, None)
+
+    def test_validate_negative(self):
+        ldap = FakeLDAP()
+        del ldap.entries[1]
+        cache = TrustInfoCache()
+        cache.validate(ldap, CN_AD)
+        cache.set_negative('name_to_sid', u'user@ad.test',
+                           errors.NotFound(reason=u'not found'))
+        with pytest.raises(errors.NotFound):
+            cache.get('name_to_sid', u'user@ad.test')
+
+        # a trust is added by another process
+        ldap.entries.append(FakeEntry(DN(('cn', 'ad.test'), CN_AD), 3))
+        cache.validate(ldap, CN_AD)
+        assert cache.get('name_to_sid', u'user@ad.test') == (False, None)
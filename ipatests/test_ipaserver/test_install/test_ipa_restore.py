@@ -0,0 +1,98 @@
+#
+# Copyright (C) 2018  FreeIPA Contributors see COPYING for license
+#
+
+"""
+Tests for the `ipaserver.install.ipa_restore` module.
+"""
+
+import io
+import tarfile
+
+import pytest
+
+from ipaserver.install import ipa_restore
+
+SUFFIX = (
+    b'version: 1\n'
+    b'# entry-id: 1\n'
+    b'dn: dc=example,dc=test\n'
+    b'objectClass: top\n'
+    b'objectClass: domain\n'
+    b'dc: example\n'
+    b'\n'
+)
+RUV = (
+    b'dn: nsuniqueid=ffffffff-ffffffff-ffffffff-ffffffff,dc=example,dc=te\n'
+    b' st\n'
+    b'objectClass: top\n'
+    b'objectClass: nsTombstone\n'
+    b'objectClass: extensibleobject\n'
+    b'nsUniqueId: ffffffff-ffffffff-ffffffff-ffffffff\n'
+    b'nsds50ruv: {replicageneration} 5a8d5e2c000000040000\n'
+    b'\n'
+)
+TOMBSTONE = (
+    b'dn: nsuniqueid=8b4b1d01-1dd211b2-8f43a88a-6a1a1a6d,uid=deleted,dc=ex\n'
+    b' ample,dc=test\n'
+    b'objectClass: nsTombstone\n'
+    b'nsUniqueId: 8b4b1d01-1dd211b2-8f43a88a-6a1a1a6d\n'
+    b'description:: ZmZmZmZmZmYtZmZmZmZmZmYtZmZmZmZmZmYtZmZmZmZmZmY=\n'
+    b'\n'
+)
+
+
+def filter_ldif(data):
+    out_file = io.BytesIO()
+    removed = ipa_restore.remove_ruv_entries(io.BytesIO(data), out_file)
+    return removed, out_file.getvalue()
+
+
+@pytest.mark.tier0
+def test_remove_ruv_entries():
+    assert filter_ldif(SUFFIX + RUV + TOMBSTONE) == (1, SUFFIX + TOMBSTONE)
+
+
+@pytest.mark.tier0
+def test_remove_ruv_entries_verbatim():
+    # other entries are copied as they are, even without a trailing newline
+    data = SUFFIX + TOMBSTONE.rstrip(b'\n')
+    assert filter_ldif(data) == (0, data)
+
+
+@pytest.mark.tier0
+def test_remove_ruv_entries_base64():
+    ruv = RUV.replace(
+        b'nsUniqueId: ffffffff-ffffffff-ffffffff-ffffffff\n',
+        b'nsUniqueId:: ZmZmZmZmZmYtZmZmZmZmZmYtZmZmZmZmZmYtZmZmZmZmZmY=\n')
+    assert filter_ldif(SUFFIX + ruv) == (1, SUFFIX)
+
+
+@pytest.mark.tier0
+def test_remove_ruv_entries_keeps_version():
+    assert filter_ldif(b'version: 1\n' + RUV + TOMBSTONE) == (
+        1, b'version: 1\n\n' + TOMBSTONE)
+
+
+@pytest.mark.tier0
+def test_tee_ldif_members():
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode='w') as tar:
+        for name, data in (('./header', b'[ipa]\n'),
+                           ('./EXAMPLE-TEST-userRoot.ldif', SUFFIX),
+                           ('./bak/EXAMPLE-TEST-userRoot.ldif', SUFFIX)):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    data = archive.getvalue()
+
+    copy = io.BytesIO()
+    tee = ipa_restore.TeeReader(io.BytesIO(data), copy)
+    with tarfile.open(fileobj=tee, mode='r|') as tar:
+        names = [ipa_restore.ldif_member_name(member) for member in tar]
+    while tee.read(tarfile.RECORDSIZE):
+        pass
+
+    # only LDIF files in the top directory are restored from the archive
+    assert names == [None, 'EXAMPLE-TEST-userRoot.ldif', None]
+    assert copy.getvalue() == data
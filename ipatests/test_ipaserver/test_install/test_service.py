@@ -36,3 +36,60 @@ def test_format_seconds():
     assert service.format_seconds(62) == '1 minute 2 seconds'
     assert service.format_seconds(120) == '2 minutes'
     assert service.format_seconds(125) == '2 minutes 5 seconds'
+
+
+@pytest.mark.tier0
+def test_run_in_dependency_order():
+    dependencies = {
+        'kadmin': ('krb5kdc',),
+        'httpd': ('krb5kdc',),
+        'winbind': ('smb',),
+    }
+    svc_list = ['krb5kdc', 'kadmin', 'httpd', 'smb', 'winbind']
+    done = []
+
+    def action(svc):
+        for dep in dependencies.get(svc, ()):
+            assert dep in done
+        done.append(svc)
+
+    results = service.run_in_dependency_order(
+        svc_list, action, dependencies=dependencies)
+    assert sorted(r.name for r in results) == sorted(svc_list)
+    assert all(r.error is None for r in results)
+
+
+@pytest.mark.tier0
+def test_run_in_dependency_order_reverse():
+    dependencies = {'kadmin': ('krb5kdc',)}
+    done = []
+
+    def action(svc):
+        if svc == 'krb5kdc':
+            assert 'kadmin' in done
+        done.append(svc)
+
+    results = service.run_in_dependency_order(
+        ['krb5kdc', 'kadmin'], action, reverse=True,
+        dependencies=dependencies)
+    assert [r.name for r in results] == ['kadmin', 'krb5kdc']
+
+
+@pytest.mark.tier0
+def test_run_in_dependency_order_failure():
+    dependencies = {'kadmin': ('krb5kdc',)}
+
+    def action(svc):
+        if svc == 'krb5kdc':
+            raise RuntimeError(svc)
+
+    results = service.run_in_dependency_order(
+        ['krb5kdc', 'kadmin'], action, dependencies=dependencies)
+    assert [r.name for r in results] == ['krb5kdc']
+    assert isinstance(results[0].error, RuntimeError)
+
+    results = service.run_in_dependency_order(
+        ['krb5kdc', 'kadmin'], action, stop_on_failure=False,
+        dependencies=dependencies)
+    assert [r.name for r in results] == ['krb5kdc', 'kadmin']
+    assert results[1].error is None
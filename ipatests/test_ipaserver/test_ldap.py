@@ -34,7 +34,7 @@ from nose.tools import assert_raises  # pylint: disable=E0611
 import six
 
 from ipaplatform.paths import paths
-from ipaserver.plugins.ldap2 import ldap2, AUTOBIND_DISABLED
+from ipaserver.plugins.ldap2 import ldap2, AUTOBIND_DISABLED, LookupCache
 from ipalib import api, create_api, errors
 from ipapython.dn import DN
 
@@ -133,6 +133,47 @@ class test_ldap(object):
         cert = entry_attrs.get('usercertificate')[0]
         assert cert.serial_number is not None
 
+    def test_pipeline(self):
+        """
+        Test pipelined add, update and delete operations
+        """
+        pwfile = api.env.dot_ipa + os.sep + ".dmpw"
+        if os.path.isfile(pwfile):
+            with open(pwfile, "r") as fp:
+                dm_password = fp.read().rstrip()
+        else:
+            raise nose.SkipTest("No directory manager password in %s" % pwfile)
+        self.conn = ldap2(api)
+        self.conn.connect(bind_dn=DN(('cn', 'directory manager')),
+                          bind_pw=dm_password)
+
+        dns = [DN(('cn', 'pipeline%d' % i), api.env.container_group,
+                  api.env.basedn) for i in range(3)]
+        entries = [self.conn.make_entry(dn, objectclass=['nsContainer'],
+                                        cn=[dn[0].value]) for dn in dns]
+        try:
+            results = list(self.conn.pipeline(
+                [(0, 'add', entries[0]), (1, 'add', entries[1]),
+                 (2, 'add', entries[0]), (3, 'delete', dns[2])],
+                window=2))
+            assert [key for key, _error in results] == [0, 1, 2, 3]
+            assert results[0][1] is None
+            assert results[1][1] is None
+            assert isinstance(results[2][1], errors.DuplicateEntry)
+            assert isinstance(results[3][1], errors.NotFound)
+
+            entries[1]['description'] = [u'pipelined']
+            results = list(self.conn.pipeline(
+                [(1, 'update', entries[1]), (0, 'update', entries[0])]))
+            assert results[0] == (1, None)
+            assert isinstance(results[1][1], errors.EmptyModlist)
+            entry = self.conn.get_entry(dns[1], ['description'])
+            assert entry['description'] == [u'pipelined']
+        finally:
+            results = list(self.conn.pipeline(
+                (dn, 'delete', dn) for dn in dns[:2]))
+        assert results == [(dns[0], None), (dns[1], None)]
+
 
 @pytest.mark.tier0
 class test_LDAPEntry(object):
@@ -310,3 +351,76 @@ class test_LDAPEntry(object):
 
         e.raw['test'].append(b'second')
         assert e['test'] == ['not list', u'second']
+
+
+class FakeEntry(object):
+    def __init__(self, dn, usn):
+        self.dn = dn
+        self.single_value = {'entryusn': usn}
+
+
+class FakeLDAP(object):
+    SCOPE_BASE = ldap2.SCOPE_BASE
+    SCOPE_SUBTREE = ldap2.SCOPE_SUBTREE
+
+    def __init__(self):
+        self.entries = {}
+        self.searches = 0
+
+    def find_entries(self, filter, attrs_list, base_dn, scope, **kwargs):
+        self.searches += 1
+        entries = [FakeEntry(dn, usn) for dn, usn in self.entries.items()
+                   if dn == base_dn or
+                   scope == self.SCOPE_SUBTREE and dn.endswith(base_dn)]
+        if not entries:
+            raise errors.NotFound(reason='no such entry')
+        return entries, False
+
+
+@pytest.mark.tier0
+class test_LookupCache(object):
+    """
+    Test the process-wide cache of read-mostly lookups.
+    """
+    base = DN(('cn', 'masters'), ('cn', 'ipa'), ('cn', 'etc'),
+              ('dc', 'example'))
+    child = DN(('cn', 'CA'), ('cn', 'server'), base)
+
+    def setup(self):
+        self.ldap = FakeLDAP()
+        self.ldap.entries = {self.base: u'1', self.child: u'2'}
+        self.calls = []
+
+    def lookup(self, cache):
+        def func():
+            self.calls.append(None)
+            return len(self.calls)
+        return cache.get(self.ldap, 'key', [(self.base, ldap2.SCOPE_SUBTREE)],
+                         func)
+
+    def test_ttl(self):
+        cache = LookupCache(ttl=3600)
+        assert self.lookup(cache) == 1
+        self.ldap.entries[self.child] = u'3'
+        # within the TTL the server is not asked at all
+        assert self.lookup(cache) == 1
+        assert self.ldap.searches == 1
+
+    def test_revalidate(self):
+        cache = LookupCache(ttl=0)
+        assert self.lookup(cache) == 1
+        # unchanged entries, the lookup is not repeated
+        assert self.lookup(cache) == 1
+        assert self.ldap.searches == 2
+        self.ldap.entries[self.child] = u'3'
+        assert self.lookup(cache) == 2
+        del self.ldap.entries[self.child]
+        assert self.lookup(cache) == 3
+
+    def test_invalidate(self):
+        cache = LookupCache(ttl=3600)
+        assert self.lookup(cache) == 1
+        cache.invalidate(DN(('cn', 'other'), ('dc', 'example')))
+        assert self.lookup(cache) == 1
+        cache.invalidate(self.child)
+        assert self.lookup(cache) == 2
@@ -21,8 +21,12 @@ import codecs
 import os
 import pytest
 
+from ipalib import errors
+from ipapython.dn import DN
+from ipaserver.install import ipa_otptoken_import
 from ipaserver.install.ipa_otptoken_import import PSKCDocument, ValidationError
 from ipaserver.install.ipa_otptoken_import import convertHashName
+from ipaserver.install.ipa_otptoken_import import OTPTokenImport
 
 basename = os.path.join(os.path.dirname(__file__), "data")
 
@@ -131,6 +135,26 @@ class test_otptoken_import(object):
                 'type': u'hotp',
             })]
 
+    def test_save_remaining(self, tmpdir):
+        doc = PSKCDocument(os.path.join(basename, "pskc-figure3.xml"))
+        tokens = [(t.id, t.options) for t in doc.getKeyPackages()]
+        output = str(tmpdir.join("remaining.xml"))
+        doc.save(output)
+
+        doc = PSKCDocument(output)
+        assert [(t.id, t.options) for t in doc.getKeyPackages()] == tokens
+
+        for t in doc.getKeyPackages():
+            t.remove()
+        output = str(tmpdir.join("empty.xml"))
+        doc.save(output)
+        try:
+            PSKCDocument(output)
+        except ValueError: # No tokens remaining.
+            pass
+        else:
+            assert False
+
     def test_valid_tokens(self):
         assert convertHashName('sha1') == u'sha1'
         assert convertHashName('hmac-sha1') == u'sha1'
@@ -148,3 +172,131 @@ class test_otptoken_import(object):
         assert convertHashName('something-sha256') == u'sha1'
         assert convertHashName('') == u'sha1'
         assert convertHashName(None) == u'sha1'
+
+
+class FakeKeyPackage(object):
+    def __init__(self, id, **options):
+        self.id = id
+        self.options = options
+        self.removed = False
+
+    def remove(self):
+        self.removed = True
+
+
+class FakeEntry(object):
+    def __init__(self, **attrs):
+        self.single_value = attrs
+
+
+class FakeCommand(object):
+    """otptoken_add, which rejects tokens of an unknown type"""
+    def __init__(self):
+        self.calls = []
+
+    def make_entry(self, ldap, user, *keys, **options):
+        self.calls.append((user, keys, options))
+        if options.get('type') not in (u'totp', u'hotp'):
+            raise errors.ValidationError(name='type', error=u'invalid')
+        return FakeEntry(ipatokenuniqueid=keys[0])
+
+
+class FakeLDAP(object):
+    SCOPE_ONELEVEL = 1
+
+    def __init__(self, existing=(), failing=()):
+        self.existing = set(existing)
+        self.failing = set(failing)
+        self.searches = []
+        self.added = []
+
+    def make_filter_from_attr(self, attr, value):
+        return (attr, tuple(value))
+
+    def find_entries(self, filter, attrs_list, base_dn, scope,
+                     size_limit=None, time_limit=None):
+        self.searches.append((filter, base_dn, scope))
+        entries = [FakeEntry(ipatokenuniqueid=i)
+                   for i in filter[1] if i in self.existing]
+        if not entries:
+            raise errors.EmptyResult(reason=u'no matching entry found')
+        return entries, False
+
+    def pipeline(self, operations):
+        for keypkg, operation, entry in operations:
+            assert operation == 'add'
+            uid = entry.single_value['ipatokenuniqueid']
+            if uid in self.failing:
+                yield keypkg, errors.DuplicateEntry()
+            else:
+                self.added.append(uid)
+                yield keypkg, None
+
+
+class FakeAPI(object):
+    def __init__(self, ldap):
+        self.Command = type('Command', (), {})()
+        self.Command.otptoken_add = FakeCommand()
+        self.Backend = type('Backend', (), {})()
+        self.Backend.ldap2 = ldap
+        self.env = type('Env', (), {})()
+        self.env.container_otp = DN(('cn', 'otp'))
+        self.env.basedn = DN(('dc', 'example'))
+
+
+@pytest.mark.tier0
+class test_otptoken_import_batch(object):
+    user = {'uid': [u'admin'], 'dn': DN(('uid', 'admin'), ('dc', 'example'))}
+
+    def make_tool(self, monkeypatch, ldap):
+        api = FakeAPI(ldap)
+        monkeypatch.setattr(ipa_otptoken_import, 'api', api)
+        OTPTokenImport.make_parser()
+        options, args = OTPTokenImport.option_parser.parse_args(
+            ['in.xml', 'out.xml'])
+        return OTPTokenImport(options, args), api
+
+    def test_make_entry(self, monkeypatch):
+        tool, api = self.make_tool(monkeypatch, FakeLDAP())
+        keypkg = FakeKeyPackage(u'token1', type=u'totp',
+                                ipatokenotpdigits=6)
+        entry = tool.make_entry(keypkg, self.user)
+        assert entry.single_value['ipatokenuniqueid'] == u'token1'
+        assert api.Command.otptoken_add.calls == [
+            (self.user, (u'token1',),
+             dict(type=u'totp', ipatokenotpdigits=6, no_qrcode=True))]
+
+    def test_import_batch(self, monkeypatch):
+        ldap = FakeLDAP(existing=[u'present'], failing=[u'failing'])
+        tool, _api = self.make_tool(monkeypatch, ldap)
+        batch = [
+            FakeKeyPackage(u'new1', type=u'totp'),
+            FakeKeyPackage(u'present', type=u'totp'),
+            FakeKeyPackage(u'invalid', type=u'unknown'),
+            FakeKeyPackage(u'failing', type=u'hotp'),
+            FakeKeyPackage(u'new2', type=u'hotp'),
+        ]
+
+        assert tool.import_batch(batch, self.user) == 2
+        assert ldap.added == [u'new1', u'new2']
+
+        # existing tokens are found with one search for the whole batch
+        assert ldap.searches == [
+            (('ipatokenuniqueid', (u'new1', u'present', u'failing',
+                                   u'new2')),
+             DN(('cn', 'otp'), ('dc', 'example')),
+             ldap.SCOPE_ONELEVEL)]
+
+        # added and already present tokens are not written to the output
+        # file, invalid and failed ones are
+        assert [k.id for k in batch if k.removed] == [
+            u'new1', u'present', u'new2']
+
+    def test_import_batch_nothing_valid(self, monkeypatch):
+        ldap = FakeLDAP()
+        tool, _api = self.make_tool(monkeypatch, ldap)
+        batch = [FakeKeyPackage(u'invalid', type=u'unknown')]
+
+        assert tool.import_batch(batch, self.user) == 0
+        assert ldap.searches == []
+        assert not batch[0].removed
@@ -21,13 +21,19 @@
 Test the `ipaserver.rpc` module.
 """
 
+import io
 import json
-import pytest
+import threading
+import time
+import zlib
 
+import pytest
 import six
 
 from ipatests.util import assert_equal, raises, PluginTester
-from ipalib import errors
+from ipalib import errors, Int
+from ipalib.frontend import Command
+from ipalib.request import context
 from ipaserver import rpcserver
 
 if six.PY3:
@@ -135,6 +141,29 @@ def test_params_2_args_options():
     assert f([args, options]) == (args, options)
 
 
+def test_accepts_gzip():
+    """
+    Test the `ipaserver.rpcserver.accepts_gzip` function.
+    """
+    f = rpcserver.accepts_gzip
+    assert f({}) is False
+    assert f({'HTTP_ACCEPT_ENCODING': 'identity'}) is False
+    assert f({'HTTP_ACCEPT_ENCODING': 'gzip'}) is True
+    assert f({'HTTP_ACCEPT_ENCODING': 'deflate, GZip;q=0.5'}) is True
+    assert f({'HTTP_ACCEPT_ENCODING': 'x-gzip'}) is True
+    assert f({'HTTP_ACCEPT_ENCODING': 'gzip; q=0'}) is False
+    assert f({'HTTP_ACCEPT_ENCODING': 'gzip;q=bogus'}) is False
+
+
+def test_gzip_chunks():
+    """
+    Test the `ipaserver.rpcserver.gzip_chunks` function.
+    """
+    chunks = [b'x' * 1000, b'', b'y' * 100000]
+    data = b''.join(rpcserver.gzip_chunks(chunks))
+    assert zlib.decompress(data, 16 + zlib.MAX_WBITS) == b''.join(chunks)
+
+
 class test_session(object):
     klass = rpcserver.wsgi_dispatch
 
@@ -261,3 +290,154 @@ class test_jsonserver(PluginTester):
         options = dict(givenname=u'John', sn='Doe')
         d = dict(method=u'user_add', params=(args, options), id=18)
         assert o.unmarshal(json.dumps(d)) == (u'user_add', args, options, 18)
+
+    def test_concurrent_requests(self):
+        """
+        Test that concurrent requests do not share per-request state.
+        """
+        class stress_languages(Command):
+            def execute(self, *args, **options):
+                languages = context.languages
+                time.sleep(0.001)
+                return dict(result=[languages, context.languages])
+
+        o, _api, _home = self.instance('Backend', stress_languages,
+                                       in_server=True)
+        body = json.dumps(
+            dict(method=u'stress_languages', params=[[], {}], id=0)
+        ).encode('utf-8')
+        start = threading.Event()
+        results = {}
+
+        def worker(i):
+            start.wait()
+            for _j in range(20):
+                environ = {
+                    'REQUEST_METHOD': 'POST',
+                    'CONTENT_TYPE': 'application/json',
+                    'CONTENT_LENGTH': str(len(body)),
+                    'HTTP_REFERER': 'https://ipa.example.test/ipa/ui',
+                    'HTTP_ACCEPT_LANGUAGE': 'l%d-r%d' % (i, i),
+                    'wsgi.input': io.BytesIO(body),
+                }
+                s = StartResponse()
+                response = o(environ, s)
+                context.__dict__.clear()
+                results.setdefault(i, []).append((s, response))
+
+        threads = [threading.Thread(target=worker, args=(i,))
+                   for i in range(8)]
+        for t in threads:
+            t.start()
+        start.set()
+        for t in threads:
+            t.join()
+
+        seen_headers = set()
+        for i, responses in results.items():
+            assert len(responses) == 20
+            expected = ['l%d_R%d' % (i, i)]
+            for s, response in responses:
+                assert s.status == rpcserver.HTTP_STATUS_SUCCESS
+                assert s.headers == [
+                    ('Content-Type', 'application/json; charset=utf-8')]
+                assert id(s.headers) not in seen_headers
+                seen_headers.add(id(s.headers))
+                reply = json.loads(b''.join(response).decode('utf-8'))
+                assert reply['error'] is None
+                assert reply['result']['result'] == [expected, expected]
+
+    def test_compression(self):
+        """
+        Test that large responses are compressed if the client accepts it.
+        """
+        class stress_size(Command):
+            takes_args = (Int('size'),)
+
+            def execute(self, size, **options):
+                return dict(result=u'x' * size)
+
+        o, _api, _home = self.instance('Backend', stress_size,
+                                       in_server=True)
+
+        def call(size, accept_encoding=None):
+            body = json.dumps(
+                dict(method=u'stress_size', params=[[size], {}], id=0)
+            ).encode('utf-8')
+            environ = {
+                'REQUEST_METHOD': 'POST',
+                'CONTENT_TYPE': 'application/json',
+                'CONTENT_LENGTH': str(len(body)),
+                'HTTP_REFERER': 'https://ipa.example.test/ipa/ui',
+                'wsgi.input': io.BytesIO(body),
+            }
+            if accept_encoding is not None:
+                environ['HTTP_ACCEPT_ENCODING'] = accept_encoding
+            s = StartResponse()
+            data = b''.join(o(environ, s))
+            context.__dict__.clear()
+            assert s.status == rpcserver.HTTP_STATUS_SUCCESS
+            headers = dict(s.headers)
+            if headers.get('Content-Encoding') == 'gzip':
+                assert headers['Vary'] == 'Accept-Encoding'
+                data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+            reply = json.loads(data.decode('utf-8'))
+            assert reply['result']['result'] == u'x' * size
+            return headers.get('Content-Encoding')
+
+        large = o.compress_threshold * 100
+        assert call(10, 'gzip') is None
+        assert call(large) is None
+        assert call(large, 'identity') is None
+        assert call(large, 'gzip, deflate') == 'gzip'
+
+    def test_marshal_streams(self):
+        """
+        Test that a large result is encoded while the response is sent.
+        """
+        o, _api, _home = self.instance('Backend', in_server=True)
+        entries = [{u'uid': [u'user%d' % i], u'cn': [u'User %d' % i]}
+                   for i in range(5000)]
+        result = dict(result=entries, count=len(entries), truncated=False,
+                      summary=None)
+
+        response = o.marshal(result, None, 0)
+        assert not isinstance(response, (bytes, list, tuple))
+        reply = json.loads(b''.join(response).decode('utf-8'))
+        assert reply['error'] is None
+        assert reply['result']['result'] == entries
+
+        # an entry which cannot be encoded after the first chunk fails the
+        # response while it is sent rather than truncating it
+        result['result'] = entries + [{u'value': object()}]
+        response = o.marshal(result, None, 0)
+        next(response)
+        with pytest.raises(TypeError):
+            for _chunk in response:
+                pass
+
+    def test_unencodable_result(self):
+        """
+        Test that a result which cannot be serialized gets a 500 response.
+        """
+        class stress_unencodable(Command):
+            def execute(self, *args, **options):
+                return dict(result=[{u'value': object()}])
+
+        o, _api, _home = self.instance('Backend', stress_unencodable,
+                                       in_server=True)
+        body = json.dumps(
+            dict(method=u'stress_unencodable', params=[[], {}], id=0)
+        ).encode('utf-8')
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_REFERER': 'https://ipa.example.test/ipa/ui',
+            'wsgi.input': io.BytesIO(body),
+        }
+        s = StartResponse()
+        data = b''.join(o(environ, s))
+        context.__dict__.clear()
+        assert s.status == rpcserver.HTTP_STATUS_SERVER_ERROR
+        assert data == rpcserver.HTTP_STATUS_SERVER_ERROR.encode('utf-8')
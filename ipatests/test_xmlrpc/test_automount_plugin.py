@@ -107,6 +107,19 @@ class AutomountTest(XMLRPC_test):
                     duplicatemaps=(),
                     duplicatekeys=(),
                 )), res)  # pylint: disable=used-before-assignment
+
+            # Importing the same files again only reports duplicates
+            res = automountlocation_import(self.locname, master_file,
+                                           version=u'2.88',
+                                           **{'continue': True})
+            assert_deepequal(dict(
+                result=dict(
+                    keys=(),
+                    maps=(),
+                    skipped=(),
+                    duplicatemaps=lambda m: m,
+                    duplicatekeys=lambda k: k,
+                )), res)
             self.check_tofiles()
         finally:
             res = api.Command['automountlocation_del'](self.locname)['result']
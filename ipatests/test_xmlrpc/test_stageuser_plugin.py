@@ -156,6 +156,30 @@ def user7(request):
     return tracker.make_fixture_restore(request)
 
 
+@pytest.fixture(scope='class')
+def stageduser_bulk1(request):
+    tracker = StageUserTracker(u'buser1', u'bulk', u'user')
+    return tracker.make_fixture_activate(request)
+
+
+@pytest.fixture(scope='class')
+def stageduser_bulk2(request):
+    tracker = StageUserTracker(u'buser2', u'bulk', u'user')
+    return tracker.make_fixture_activate(request)
+
+
+@pytest.fixture(scope='class')
+def user_bulk1(request):
+    tracker = UserTracker(u'buser1', u'bulk', u'user')
+    return tracker.make_fixture(request)
+
+
+@pytest.fixture(scope='class')
+def user_bulk2(request):
+    tracker = UserTracker(u'buser2', u'bulk', u'user')
+    return tracker.make_fixture(request)
+
+
 @pytest.mark.tier1
 class TestNonexistentStagedUser(XMLRPC_test):
     def test_retrieve_nonexistent(self, stageduser):
@@ -674,3 +698,46 @@ class TestGroups(XMLRPC_test):
         command = group.make_add_member_command(options={u'user': user.uid})
         result = command()
         group.check_add_member_negative(result)
+
+
+@pytest.mark.tier1
+class TestActivateBulk(XMLRPC_test):
+    def test_activate_bulk(self, stageduser_bulk1, stageduser_bulk2,
+                           user_bulk1, user_bulk2, user):
+        stageduser_bulk1.ensure_exists()
+        stageduser_bulk2.ensure_exists()
+        user_bulk1.ensure_missing()
+        user_bulk2.ensure_missing()
+        user.ensure_exists()
+
+        result = api.Command['stageuser_activate_bulk'](
+            [stageduser_bulk1.uid, user.uid, stageduser_bulk2.uid])
+        assert result['completed'] == 2
+        assert list(result['succeeded']) == [
+            stageduser_bulk1.uid, stageduser_bulk2.uid]
+        assert [tuple(f) for f in result['failed']] == [
+            (user.uid, u'%s: stage user not found' % user.uid)]
+
+        for stageduser, active in ((stageduser_bulk1, user_bulk1),
+                                   (stageduser_bulk2, user_bulk2)):
+            stageduser.exists = False
+            active.exists = True
+            with raises_exact(errors.NotFound(
+                    reason=u'%s: stage user not found' % stageduser.uid)):
+                stageduser.make_retrieve_command()()
+            entry = api.Command['user_show'](active.uid)['result']
+            assert u'ipausers' in entry['memberof_group']
+
+    def test_activate_bulk_duplicate(self, stageduser_bulk1, user_bulk1):
+        user_bulk1.ensure_exists()
+        stageduser_bulk1.ensure_exists()
+
+        result = api.Command['stageuser_activate_bulk'](
+            criteria=stageduser_bulk1.uid)
+        assert result['completed'] == 0
+        assert [tuple(f) for f in result['failed']] == [
+            (stageduser_bulk1.uid,
+             u'active user with name "%s" already exists' %
+             stageduser_bulk1.uid)]
+
+        stageduser_bulk1.delete()